@@ -15,6 +15,7 @@ urlpatterns = [
     
     # Reports and Analytics
     path('reports/', views.AdminReportsView.as_view(), name='reports'),
+    path('reports/courses/<int:course_id>/funnel/', views.AdminCourseFunnelView.as_view(), name='course_funnel'),
     
     # Settings
     path('settings/', views.AdminSettingsView.as_view(), name='settings'),
@@ -1,4 +1,4 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.views.generic import TemplateView, ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.http import JsonResponse
@@ -9,7 +9,9 @@ from datetime import timedelta
 from .models import AdminNotification
 from blog.models import Post, Comment
 from tests.models import PsychologicalTest, TestSession
+from tests.sweeper import last_sweep_stats
 from courses.models import Course, Enrollment
+from courses.analytics import lesson_funnel
 from therapy_sessions.models import Session
 from payment.models import Order
 from dashboard.models import User
@@ -47,6 +49,7 @@ class AdminDashboardView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
         # Test Statistics
         context['total_tests'] = PsychologicalTest.objects.count()
         context['total_test_sessions'] = TestSession.objects.count()
+        context['test_session_sweep'] = last_sweep_stats()
         
         # Course Statistics
         context['total_courses'] = Course.objects.count()
@@ -166,6 +169,25 @@ class AdminReportsView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
         return context
 
 
+class AdminCourseFunnelView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
+    """Admin per-lesson drop-off funnel of a course"""
+    template_name = 'admin_panel/course_funnel.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        course = get_object_or_404(Course, pk=self.kwargs['course_id'])
+        
+        context['course'] = course
+        context['funnel'] = lesson_funnel(course.id)
+        
+        return context
+    
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') == 'json':
+            return JsonResponse(context['funnel'])
+        return super().render_to_response(context, **response_kwargs)
+
+
 class AdminSettingsView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
     """Admin settings view"""
     template_name = 'admin_panel/settings.html'
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from .models import (
     CourseCategory, Course, CourseModule, Lesson, 
-    Enrollment, LessonProgress, CoursePurchase, CourseReview
+    Enrollment, LessonProgress, CoursePurchase, CourseReview, CourseRecommendation,
+    Certificate, CourseDailyStats
 )
 
 
@@ -32,7 +33,10 @@ class CourseAdmin(admin.ModelAdmin):
     list_filter = ('status', 'level', 'is_free', 'category', 'created_at')
     search_fields = ('title', 'description', 'instructor__first_name', 'instructor__last_name')
     prepopulated_fields = {'slug': ('title',)}
-    readonly_fields = ('created_at', 'updated_at', 'enrollment_count', 'rating', 'review_count')
+    readonly_fields = (
+        'created_at', 'updated_at', 'enrollment_count', 'rating', 'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count'
+    )
     
     fieldsets = (
         (None, {
@@ -51,7 +55,10 @@ class CourseAdmin(admin.ModelAdmin):
             'fields': ('status',)
         }),
         (_('Statistics'), {
-            'fields': ('enrollment_count', 'rating', 'review_count'),
+            'fields': (
+                'enrollment_count', 'rating', 'review_count', 'rating_sum',
+                'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count'
+            ),
             'classes': ('collapse',)
         }),
         (_('Timestamps'), {
@@ -183,4 +190,35 @@ class CourseReviewAdmin(admin.ModelAdmin):
             'fields': ('created_at',),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(CourseRecommendation)
+class CourseRecommendationAdmin(admin.ModelAdmin):
+    """Admin configuration for CourseRecommendation model"""
+    
+    list_display = ('course', 'recommended_course', 'rank', 'score', 'computed_at')
+    list_filter = ('course__category',)
+    search_fields = ('course__title', 'recommended_course__title')
+    readonly_fields = ('course', 'recommended_course', 'score', 'rank', 'computed_at')
+    ordering = ('course', 'rank')
+
+
+@admin.register(Certificate)
+class CertificateAdmin(admin.ModelAdmin):
+    """Admin configuration for Certificate model"""
+    
+    list_display = ('certificate_number', 'enrollment', 'issued_at')
+    list_filter = ('issued_at', 'enrollment__course__category')
+    search_fields = ('certificate_number', 'enrollment__user__email', 'enrollment__course__title')
+    readonly_fields = ('enrollment', 'certificate_number', 'file', 'issued_at')
+
+
+@admin.register(CourseDailyStats)
+class CourseDailyStatsAdmin(admin.ModelAdmin):
+    """Admin configuration for CourseDailyStats model"""
+    
+    list_display = ('course', 'date', 'new_enrollments', 'completions', 'revenue', 'total_enrollments', 'average_progress')
+    list_filter = ('date', 'course__category')
+    search_fields = ('course__title',)
+    date_hierarchy = 'date'
@@ -0,0 +1,207 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from .curriculum import get_curriculum
+from .models import Course, CourseDailyStats, CoursePurchase, Enrollment, LessonProgress
+
+
+DAILY_FIELDS = ['new_enrollments', 'completions', 'lessons_completed', 'purchases', 'revenue']
+TOTAL_FIELDS = ['total_enrollments', 'completed_enrollments', 'total_revenue']
+# Current-state columns with no history to rebuild them from for past days
+SNAPSHOT_FIELDS = ['average_progress', 'watch_time_seconds']
+LESSON_FUNNEL_CACHE_TIMEOUT = 60 * 5
+
+
+def lesson_funnel_cache_key(course_id):
+    return f'courses:lesson_funnel:{course_id}'
+
+
+def _grouped(queryset, course_field, **aggregates):
+    """Run one GROUP BY course query and return {course_id: row}"""
+    rows = queryset.values(course_field).annotate(**aggregates).order_by()
+    return {row[course_field]: row for row in rows}
+
+
+def rollup_course_stats(day=None, course_ids=None, snapshot=None):
+    """
+    Upsert CourseDailyStats for ``day`` (default: today) with one grouped
+    query per source table, independent of the number of learners.
+
+    Daily activity counts only that day's events and totals count
+    everything up to the end of ``day``, so past days can be backfilled.
+    Average progress and watch time only exist as current state; they are
+    written when ``snapshot`` is true (default: only for today) and left
+    alone on rows of earlier days. Returns the number of rows written.
+    """
+    today = timezone.localdate()
+    day = day or today
+    if snapshot is None:
+        snapshot = day >= today
+    course_filter = Q(course_id__in=course_ids) if course_ids is not None else Q()
+
+    enrollments = Enrollment.objects.filter(course_filter)
+    daily_enrollments = _grouped(
+        enrollments, 'course_id',
+        new_enrollments=Count('id', filter=Q(enrolled_at__date=day)),
+        completions=Count('id', filter=Q(completed_at__date=day)),
+        total_enrollments=Count('id', filter=Q(enrolled_at__date__lte=day)),
+        completed_enrollments=Count('id', filter=Q(completed_at__date__lte=day)),
+        average_progress=Avg('progress_percentage'),
+    )
+
+    lesson_filter = Q(enrollment__course_id__in=course_ids) if course_ids is not None else Q()
+    progress = _grouped(
+        LessonProgress.objects.filter(lesson_filter), 'enrollment__course_id',
+        lessons_completed=Count('id', filter=Q(is_completed=True, completed_at__date=day)),
+        watch_time_seconds=Sum('time_spent'),
+    )
+
+    purchases = _grouped(
+        CoursePurchase.objects.filter(course_filter), 'course_id',
+        purchases=Count('id', filter=Q(purchased_at__date=day)),
+        revenue=Sum('amount_paid', filter=Q(purchased_at__date=day)),
+        total_revenue=Sum('amount_paid', filter=Q(purchased_at__date__lte=day)),
+    )
+
+    rows = []
+    for course_id in set(daily_enrollments) | set(progress) | set(purchases):
+        enrollment_row = daily_enrollments.get(course_id, {})
+        progress_row = progress.get(course_id, {})
+        purchase_row = purchases.get(course_id, {})
+        rows.append(CourseDailyStats(
+            course_id=course_id,
+            date=day,
+            new_enrollments=enrollment_row.get('new_enrollments', 0),
+            completions=enrollment_row.get('completions', 0),
+            lessons_completed=progress_row.get('lessons_completed', 0),
+            purchases=purchase_row.get('purchases', 0),
+            revenue=purchase_row.get('revenue') or Decimal('0'),
+            total_enrollments=enrollment_row.get('total_enrollments', 0),
+            completed_enrollments=enrollment_row.get('completed_enrollments', 0),
+            total_revenue=purchase_row.get('total_revenue') or Decimal('0'),
+        ))
+        if snapshot:
+            rows[-1].average_progress = round(enrollment_row.get('average_progress') or 0, 1)
+            rows[-1].watch_time_seconds = progress_row.get('watch_time_seconds') or 0
+
+    CourseDailyStats.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['course', 'date'],
+        update_fields=DAILY_FIELDS + TOTAL_FIELDS + (SNAPSHOT_FIELDS if snapshot else []) + ['computed_at'],
+    )
+    return len(rows)
+
+
+def instructor_analytics(instructor, days=30):
+    """
+    Per-course totals and daily series for an instructor's courses, read
+    from the rollup table with a constant number of queries.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    courses = list(Course.objects.filter(instructor=instructor).values('id', 'title', 'slug', 'status'))
+    course_ids = [course['id'] for course in courses]
+
+    latest_dates = dict(
+        CourseDailyStats.objects.filter(course_id__in=course_ids)
+        .values('course_id')
+        .annotate(latest=Max('date'))
+        .values_list('course_id', 'latest')
+    )
+    stats = CourseDailyStats.objects.filter(
+        Q(course_id__in=course_ids) & (Q(date__gte=since) | Q(date__in=set(latest_dates.values())))
+    ).order_by('date')
+
+    series, latest = {}, {}
+    for row in stats:
+        if row.date >= since:
+            series.setdefault(row.course_id, []).append({
+                'date': row.date,
+                'new_enrollments': row.new_enrollments,
+                'completions': row.completions,
+                'lessons_completed': row.lessons_completed,
+                'purchases': row.purchases,
+                'revenue': row.revenue,
+            })
+        if row.date == latest_dates.get(row.course_id):
+            latest[row.course_id] = row
+
+    result = []
+    for course in courses:
+        row = latest.get(course['id'])
+        result.append({
+            **course,
+            'as_of': row.date if row else None,
+            'total_enrollments': row.total_enrollments if row else 0,
+            'completed_enrollments': row.completed_enrollments if row else 0,
+            'completion_rate': row.completion_rate if row else 0,
+            'average_progress': row.average_progress if row else 0,
+            'watch_time_seconds': row.watch_time_seconds if row else 0,
+            'total_revenue': row.total_revenue if row else Decimal('0'),
+            'daily': series.get(course['id'], []),
+        })
+    return result
+
+
+def _rate(part, whole):
+    return round(part / whole * 100, 1) if whole else 0
+
+
+def compute_lesson_funnel(course_id):
+    """
+    Per-lesson reach and completion counts for a course in curriculum order.
+
+    A learner has reached a lesson once a LessonProgress row exists for it.
+    All lessons are counted with a single GROUP BY over LessonProgress;
+    ``drop_off`` is the share of learners who reached the previous lesson
+    but not this one.
+    """
+    curriculum = get_curriculum(course_id)
+    enrolled = Enrollment.objects.filter(course_id=course_id).count()
+    counts = _grouped(
+        LessonProgress.objects.filter(enrollment__course_id=course_id), 'lesson_id',
+        reached=Count('id'),
+        completed=Count('id', filter=Q(is_completed=True)),
+    )
+
+    lessons = []
+    previous_reached = enrolled
+    for lesson_id in curriculum.lesson_ids:
+        lesson = curriculum.get_lesson(lesson_id)
+        row = counts.get(lesson_id, {})
+        reached = row.get('reached', 0)
+        completed = row.get('completed', 0)
+        lessons.append({
+            'lesson_id': lesson_id,
+            'module_id': lesson['module_id'],
+            'title': lesson['title'],
+            'position': curriculum.position[lesson_id] + 1,
+            'reached': reached,
+            'completed': completed,
+            'reach_rate': _rate(reached, enrolled),
+            'completion_rate': _rate(completed, enrolled),
+            'drop_off': _rate(max(previous_reached - reached, 0), previous_reached),
+        })
+        previous_reached = reached
+
+    return {
+        'course_id': course_id,
+        'enrolled': enrolled,
+        'lessons': lessons,
+        'computed_at': timezone.now(),
+    }
+
+
+def lesson_funnel(course_id):
+    """Cached lesson funnel; it is allowed to lag behind by a few minutes"""
+    key = lesson_funnel_cache_key(course_id)
+    funnel = cache.get(key)
+    if funnel is None:
+        funnel = compute_lesson_funnel(course_id)
+        cache.set(key, funnel, LESSON_FUNNEL_CACHE_TIMEOUT)
+    return funnel
@@ -1,16 +1,28 @@
 from django.urls import path
 from .api_views import (
+    CourseSearchAPIView,
     CourseLearnAPIView, 
     mark_lesson_complete, 
+    sync_progress,
     update_watch_time,
     enroll_course,
-    UserCoursesAPIView
+    bulk_enroll_course,
+    UserCoursesAPIView,
+    RecommendedCoursesAPIView,
+    instructor_course_analytics,
+    course_lesson_funnel
 )
 
 urlpatterns = [
+    path('search/', CourseSearchAPIView.as_view(), name='api_course_search'),
     path('learn/<slug:slug>/', CourseLearnAPIView.as_view(), name='api_course_learn'),
     path('lesson/<int:lesson_id>/complete/', mark_lesson_complete, name='api_mark_lesson_complete'),
+    path('progress/sync/', sync_progress, name='api_sync_progress'),
     path('lesson/<int:lesson_id>/watch-time/', update_watch_time, name='api_update_watch_time'),
     path('enroll/<slug:course_slug>/', enroll_course, name='api_enroll_course'),
+    path('enroll/<slug:course_slug>/bulk/', bulk_enroll_course, name='api_bulk_enroll_course'),
     path('my-courses/', UserCoursesAPIView.as_view(), name='api_user_courses'),
+    path('instructor/analytics/', instructor_course_analytics, name='api_instructor_analytics'),
+    path('instructor/funnel/<slug:course_slug>/', course_lesson_funnel, name='api_course_lesson_funnel'),
+    path('recommended/', RecommendedCoursesAPIView.as_view(), name='api_recommended_courses'),
 ]
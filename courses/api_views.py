@@ -3,8 +3,37 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
 from .models import Course, Lesson, Enrollment, LessonProgress
-from .serializers import CourseDetailSerializer, LessonProgressSerializer, EnrollmentSerializer
-from django.db import transaction
+from .serializers import (
+    CourseDetailSerializer, CourseListSerializer, LessonProgressSerializer,
+    LessonProgressSyncSerializer, EnrollmentSerializer
+)
+from .search import CourseFacetSearch
+from .recommendations import recommended_for_user
+from .enrollment import BulkEnrollmentError, bulk_enroll
+from .progress import sync_lesson_progress
+from .entitlements import get_entitlements
+from .analytics import instructor_analytics, lesson_funnel
+from sales.models import Institution, InstitutionUser
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+class CourseSearchAPIView(generics.ListAPIView):
+    """
+    Faceted course search: paginated results plus per-facet counts
+    """
+    serializer_class = CourseListSerializer
+    permission_classes = [permissions.AllowAny]
+    
+    def get_queryset(self):
+        self.search = CourseFacetSearch(self.request.query_params)
+        return self.search.results()
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data['facets'] = self.search.facet_counts()
+        return response
 
 class CourseLearnAPIView(generics.RetrieveAPIView):
     """
@@ -18,7 +47,7 @@ class CourseLearnAPIView(generics.RetrieveAPIView):
     def get_object(self):
         course = super().get_object()
         # Check if user is enrolled
-        if not Enrollment.objects.filter(user=self.request.user, course=course).exists():
+        if not get_entitlements(self.request).is_enrolled(course):
             raise PermissionError("شما در این دوره ثبت‌نام نکرده‌اید")
         return course
 
@@ -29,41 +58,47 @@ def mark_lesson_complete(request, lesson_id):
     Mark a lesson as completed
     """
     lesson = get_object_or_404(Lesson, id=lesson_id)
+    progress_rows, enrollments, rejected = sync_lesson_progress(request.user, [{
+        'lesson': lesson.id,
+        'completed': True,
+        'client_timestamp': timezone.now(),
+    }])
     
-    # Check if user is enrolled in the course
-    if not Enrollment.objects.filter(user=request.user, course=lesson.course).exists():
+    if rejected:
         return Response(
             {'error': 'شما در این دوره ثبت‌نام نکرده‌اید'}, 
             status=status.HTTP_403_FORBIDDEN
         )
     
-    with transaction.atomic():
-        progress, created = LessonProgress.objects.get_or_create(
-            user=request.user,
-            lesson=lesson,
-            defaults={'is_completed': True}
-        )
-        
-        if not created and not progress.is_completed:
-            progress.is_completed = True
-            progress.save()
-        
-        # Check if all lessons are completed to mark course as completed
-        total_lessons = lesson.course.lessons.count()
-        completed_lessons = LessonProgress.objects.filter(
-            user=request.user,
-            lesson__course=lesson.course,
-            is_completed=True
-        ).count()
-        
-        if total_lessons == completed_lessons:
-            enrollment = Enrollment.objects.get(user=request.user, course=lesson.course)
-            enrollment.is_completed = True
-            enrollment.save()
-    
-    serializer = LessonProgressSerializer(progress)
+    serializer = LessonProgressSerializer(progress_rows[0])
     return Response(serializer.data, status=status.HTTP_200_OK)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_progress(request):
+    """
+    Apply a batch of offline lesson-progress events and return the merged state
+    """
+    serializer = LessonProgressSyncSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    progress_rows, enrollments, rejected = sync_lesson_progress(
+        request.user, serializer.validated_data['events']
+    )
+    
+    return Response({
+        'progress': LessonProgressSerializer(progress_rows, many=True).data,
+        'enrollments': [
+            {
+                'id': enrollment.id,
+                'course': enrollment.course_id,
+                'progress_percentage': enrollment.progress_percentage,
+            }
+            for enrollment in enrollments
+        ],
+        'rejected_lessons': rejected,
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def update_watch_time(request, lesson_id):
@@ -74,7 +109,7 @@ def update_watch_time(request, lesson_id):
     watch_time = request.data.get('watch_time', 0)
     
     # Check if user is enrolled in the course
-    if not Enrollment.objects.filter(user=request.user, course=lesson.course).exists():
+    if not get_entitlements(request).is_enrolled(lesson.module.course_id):
         return Response(
             {'error': 'شما در این دوره ثبت‌نام نکرده‌اید'}, 
             status=status.HTTP_403_FORBIDDEN
@@ -119,6 +154,51 @@ def enroll_course(request, course_slug):
         'enrollment': serializer.data
     }, status=status_code)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_enroll_course(request, course_slug):
+    """
+    Enroll a set of institution members (or any users, for staff) in a course
+    """
+    course = get_object_or_404(Course, slug=course_slug, status='published')
+    institution_id = request.data.get('institution_id')
+    try:
+        institution_id = int(institution_id) if institution_id else None
+    except (TypeError, ValueError):
+        return Response({'error': 'شناسه موسسه نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+    institution = get_object_or_404(Institution, id=institution_id) if institution_id else None
+    
+    is_staff = request.user.is_staff or request.user.user_type == 'admin'
+    if institution is None and not is_staff:
+        return Response({'error': 'شناسه موسسه الزامی است'}, status=status.HTTP_400_BAD_REQUEST)
+    if institution is not None and not is_staff and not InstitutionUser.objects.filter(
+        institution=institution, user=request.user, role__in=['admin', 'manager'], is_active=True
+    ).exists():
+        return Response({'error': 'شما اجازه ثبت‌نام گروهی برای این موسسه را ندارید'}, status=status.HTTP_403_FORBIDDEN)
+    
+    user_ids = request.data.get('user_ids')
+    if user_ids is None and institution is not None:
+        # Default to every active member of the institution
+        user_ids = InstitutionUser.objects.filter(
+            institution=institution, is_active=True
+        ).values_list('user_id', flat=True)
+    try:
+        user_ids = [int(user_id) for user_id in user_ids or []]
+    except (TypeError, ValueError):
+        return Response({'error': 'شناسه کاربران نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+    if not user_ids:
+        return Response({'error': 'هیچ کاربری انتخاب نشده است'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        result = bulk_enroll(course, user_ids, institution=institution)
+    except BulkEnrollmentError as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    
+    return Response({
+        'message': f'{len(result["created_user_ids"])} کاربر در دوره ثبت‌نام شدند',
+        **result
+    }, status=status.HTTP_201_CREATED if result['created_user_ids'] else status.HTTP_200_OK)
+
 class UserCoursesAPIView(generics.ListAPIView):
     """
     List user's enrolled courses
@@ -128,3 +208,48 @@ class UserCoursesAPIView(generics.ListAPIView):
     
     def get_queryset(self):
         return Enrollment.objects.filter(user=self.request.user).select_related('course')
+
+class RecommendedCoursesAPIView(generics.ListAPIView):
+    """
+    Courses recommended for the current user from precomputed co-enrollment
+    """
+    serializer_class = CourseListSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    
+    def get_queryset(self):
+        return recommended_for_user(self.request.user, limit=10)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def instructor_course_analytics(request):
+    """
+    Rolled-up performance of the current instructor's courses
+    """
+    instructor = request.user
+    instructor_id = request.query_params.get('instructor')
+    if instructor_id and (request.user.is_staff or request.user.user_type == 'admin'):
+        instructor = get_object_or_404(User, id=instructor_id)
+    
+    try:
+        days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+    except ValueError:
+        return Response({'error': 'تعداد روز نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'days': days,
+        'courses': instructor_analytics(instructor, days=days),
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def course_lesson_funnel(request, course_slug):
+    """
+    Per-lesson reach/completion funnel of a course for charting
+    """
+    course = get_object_or_404(Course, slug=course_slug)
+    is_staff = request.user.is_staff or request.user.user_type == 'admin'
+    if course.instructor_id != request.user.id and not is_staff:
+        return Response({'error': 'شما اجازه مشاهده آمار این دوره را ندارید'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(lesson_funnel(course.id))
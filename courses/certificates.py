@@ -0,0 +1,144 @@
+import io
+import logging
+import uuid
+
+import jdatetime
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from PIL import Image, ImageDraw, ImageFont, features
+
+from .models import Certificate, Enrollment
+
+logger = logging.getLogger(__name__)
+
+CERTIFICATE_SIZE = (1600, 1130)
+CERTIFICATE_COUNT_CACHE_TIMEOUT = 60 * 60
+
+
+def certificate_count_cache_key(user_id):
+    return f'courses:certificate_count:{user_id}'
+
+
+def certificate_count(user):
+    """Number of certificates a user holds, cached until a new one is issued"""
+    key = certificate_count_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Certificate.objects.filter(enrollment__user=user).count()
+        cache.set(key, count, CERTIFICATE_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def _font(size):
+    # Pillow's built-in font has no Persian glyphs, so there is no fallback
+    font_path = getattr(settings, 'CERTIFICATE_FONT_PATH', '')
+    if not font_path:
+        raise ImproperlyConfigured('CERTIFICATE_FONT_PATH must point to a TrueType font with Persian glyphs')
+    layout_engine = ImageFont.Layout.RAQM if features.check('raqm') else ImageFont.Layout.BASIC
+    return ImageFont.truetype(font_path, size, layout_engine=layout_engine)
+
+
+def _shape(text):
+    """Join Persian letters and order the text right to left for drawing"""
+    if features.check('raqm'):
+        # libraqm shapes and reorders the text itself
+        return text
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def render_certificate(enrollment, certificate_number):
+    """Draw the certificate image and return it as PNG bytes"""
+    image = Image.new('RGB', CERTIFICATE_SIZE, '#ffffff')
+    draw = ImageDraw.Draw(image)
+    width, height = CERTIFICATE_SIZE
+    color = enrollment.course.category.color or '#007bff'
+    draw.rectangle([30, 30, width - 30, height - 30], outline=color, width=12)
+    draw.rectangle([60, 60, width - 60, height - 60], outline=color, width=2)
+
+    completed_at = jdatetime.datetime.fromgregorian(datetime=timezone.localtime(enrollment.completed_at or timezone.now()))
+    lines = [
+        (_('Certificate of Completion'), _font(72), 220),
+        (enrollment.user.full_name or enrollment.user.email, _font(64), 420),
+        (enrollment.course.title, _font(52), 580),
+        (completed_at.strftime('%Y/%m/%d'), _font(40), 760),
+        (certificate_number, _font(32), 900),
+    ]
+    for text, font, y in lines:
+        draw.text((width / 2, y), _shape(text), fill='#222222', font=font, anchor='mm')
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def issue_certificate(enrollment_id):
+    """
+    Mark a fully completed enrollment as completed and issue its certificate.
+
+    Safe to call repeatedly: enrollments that are not at 100% are ignored and
+    a certificate is only rendered once. Returns the certificate, or None.
+    """
+    enrollment = (
+        Enrollment.objects.select_related('user', 'course__category')
+        .filter(pk=enrollment_id, progress_percentage__gte=100)
+        .first()
+    )
+    if enrollment is None:
+        return None
+
+    if enrollment.completed_at is None:
+        now = timezone.now()
+        Enrollment.objects.filter(pk=enrollment.pk, completed_at__isnull=True).update(
+            status='completed', completed_at=now
+        )
+        enrollment.status, enrollment.completed_at = 'completed', now
+
+    existing = Certificate.objects.filter(enrollment=enrollment).first()
+    if existing is not None:
+        return existing
+
+    certificate_number = f'SRM-{enrollment.course_id}-{uuid.uuid4().hex[:10].upper()}'
+    content = render_certificate(enrollment, certificate_number)
+    certificate = Certificate(enrollment=enrollment, certificate_number=certificate_number)
+    try:
+        with transaction.atomic():
+            certificate.file.save(f'{certificate_number}.png', ContentFile(content), save=False)
+            certificate.save()
+    except IntegrityError:
+        # Another worker issued it first
+        certificate.file.delete(save=False)
+        return Certificate.objects.filter(enrollment=enrollment).first()
+    return certificate
+
+
+def pending_completion_ids(limit=None, after_id=0):
+    """Enrollments at 100% that have no certificate yet, in id order"""
+    queryset = Enrollment.objects.filter(
+        id__gt=after_id,
+        progress_percentage__gte=100,
+        certificate__isnull=True,
+    ).order_by('id').values_list('id', flat=True)
+    return list(queryset[:limit] if limit else queryset)
+
+
+def queue_completions(enrollment_ids):
+    """
+    Hand completed enrollments to the background worker. If the broker is
+    unreachable they stay pending and the process_course_completions
+    command picks them up later.
+    """
+    from .tasks import issue_certificate_task
+
+    for enrollment_id in enrollment_ids:
+        try:
+            issue_certificate_task.delay(enrollment_id)
+        except Exception:
+            logger.warning('Could not queue certificate for enrollment %s', enrollment_id, exc_info=True)
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .entitlements import get_entitlements
+
+
+def entitlements(request):
+    """Expose the user's course/test entitlements, loaded only if a template uses them"""
+    return {'entitlements': SimpleLazyObject(lambda: get_entitlements(request))}
@@ -0,0 +1,109 @@
+from django.core.cache import cache
+
+from .models import CourseModule, Lesson
+
+
+CURRICULUM_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def curriculum_cache_key(course_id):
+    return f'courses:curriculum:{course_id}'
+
+
+class CurriculumSnapshot:
+    """
+    Ordered module/lesson outline of a course.
+
+    Only the compact ``data`` tuples are cached; the lookup tables below are
+    rebuilt in memory on load so navigation is a dictionary access.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.modules = [
+            {'id': module_id, 'title': title, 'order': order, 'lesson_ids': list(lesson_ids)}
+            for module_id, title, order, lesson_ids in data['modules']
+        ]
+        self.lesson_ids = [lesson_id for module in self.modules for lesson_id in module['lesson_ids']]
+        self.lessons = {}
+        self.position = {lesson_id: index for index, lesson_id in enumerate(self.lesson_ids)}
+        for lesson_id, module_id, title, lesson_type, duration, is_preview in data['lessons']:
+            self.lessons[lesson_id] = {
+                'id': lesson_id,
+                'module_id': module_id,
+                'title': title,
+                'lesson_type': lesson_type,
+                'duration_minutes': duration,
+                'is_preview': is_preview,
+            }
+        self.modules_by_id = {module['id']: module for module in self.modules}
+
+    @property
+    def total_duration_minutes(self):
+        return self.data['total_duration']
+
+    @property
+    def lesson_count(self):
+        return len(self.lesson_ids)
+
+    def get_lesson(self, lesson_id):
+        return self.lessons.get(lesson_id)
+
+    def get_module(self, module_id):
+        return self.modules_by_id.get(module_id)
+
+    def previous_lesson(self, lesson_id):
+        index = self.position.get(lesson_id)
+        if not index:
+            return None
+        return self.lessons[self.lesson_ids[index - 1]]
+
+    def next_lesson(self, lesson_id):
+        index = self.position.get(lesson_id)
+        if index is None or index + 1 >= len(self.lesson_ids):
+            return None
+        return self.lessons[self.lesson_ids[index + 1]]
+
+    def first_incomplete_lesson(self, completed_ids):
+        for lesson_id in self.lesson_ids:
+            if lesson_id not in completed_ids:
+                return self.lessons[lesson_id]
+        return None
+
+
+def build_curriculum_data(course_id):
+    """Walk modules and lessons in order with two queries"""
+    modules = list(
+        CourseModule.objects.filter(course_id=course_id)
+        .order_by('order')
+        .values_list('id', 'title', 'order')
+    )
+    lessons = list(
+        Lesson.objects.filter(module__course_id=course_id)
+        .order_by('module__order', 'order')
+        .values_list('id', 'module_id', 'title', 'lesson_type', 'duration_minutes', 'is_preview')
+    )
+    lesson_ids_by_module = {}
+    for lesson in lessons:
+        lesson_ids_by_module.setdefault(lesson[1], []).append(lesson[0])
+    return {
+        'modules': [
+            (module_id, title, order, tuple(lesson_ids_by_module.get(module_id, ())))
+            for module_id, title, order in modules
+        ],
+        'lessons': lessons,
+        'total_duration': sum(lesson[4] or 0 for lesson in lessons),
+    }
+
+
+def get_curriculum(course_id):
+    key = curriculum_cache_key(course_id)
+    data = cache.get(key)
+    if data is None:
+        data = build_curriculum_data(course_id)
+        cache.set(key, data, CURRICULUM_CACHE_TIMEOUT)
+    return CurriculumSnapshot(data)
+
+
+def invalidate_curriculum(course_id):
+    cache.delete(curriculum_cache_key(course_id))
@@ -0,0 +1,107 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from sales.models import InstitutionSubscription, InstitutionUser
+from .entitlements import invalidate_entitlements
+from .models import Course, Enrollment
+
+
+class BulkEnrollmentError(Exception):
+    """Raised when a bulk enrollment cannot be applied as a whole"""
+
+
+def active_subscription(institution, lock=False):
+    """The institution's current subscription, optionally row-locked"""
+    queryset = InstitutionSubscription.objects.filter(
+        institution=institution,
+        status='active',
+        end_date__gte=timezone.now().date(),
+    ).select_related('package').order_by('-end_date')
+    if lock:
+        queryset = queryset.select_for_update(of=('self',))
+    return queryset.first()
+
+
+def bulk_enroll(course, user_ids, institution=None):
+    """
+    Enroll many users in a course with a constant number of queries.
+
+    Users that already have an enrollment are skipped with one lookup, the
+    rest are inserted with a single ``bulk_create`` (retried without the
+    users someone else enrolled meanwhile),
+    ``Course.enrollment_count`` is bumped once and the new members' cached
+    entitlements are dropped on commit. When an institution is given, only
+    its active members are enrolled and every new seat is charged to
+    ``InstitutionSubscription.courses_used`` under a row lock, so
+    concurrent batches cannot overrun ``package.max_courses``; a batch that
+    does not fit is rejected as a whole.
+    """
+    requested = set(user_ids)
+    result = {
+        'requested': len(requested),
+        'created_user_ids': [],
+        'already_enrolled_user_ids': [],
+        'non_member_user_ids': [],
+    }
+
+    with transaction.atomic():
+        subscription = None
+        if institution is not None:
+            subscription = active_subscription(institution, lock=True)
+            if subscription is None:
+                raise BulkEnrollmentError('این موسسه اشتراک فعالی ندارد')
+            members = set(InstitutionUser.objects.filter(
+                institution=institution,
+                is_active=True,
+                user_id__in=requested,
+            ).values_list('user_id', flat=True))
+            result['non_member_user_ids'] = sorted(requested - members)
+            requested = members
+
+        existing, conflict = None, None
+        while True:
+            previous, existing = existing, set(Enrollment.objects.filter(
+                course=course,
+                user_id__in=requested,
+            ).values_list('user_id', flat=True))
+            if conflict is not None and existing == previous:
+                # No one else enrolled in the meantime, so the failure was something else
+                raise conflict
+            to_create = sorted(requested - existing)
+
+            if subscription is not None:
+                remaining = subscription.package.max_courses - subscription.courses_used
+                if len(to_create) > remaining:
+                    raise BulkEnrollmentError(
+                        f'ظرفیت اشتراک کافی نیست ({remaining} جایگاه باقی‌مانده، {len(to_create)} مورد نیاز)'
+                    )
+            if not to_create:
+                break
+
+            # Conflicts are not ignored: a batch that inserts at all inserted every
+            # row, so the counters below are charged exactly. A user enrolled
+            # concurrently rolls the batch back and it is retried without them.
+            try:
+                with transaction.atomic():
+                    Enrollment.objects.bulk_create(
+                        [Enrollment(user_id=user_id, course=course) for user_id in to_create],
+                        batch_size=500,
+                    )
+            except IntegrityError as exc:
+                conflict = exc
+                continue
+            break
+        result['already_enrolled_user_ids'] = sorted(existing)
+
+        if to_create:
+            Course.objects.filter(pk=course.pk).update(enrollment_count=F('enrollment_count') + len(to_create))
+            if subscription is not None:
+                InstitutionSubscription.objects.filter(pk=subscription.pk).update(
+                    courses_used=F('courses_used') + len(to_create)
+                )
+            # bulk_create bypasses the post_save signal
+            transaction.on_commit(lambda: invalidate_entitlements(to_create))
+
+    result['created_user_ids'] = to_create
+    return result
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+
+from tests.models import TestPurchase
+from .models import CoursePurchase, Enrollment
+
+
+ENTITLEMENTS_CACHE_TIMEOUT = 60 * 60
+
+
+def entitlements_cache_key(user_id):
+    return f'courses:entitlements:{user_id}'
+
+
+def _object_id(obj):
+    return getattr(obj, 'pk', obj)
+
+
+class UserEntitlements:
+    """
+    Ids of the courses and tests a user owns, so "enrolled"/"purchased"
+    badges across a whole page are set lookups instead of one query each.
+    """
+
+    def __init__(self, enrolled_course_ids=(), purchased_course_ids=(), purchased_test_ids=()):
+        self.enrolled_course_ids = frozenset(enrolled_course_ids)
+        self.purchased_course_ids = frozenset(purchased_course_ids)
+        self.purchased_test_ids = frozenset(purchased_test_ids)
+
+    def is_enrolled(self, course):
+        return _object_id(course) in self.enrolled_course_ids
+
+    def has_purchased_course(self, course):
+        return _object_id(course) in self.purchased_course_ids
+
+    def has_purchased_test(self, test):
+        return _object_id(test) in self.purchased_test_ids
+
+
+def load_entitlements(user_id):
+    return UserEntitlements(
+        Enrollment.objects.filter(user_id=user_id).values_list('course_id', flat=True),
+        CoursePurchase.objects.filter(user_id=user_id).values_list('course_id', flat=True),
+        TestPurchase.objects.filter(user_id=user_id).values_list('test_id', flat=True),
+    )
+
+
+def get_user_entitlements(user):
+    """A user's entitlements, cached until one of their enrollments or purchases changes"""
+    if not user.is_authenticated:
+        return UserEntitlements()
+    key = entitlements_cache_key(user.pk)
+    entitlements = cache.get(key)
+    if entitlements is None:
+        entitlements = load_entitlements(user.pk)
+        cache.set(key, entitlements, ENTITLEMENTS_CACHE_TIMEOUT)
+    return entitlements
+
+
+def get_entitlements(request):
+    """Entitlements of the requesting user, loaded at most once per request"""
+    if not hasattr(request, '_entitlements'):
+        request._entitlements = get_user_entitlements(request.user)
+    return request._entitlements
+
+
+def invalidate_entitlements(user_ids):
+    cache.delete_many([entitlements_cache_key(user_id) for user_id in user_ids])
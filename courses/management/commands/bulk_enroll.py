@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from courses.enrollment import BulkEnrollmentError, bulk_enroll
+from courses.models import Course
+from sales.models import Institution, InstitutionUser
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Enroll many users in a course at once, optionally charging an institution subscription'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_slug', help='Slug of the course to enroll users in')
+        parser.add_argument('--institution', type=int, help='Institution id; defaults the user set to its active members')
+        parser.add_argument('--emails', help='Comma-separated user emails')
+        parser.add_argument('--file', help='Path to a file with one user email per line')
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(slug=options['course_slug'])
+        except Course.DoesNotExist:
+            raise CommandError(f'Course "{options["course_slug"]}" does not exist')
+
+        institution = None
+        if options['institution']:
+            try:
+                institution = Institution.objects.get(pk=options['institution'])
+            except Institution.DoesNotExist:
+                raise CommandError(f'Institution {options["institution"]} does not exist')
+
+        emails = set()
+        if options['emails']:
+            emails.update(e.strip() for e in options['emails'].split(',') if e.strip())
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as handle:
+                emails.update(line.strip() for line in handle if line.strip())
+
+        if emails:
+            found = dict(User.objects.filter(email__in=emails).values_list('email', 'id'))
+            missing = emails - set(found)
+            if missing:
+                self.stdout.write(self.style.WARNING(f'{len(missing)} emails have no account: {", ".join(sorted(missing))}'))
+            user_ids = list(found.values())
+        elif institution is not None:
+            user_ids = list(InstitutionUser.objects.filter(
+                institution=institution, is_active=True
+            ).values_list('user_id', flat=True))
+        else:
+            raise CommandError('Provide --emails, --file or --institution')
+
+        try:
+            result = bulk_enroll(course, user_ids, institution=institution)
+        except BulkEnrollmentError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'Already enrolled: {len(result["already_enrolled_user_ids"])}')
+        if institution is not None:
+            self.stdout.write(f'Not institution members: {len(result["non_member_user_ids"])}')
+        self.stdout.write(self.style.SUCCESS(f'Successfully enrolled {len(result["created_user_ids"])} users in {course.title}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from courses.recommendations import DEFAULT_TOP_K, DEFAULT_USER_CHUNK, compute_course_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Compute co-enrollment course recommendations from enrollments and purchases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Neighbours stored per course')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_USER_CHUNK, help='Users per matrix block')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Computing course recommendations...')
+        written = compute_course_recommendations(top_k=options['top_k'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully stored {written} course recommendations'))
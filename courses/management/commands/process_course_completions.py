@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from courses.certificates import issue_certificate, pending_completion_ids
+
+
+class Command(BaseCommand):
+    help = 'Complete enrollments at 100% progress and issue their certificates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Enrollments handled per batch')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processing course completions...')
+        processed = issued = 0
+        last_id = 0
+        while True:
+            batch = pending_completion_ids(limit=options['batch_size'], after_id=last_id)
+            if not batch:
+                break
+            for enrollment_id in batch:
+                if issue_certificate(enrollment_id) is not None:
+                    issued += 1
+                processed += 1
+            last_id = batch[-1]
+            self.stdout.write(f'Processed {processed} enrollments')
+        self.stdout.write(self.style.SUCCESS(f'Successfully issued {issued} certificates'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from courses.ratings import recompute_course_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute course rating averages and star distributions from approved reviews'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recomputing course ratings...')
+        rated = recompute_course_ratings()
+        self.stdout.write(self.style.SUCCESS(f'Successfully recomputed ratings ({rated} courses with approved reviews)'))
@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from courses.analytics import rollup_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Compute per-course daily analytics rollups for instructors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to roll up (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--days', type=int, default=1, help='Number of days ending at --date to roll up')
+        parser.add_argument('--course', type=int, action='append', dest='courses', help='Restrict to a course id (repeatable)')
+
+    def handle(self, *args, **options):
+        try:
+            end = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--date must be in YYYY-MM-DD format')
+
+        for offset in range(options['days'] - 1, -1, -1):
+            day = end - timedelta(days=offset)
+            written = rollup_course_stats(day, course_ids=options['courses'])
+            self.stdout.write(f'{day}: {written} courses')
+        self.stdout.write(self.style.SUCCESS('Successfully rolled up course statistics'))
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_coursecategory_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='1-Star Reviews'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='2-Star Reviews'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='3-Star Reviews'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='4-Star Reviews'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='5-Star Reviews'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Rating Sum'),
+        ),
+    ]
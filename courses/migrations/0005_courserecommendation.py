@@ -0,0 +1,31 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Similarity Score')),
+                ('rank', models.PositiveIntegerField(verbose_name='Rank')),
+                ('computed_at', models.DateTimeField(auto_now_add=True, verbose_name='Computed At')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='courses.course', verbose_name='Course')),
+                ('recommended_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.course', verbose_name='Recommended Course')),
+            ],
+            options={
+                'verbose_name': 'Course Recommendation',
+                'verbose_name_plural': 'Course Recommendations',
+                'ordering': ['course', 'rank'],
+                'unique_together': {('course', 'recommended_course')},
+            },
+        ),
+    ]
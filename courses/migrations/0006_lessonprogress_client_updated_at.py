@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_courserecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='client_updated_at',
+            field=models.DateTimeField(blank=True, help_text='Client timestamp of the last applied progress event', null=True, verbose_name='Client Updated At'),
+        ),
+    ]
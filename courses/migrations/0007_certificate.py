@@ -0,0 +1,29 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_lessonprogress_client_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Certificate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certificate_number', models.CharField(max_length=32, unique=True, verbose_name='Certificate Number')),
+                ('file', models.ImageField(upload_to='courses/certificates/', verbose_name='Certificate File')),
+                ('issued_at', models.DateTimeField(auto_now_add=True, verbose_name='Issued At')),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='certificate', to='courses.enrollment', verbose_name='Enrollment')),
+            ],
+            options={
+                'verbose_name': 'Certificate',
+                'verbose_name_plural': 'Certificates',
+                'ordering': ['-issued_at'],
+            },
+        ),
+    ]
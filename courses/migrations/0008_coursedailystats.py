@@ -0,0 +1,39 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_certificate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('new_enrollments', models.PositiveIntegerField(default=0, verbose_name='New Enrollments')),
+                ('completions', models.PositiveIntegerField(default=0, verbose_name='Completions')),
+                ('lessons_completed', models.PositiveIntegerField(default=0, verbose_name='Lessons Completed')),
+                ('purchases', models.PositiveIntegerField(default=0, verbose_name='Purchases')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Revenue')),
+                ('total_enrollments', models.PositiveIntegerField(default=0, verbose_name='Total Enrollments')),
+                ('completed_enrollments', models.PositiveIntegerField(default=0, verbose_name='Completed Enrollments')),
+                ('average_progress', models.FloatField(default=0, verbose_name='Average Progress')),
+                ('watch_time_seconds', models.PositiveBigIntegerField(default=0, verbose_name='Watch Time (Seconds)')),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Revenue')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Computed At')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='courses.course', verbose_name='Course')),
+            ],
+            options={
+                'verbose_name': 'Course Daily Stats',
+                'verbose_name_plural': 'Course Daily Stats',
+                'ordering': ['course', '-date'],
+                'unique_together': {('course', 'date')},
+            },
+        ),
+    ]
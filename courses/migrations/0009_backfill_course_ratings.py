@@ -0,0 +1,47 @@
+# Generated by Django 4.2.24 on 2026-10-19 10:05
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+STARS = range(1, 6)
+
+
+def backfill_course_ratings(apps, schema_editor):
+    # Mirrors courses.ratings.recompute_course_ratings with the historical models
+    Course = apps.get_model('courses', 'Course')
+    CourseReview = apps.get_model('courses', 'CourseReview')
+
+    rows = (
+        CourseReview.objects.filter(is_approved=True)
+        .values('enrollment__course_id')
+        .annotate(
+            total=Count('id'),
+            score=Sum('rating'),
+            **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in STARS},
+        )
+        .order_by()
+    )
+    courses = []
+    for row in rows:
+        course = Course(pk=row['enrollment__course_id'])
+        course.review_count = row['total']
+        course.rating_sum = row['score'] or 0
+        course.rating = course.rating_sum / course.review_count if course.review_count else 0
+        for star in STARS:
+            setattr(course, f'rating_{star}_count', row[f'stars_{star}'])
+        courses.append(course)
+
+    fields = ['review_count', 'rating_sum', 'rating'] + [f'rating_{star}_count' for star in STARS]
+    Course.objects.exclude(pk__in=[course.pk for course in courses]).update(**{field: 0 for field in fields})
+    Course.objects.bulk_update(courses, fields, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_coursedailystats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_course_ratings, migrations.RunPython.noop),
+    ]
@@ -77,6 +77,14 @@ class Course(models.Model):
     rating = models.FloatField(default=0, validators=[MinValueValidator(0), MaxValueValidator(5)], verbose_name=_('Rating'))
     review_count = models.PositiveIntegerField(default=0, verbose_name=_('Review Count'))
     
+    # Approved-review aggregates, maintained incrementally by courses.signals
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name=_('Rating Sum'))
+    rating_1_count = models.PositiveIntegerField(default=0, verbose_name=_('1-Star Reviews'))
+    rating_2_count = models.PositiveIntegerField(default=0, verbose_name=_('2-Star Reviews'))
+    rating_3_count = models.PositiveIntegerField(default=0, verbose_name=_('3-Star Reviews'))
+    rating_4_count = models.PositiveIntegerField(default=0, verbose_name=_('4-Star Reviews'))
+    rating_5_count = models.PositiveIntegerField(default=0, verbose_name=_('5-Star Reviews'))
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -105,6 +113,11 @@ class Course(models.Model):
         if self.discount_price and self.price > 0:
             return int(((self.price - self.discount_price) / self.price) * 100)
         return 0
+    
+    @property
+    def rating_distribution(self):
+        """Number of approved reviews for each star value, 1 through 5"""
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
 
 
 class CourseModule(models.Model):
@@ -199,6 +212,7 @@ class LessonProgress(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Completed At'))
     time_spent = models.PositiveIntegerField(default=0, help_text=_('Time spent in seconds'), verbose_name=_('Time Spent'))
     last_position = models.PositiveIntegerField(default=0, help_text=_('Last position in video (seconds)'), verbose_name=_('Last Position'))
+    client_updated_at = models.DateTimeField(blank=True, null=True, help_text=_('Client timestamp of the last applied progress event'), verbose_name=_('Client Updated At'))
     
     class Meta:
         verbose_name = _('Lesson Progress')
@@ -246,4 +260,77 @@ class CoursePurchase(models.Model):
         unique_together = ['user', 'course']
     
     def __str__(self):
-        return f"{self.user.full_name} purchased {self.course.title}"
\ No newline at end of file
+        return f"{self.user.full_name} purchased {self.course.title}"
+
+class CourseRecommendation(models.Model):
+    """Precomputed "students also took" neighbours for a course"""
+    
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='recommendations', verbose_name=_('Course'))
+    recommended_course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+', verbose_name=_('Recommended Course'))
+    score = models.FloatField(verbose_name=_('Similarity Score'))
+    rank = models.PositiveIntegerField(verbose_name=_('Rank'))
+    computed_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Computed At'))
+    
+    class Meta:
+        verbose_name = _('Course Recommendation')
+        verbose_name_plural = _('Course Recommendations')
+        ordering = ['course', 'rank']
+        unique_together = ['course', 'recommended_course']
+    
+    def __str__(self):
+        return f"{self.course.title} -> {self.recommended_course.title} ({self.score:.2f})"
+
+
+class Certificate(models.Model):
+    """Completion certificates issued for finished enrollments"""
+    
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='certificate', verbose_name=_('Enrollment'))
+    certificate_number = models.CharField(max_length=32, unique=True, verbose_name=_('Certificate Number'))
+    file = models.ImageField(upload_to='courses/certificates/', verbose_name=_('Certificate File'))
+    issued_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Issued At'))
+    
+    class Meta:
+        verbose_name = _('Certificate')
+        verbose_name_plural = _('Certificates')
+        ordering = ['-issued_at']
+    
+    def __str__(self):
+        return f"Certificate {self.certificate_number} for {self.enrollment}"
+
+
+class CourseDailyStats(models.Model):
+    """Per-course, per-day analytics rollup for instructors"""
+    
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats', verbose_name=_('Course'))
+    date = models.DateField(verbose_name=_('Date'))
+    
+    # Activity during the day
+    new_enrollments = models.PositiveIntegerField(default=0, verbose_name=_('New Enrollments'))
+    completions = models.PositiveIntegerField(default=0, verbose_name=_('Completions'))
+    lessons_completed = models.PositiveIntegerField(default=0, verbose_name=_('Lessons Completed'))
+    purchases = models.PositiveIntegerField(default=0, verbose_name=_('Purchases'))
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_('Revenue'))
+    
+    # Course totals as of the rollup
+    total_enrollments = models.PositiveIntegerField(default=0, verbose_name=_('Total Enrollments'))
+    completed_enrollments = models.PositiveIntegerField(default=0, verbose_name=_('Completed Enrollments'))
+    average_progress = models.FloatField(default=0, verbose_name=_('Average Progress'))
+    watch_time_seconds = models.PositiveBigIntegerField(default=0, verbose_name=_('Watch Time (Seconds)'))
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_('Total Revenue'))
+    
+    computed_at = models.DateTimeField(auto_now=True, verbose_name=_('Computed At'))
+    
+    class Meta:
+        verbose_name = _('Course Daily Stats')
+        verbose_name_plural = _('Course Daily Stats')
+        ordering = ['course', '-date']
+        unique_together = ['course', 'date']
+    
+    def __str__(self):
+        return f"{self.course.title} - {self.date}"
+    
+    @property
+    def completion_rate(self):
+        if not self.total_enrollments:
+            return 0
+        return round(self.completed_enrollments / self.total_enrollments * 100, 1)
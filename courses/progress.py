@@ -0,0 +1,141 @@
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .certificates import queue_completions
+from .models import Enrollment, Lesson, LessonProgress
+
+
+def refresh_enrollment_progress(enrollment_ids):
+    """
+    Recompute ``progress_percentage`` for many enrollments with one GROUP BY
+    over completed lessons and one over course lesson totals, queueing
+    enrollments that just reached 100% for completion. Returns the
+    enrollments that were updated.
+    """
+    enrollments = list(Enrollment.objects.filter(id__in=enrollment_ids))
+    if not enrollments:
+        return []
+
+    completed = dict(
+        LessonProgress.objects.filter(enrollment_id__in=enrollment_ids, is_completed=True)
+        .values('enrollment_id')
+        .annotate(total=Count('id'))
+        .values_list('enrollment_id', 'total')
+    )
+    totals = dict(
+        Lesson.objects.filter(module__course_id__in={e.course_id for e in enrollments})
+        .values('module__course_id')
+        .annotate(total=Count('id'))
+        .values_list('module__course_id', 'total')
+    )
+
+    now = timezone.now()
+    newly_finished = []
+    for enrollment in enrollments:
+        total = totals.get(enrollment.course_id, 0)
+        done = completed.get(enrollment.id, 0)
+        enrollment.progress_percentage = round(min(done / total, 1) * 100, 1) if total else 0
+        enrollment.last_accessed = now
+        if enrollment.progress_percentage >= 100 and enrollment.completed_at is None:
+            newly_finished.append(enrollment.id)
+    Enrollment.objects.bulk_update(enrollments, ['progress_percentage', 'last_accessed'])
+    if newly_finished:
+        # Completion and certificate rendering happen in the background worker
+        transaction.on_commit(lambda: queue_completions(newly_finished))
+    return enrollments
+
+
+PROGRESS_EVENT_FIELDS = ['is_completed', 'completed_at', 'last_position', 'time_spent', 'client_updated_at']
+
+
+def apply_progress_event(progress, event):
+    """
+    Merge one client event into a LessonProgress row in place, last writer
+    wins by client timestamp and completion is sticky. Returns whether the
+    row changed.
+    """
+    before = [getattr(progress, field) for field in PROGRESS_EVENT_FIELDS]
+    if not progress.client_updated_at or progress.client_updated_at <= event['client_timestamp']:
+        if event.get('position') is not None:
+            progress.last_position = event['position']
+        if event.get('time_spent') is not None:
+            progress.time_spent = event['time_spent']
+        progress.client_updated_at = event['client_timestamp']
+    # The server may hold newer state; a completion still applies
+    if event['completed'] and not progress.is_completed:
+        progress.is_completed = True
+        progress.completed_at = event['client_timestamp']
+    return [getattr(progress, field) for field in PROGRESS_EVENT_FIELDS] != before
+
+
+def sync_lesson_progress(user, events):
+    """
+    Merge a batch of client progress events into LessonProgress.
+
+    ``events`` is a list of dicts with ``lesson`` (id), ``completed``,
+    ``client_timestamp`` and optionally ``position`` and ``time_spent``.
+    Enrollment for every lesson is checked with one query; events for
+    lessons the user is not enrolled in are returned as rejected. For each lesson the newest
+    event wins, and it is only applied if it is newer than what the server
+    already holds (last-writer-wins by client timestamp). Completion is
+    sticky: a later event never un-completes a lesson.
+
+    Returns ``(progress_rows, enrollments, rejected_lesson_ids)``.
+    """
+    latest = {}
+    for event in events:
+        current = latest.get(event['lesson'])
+        if current is None or event['client_timestamp'] >= current['client_timestamp']:
+            completed = event['completed'] or (current is not None and current['completed'])
+            latest[event['lesson']] = {**event, 'completed': completed}
+        elif event['completed']:
+            current['completed'] = True
+
+    enrollment_for_lesson = dict(
+        Lesson.objects.filter(
+            id__in=latest,
+            module__course__enrollments__user=user,
+        ).values_list('id', 'module__course__enrollments__id')
+    )
+    rejected = sorted(set(latest) - set(enrollment_for_lesson))
+
+    with transaction.atomic():
+        existing = {
+            progress.lesson_id: progress
+            for progress in LessonProgress.objects.select_for_update().filter(
+                enrollment_id__in=set(enrollment_for_lesson.values()),
+                lesson_id__in=enrollment_for_lesson,
+            )
+        }
+
+        to_create, to_update = [], []
+        for lesson_id, enrollment_id in enrollment_for_lesson.items():
+            progress = existing.get(lesson_id)
+            if progress is None:
+                progress = LessonProgress(enrollment_id=enrollment_id, lesson_id=lesson_id)
+                apply_progress_event(progress, latest[lesson_id])
+                to_create.append(progress)
+            elif apply_progress_event(progress, latest[lesson_id]):
+                to_update.append(progress)
+
+        # Another sync of the same lesson may insert its row first; those
+        # inserts are skipped here and the event is merged into the winner
+        LessonProgress.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+        if to_create:
+            to_update.extend(
+                progress
+                for progress in LessonProgress.objects.select_for_update().filter(
+                    enrollment_id__in={progress.enrollment_id for progress in to_create},
+                    lesson_id__in=[progress.lesson_id for progress in to_create],
+                )
+                if apply_progress_event(progress, latest[progress.lesson_id])
+            )
+        LessonProgress.objects.bulk_update(to_update, PROGRESS_EVENT_FIELDS, batch_size=500)
+        enrollments = refresh_enrollment_progress(set(enrollment_for_lesson.values()))
+
+    progress_rows = LessonProgress.objects.filter(
+        enrollment_id__in=set(enrollment_for_lesson.values()),
+        lesson_id__in=enrollment_for_lesson,
+    ).select_related('lesson')
+    return list(progress_rows), enrollments, rejected
@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, When
+from django.db.models.functions import Cast, Greatest
+
+from .models import Course, CourseReview
+from .search import bump_catalog_version
+
+
+STARS = range(1, 6)
+
+
+def apply_rating_delta(course_id, rating, delta):
+    """
+    Add (delta=1) or remove (delta=-1) one approved review of the given star
+    value from a course's aggregates in a single UPDATE.
+
+    The average is derived from the same statement's pre-update values, so
+    concurrent reviews cannot leave ``rating`` out of step with the counters.
+    Decrements stop at zero, since aggregates that were never recomputed
+    can miss the review being removed.
+    """
+    def changed(field, amount):
+        value = F(field) + amount
+        return Greatest(value, 0) if amount < 0 else value
+
+    new_sum = changed('rating_sum', rating * delta)
+    new_count = changed('review_count', delta)
+    Course.objects.filter(pk=course_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        rating=Case(
+            When(review_count__gt=-delta, then=Cast(new_sum, FloatField()) / Cast(new_count, FloatField())),
+            default=0.0,
+            output_field=FloatField(),
+        ),
+        **{f'rating_{rating}_count': changed(f'rating_{rating}_count', delta)},
+    )
+
+
+def apply_review_change(old, new):
+    """
+    Move a review's contribution from ``old`` to ``new``.
+
+    Each side is either ``None`` (not counted: missing or unapproved) or a
+    ``(course_id, rating)`` pair.
+    """
+    if old == new:
+        return
+    with transaction.atomic():
+        if old is not None:
+            apply_rating_delta(old[0], old[1], -1)
+        if new is not None:
+            apply_rating_delta(new[0], new[1], 1)
+    bump_catalog_version()
+
+
+def recompute_course_ratings():
+    """
+    Rebuild every course's rating aggregates from approved reviews with a
+    single GROUP BY. Returns the number of courses that have reviews.
+    """
+    rows = (
+        CourseReview.objects.filter(is_approved=True)
+        .values('enrollment__course_id')
+        .annotate(
+            total=Count('id'),
+            score=Sum('rating'),
+            **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in STARS},
+        )
+        .order_by()
+    )
+    courses = []
+    for row in rows:
+        course = Course(pk=row['enrollment__course_id'])
+        course.review_count = row['total']
+        course.rating_sum = row['score'] or 0
+        course.rating = course.rating_sum / course.review_count if course.review_count else 0
+        for star in STARS:
+            setattr(course, f'rating_{star}_count', row[f'stars_{star}'])
+        courses.append(course)
+
+    fields = ['review_count', 'rating_sum', 'rating'] + [f'rating_{star}_count' for star in STARS]
+    with transaction.atomic():
+        Course.objects.exclude(pk__in=[course.pk for course in courses]).update(
+            **{field: 0 for field in fields}
+        )
+        Course.objects.bulk_update(courses, fields, batch_size=500)
+    bump_catalog_version()
+    return len(courses)
@@ -0,0 +1,135 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Course, CoursePurchase, CourseRecommendation, Enrollment
+
+
+DEFAULT_TOP_K = 10
+DEFAULT_USER_CHUNK = 1000
+
+
+def load_interactions():
+    """
+    Return de-duplicated (user_index, course_index) arrays for every
+    enrollment and purchase, plus the course id for each course index.
+    Pairs are sorted by user so that user chunks are contiguous slices.
+    """
+    user_ids, course_ids = [], []
+    for queryset in (
+        Enrollment.objects.values_list('user_id', 'course_id'),
+        CoursePurchase.objects.values_list('user_id', 'course_id'),
+    ):
+        for user_id, course_id in queryset.order_by().iterator(chunk_size=5000):
+            user_ids.append(user_id)
+            course_ids.append(course_id)
+
+    course_index_ids, course_idx = np.unique(np.array(course_ids, dtype=np.int64), return_inverse=True)
+    _, user_idx = np.unique(np.array(user_ids, dtype=np.int64), return_inverse=True)
+
+    n_courses = len(course_index_ids)
+    keys = np.unique(user_idx.astype(np.int64) * max(n_courses, 1) + course_idx)
+    return keys // max(n_courses, 1), keys % max(n_courses, 1), course_index_ids
+
+
+def co_occurrence_matrix(user_idx, course_idx, n_courses, chunk_size=DEFAULT_USER_CHUNK):
+    """
+    Accumulate the item-item co-occurrence matrix X^T X of the binary
+    user x course matrix X, materialising only ``chunk_size`` users of X at
+    a time so memory stays bounded by the number of courses.
+    """
+    counts = np.zeros((n_courses, n_courses), dtype=np.float64)
+    if not len(user_idx):
+        return counts
+    n_users = int(user_idx[-1]) + 1
+    for start in range(0, n_users, chunk_size):
+        end = min(start + chunk_size, n_users)
+        lo, hi = np.searchsorted(user_idx, [start, end])
+        block = np.zeros((end - start, n_courses), dtype=np.float32)
+        block[user_idx[lo:hi] - start, course_idx[lo:hi]] = 1.0
+        counts += block.T @ block
+    return counts
+
+
+def cosine_top_k(counts, top_k=DEFAULT_TOP_K):
+    """
+    Turn co-occurrence counts into cosine similarity and return, for each
+    course index, its neighbours as (indexes, scores) sorted best first.
+    """
+    norms = np.sqrt(np.diag(counts))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = counts / np.outer(norms, norms)
+    similarity = np.nan_to_num(similarity, nan=0.0, posinf=0.0)
+    np.fill_diagonal(similarity, 0.0)
+
+    k = min(top_k, max(similarity.shape[0] - 1, 0))
+    neighbours = []
+    for row in similarity:
+        if k == 0:
+            neighbours.append((np.array([], dtype=np.int64), np.array([])))
+            continue
+        candidates = np.argpartition(-row, k - 1)[:k]
+        candidates = candidates[np.argsort(-row[candidates])]
+        candidates = candidates[row[candidates] > 0]
+        neighbours.append((candidates, row[candidates]))
+    return neighbours
+
+
+def compute_course_recommendations(top_k=DEFAULT_TOP_K, chunk_size=DEFAULT_USER_CHUNK):
+    """
+    Rebuild the CourseRecommendation table from enrollments and purchases.
+    Returns the number of recommendation rows written.
+    """
+    user_idx, course_idx, course_ids = load_interactions()
+    counts = co_occurrence_matrix(user_idx, course_idx, len(course_ids), chunk_size=chunk_size)
+
+    rows = []
+    for index, (neighbour_idx, scores) in enumerate(cosine_top_k(counts, top_k=top_k)):
+        for rank, (neighbour, score) in enumerate(zip(neighbour_idx, scores), start=1):
+            rows.append(CourseRecommendation(
+                course_id=int(course_ids[index]),
+                recommended_course_id=int(course_ids[neighbour]),
+                score=float(score),
+                rank=rank,
+            ))
+
+    with transaction.atomic():
+        CourseRecommendation.objects.all().delete()
+        CourseRecommendation.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def related_courses(course, limit=3):
+    """Precomputed co-enrollment neighbours of a course, best first"""
+    return [
+        recommendation.recommended_course
+        for recommendation in CourseRecommendation.objects.filter(
+            course=course,
+            recommended_course__status='published',
+        ).select_related('recommended_course__category', 'recommended_course__instructor')[:limit]
+    ]
+
+
+def recommended_for_user(user, limit=10):
+    """
+    Courses most similar to everything the user already has, summing the
+    precomputed scores across their courses and excluding owned ones.
+    """
+    owned = set(Enrollment.objects.filter(user=user).values_list('course_id', flat=True))
+    owned.update(CoursePurchase.objects.filter(user=user).values_list('course_id', flat=True))
+    if not owned:
+        return []
+
+    ranked = list(
+        CourseRecommendation.objects.filter(
+            course_id__in=owned,
+            recommended_course__status='published',
+        )
+        .exclude(recommended_course_id__in=owned)
+        .values('recommended_course_id')
+        .annotate(total_score=Sum('score'))
+        .order_by('-total_score')
+        .values_list('recommended_course_id', flat=True)[:limit]
+    )
+    courses = Course.objects.select_related('category', 'instructor').in_bulk(ranked)
+    return [courses[course_id] for course_id in ranked if course_id in courses]
@@ -0,0 +1,208 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
+from django.utils.translation import get_language, gettext_lazy as _
+
+from psychology_institute.utils import bump_cache_version, get_cache_version
+from .models import Course
+
+
+CATALOG_VERSION_KEY = 'courses:catalog_version'
+FACET_CACHE_TIMEOUT = 60 * 15
+
+# Static facets: the set of values is known up front, so all of their counts
+# can be computed in a single aggregate query with conditional counts.
+PRICE_BANDS = [
+    ('free', _('Free'), Q(is_free=True)),
+    ('under_500k', _('Under 500,000'), Q(is_free=False, effective_price__lt=500000)),
+    ('500k_1m', _('500,000 - 1,000,000'), Q(is_free=False, effective_price__gte=500000, effective_price__lt=1000000)),
+    ('1m_2m', _('1,000,000 - 2,000,000'), Q(is_free=False, effective_price__gte=1000000, effective_price__lt=2000000)),
+    ('over_2m', _('Over 2,000,000'), Q(is_free=False, effective_price__gte=2000000)),
+]
+
+DURATION_BANDS = [
+    ('under_5', _('Under 5 hours'), Q(duration_hours__lt=5)),
+    ('5_10', _('5 - 10 hours'), Q(duration_hours__gte=5, duration_hours__lt=10)),
+    ('10_20', _('10 - 20 hours'), Q(duration_hours__gte=10, duration_hours__lt=20)),
+    ('over_20', _('Over 20 hours'), Q(duration_hours__gte=20)),
+]
+
+RATING_BANDS = [
+    ('4', _('4 stars & up'), Q(rating__gte=4)),
+    ('3', _('3 stars & up'), Q(rating__gte=3)),
+    ('2', _('2 stars & up'), Q(rating__gte=2)),
+    ('1', _('1 star & up'), Q(rating__gte=1)),
+]
+
+IS_FREE_VALUES = [
+    ('true', _('Free'), Q(is_free=True)),
+    ('false', _('Paid'), Q(is_free=False)),
+]
+
+DIFFICULTY_VALUES = [
+    (value, label, Q(difficulty=value)) for value, label in Course.DIFFICULTY_CHOICES
+]
+
+STATIC_FACETS = {
+    'difficulty': DIFFICULTY_VALUES,
+    'is_free': IS_FREE_VALUES,
+    'price': PRICE_BANDS,
+    'duration': DURATION_BANDS,
+    'rating': RATING_BANDS,
+}
+
+# Dynamic facets: values come from the data, counted with one GROUP BY each.
+DYNAMIC_FACETS = {
+    'category': 'category_id',
+    'level': 'level',
+    'language': 'language',
+}
+
+FACET_NAMES = list(DYNAMIC_FACETS) + list(STATIC_FACETS)
+
+
+def get_catalog_version():
+    return get_cache_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog payload by moving to a new version"""
+    bump_cache_version(CATALOG_VERSION_KEY)
+
+
+class CourseFacetSearch:
+    """
+    Faceted search over published courses.
+
+    Each facet's counts are computed with the filters of all *other* facets
+    applied, so selecting a value never hides its siblings in the sidebar.
+    The number of queries is fixed: one aggregate for all static facets and
+    one GROUP BY per dynamic facet, regardless of how many values exist.
+    """
+
+    def __init__(self, params):
+        self.search = (params.get('search') or '').strip()
+        self.selected = {}
+        for name in FACET_NAMES:
+            values = []
+            for raw in params.getlist(name) if hasattr(params, 'getlist') else [params.get(name)]:
+                if raw:
+                    values.extend(v.strip() for v in str(raw).split(',') if v.strip())
+            if name == 'category':
+                values = [v for v in values if v.isdigit()]
+            if values:
+                self.selected[name] = sorted(set(values))
+
+    def base_queryset(self):
+        queryset = Course.objects.filter(status='published').annotate(
+            effective_price=Coalesce('discount_price', 'price')
+        )
+        if self.search:
+            queryset = queryset.filter(
+                Q(title__icontains=self.search) |
+                Q(short_description__icontains=self.search) |
+                Q(description__icontains=self.search)
+            )
+        return queryset
+
+    def facet_q(self, name):
+        values = self.selected.get(name)
+        if not values:
+            return Q()
+        if name in DYNAMIC_FACETS:
+            return Q(**{f'{DYNAMIC_FACETS[name]}__in': values})
+        q = Q()
+        for value, label, value_q in STATIC_FACETS[name]:
+            if value in values:
+                q |= value_q
+        # Unknown values select nothing rather than silently matching everything
+        return q if q else Q(pk__in=[])
+
+    def filter_q(self, exclude=None):
+        q = Q()
+        for name in self.selected:
+            if name != exclude:
+                q &= self.facet_q(name)
+        return q
+
+    def results(self):
+        return self.base_queryset().filter(self.filter_q()).select_related('category', 'instructor')
+
+    def cache_key(self):
+        payload = json.dumps({'search': self.search, 'selected': self.selected}, sort_keys=True)
+        digest = hashlib.md5(payload.encode('utf-8')).hexdigest()
+        # The cached facets carry translated labels
+        return f'courses:facets:{get_catalog_version()}:{get_language()}:{digest}'
+
+    def facet_counts(self):
+        key = self.cache_key()
+        facets = cache.get(key)
+        if facets is None:
+            facets = self._compute_facet_counts()
+            cache.set(key, facets, FACET_CACHE_TIMEOUT)
+        return facets
+
+    def _compute_facet_counts(self):
+        base = self.base_queryset()
+        facets = {}
+
+        aggregates = {}
+        for name, values in STATIC_FACETS.items():
+            others = self.filter_q(exclude=name)
+            for value, label, value_q in values:
+                aggregates[f'{name}__{value}'] = Count('id', filter=others & value_q)
+        totals = base.aggregate(**aggregates)
+
+        selected_category_ids = set(self.selected.get('category', []))
+        rows = (
+            base.filter(self.filter_q(exclude='category'))
+            .values('category_id', 'category__name', 'category__slug')
+            .annotate(count=Count('id'))
+            .order_by('category__name')
+        )
+        facets['category'] = [
+            {
+                'value': str(row['category_id']),
+                'label': row['category__name'],
+                'slug': row['category__slug'],
+                'count': row['count'],
+                'selected': str(row['category_id']) in selected_category_ids,
+            }
+            for row in rows
+        ]
+
+        for name in ('level', 'language'):
+            field = DYNAMIC_FACETS[name]
+            selected = set(self.selected.get(name, []))
+            rows = (
+                base.filter(self.filter_q(exclude=name))
+                .values(field)
+                .annotate(count=Count('id'))
+                .order_by(field)
+            )
+            facets[name] = [
+                {
+                    'value': row[field],
+                    'label': row[field],
+                    'count': row['count'],
+                    'selected': row[field] in selected,
+                }
+                for row in rows
+            ]
+
+        for name, values in STATIC_FACETS.items():
+            selected = set(self.selected.get(name, []))
+            facets[name] = [
+                {
+                    'value': value,
+                    'label': str(label),
+                    'count': totals[f'{name}__{value}'],
+                    'selected': value in selected,
+                }
+                for value, label, value_q in values
+            ]
+
+        return facets
@@ -1,10 +1,49 @@
 from rest_framework import serializers
-from .models import Course, Lesson, Enrollment, LessonProgress
+from .models import Course, CourseCategory, Lesson, Enrollment, LessonProgress
+from .entitlements import UserEntitlements, get_entitlements
 from django.contrib.auth import get_user_model
 import jdatetime
 
 User = get_user_model()
 
+class EntitlementsMixin:
+    """Access to the requesting user's entitlements, shared by every item of a list"""
+    
+    @property
+    def entitlements(self):
+        request = self.context.get('request')
+        return get_entitlements(request) if request else UserEntitlements()
+
+class CourseCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CourseCategory
+        fields = ['id', 'name', 'slug', 'icon', 'color']
+
+class CourseListSerializer(EntitlementsMixin, serializers.ModelSerializer):
+    category = CourseCategorySerializer(read_only=True)
+    instructor_name = serializers.CharField(source='instructor.full_name', read_only=True)
+    difficulty_display = serializers.CharField(source='get_difficulty_display', read_only=True)
+    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    rating_distribution = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    is_enrolled = serializers.SerializerMethodField()
+    is_purchased = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Course
+        fields = [
+            'id', 'title', 'slug', 'short_description', 'thumbnail',
+            'category', 'instructor_name', 'difficulty', 'difficulty_display',
+            'level', 'language', 'duration_hours', 'is_free', 'price',
+            'discount_price', 'current_price', 'rating', 'review_count',
+            'rating_distribution', 'enrollment_count', 'is_enrolled', 'is_purchased'
+        ]
+    
+    def get_is_enrolled(self, obj):
+        return self.entitlements.is_enrolled(obj)
+    
+    def get_is_purchased(self, obj):
+        return self.entitlements.has_purchased_course(obj)
+
 class LessonSerializer(serializers.ModelSerializer):
     duration_formatted = serializers.SerializerMethodField()
     is_completed = serializers.SerializerMethodField()
@@ -42,7 +81,7 @@ class LessonSerializer(serializers.ModelSerializer):
                 return False
         return False
 
-class CourseDetailSerializer(serializers.ModelSerializer):
+class CourseDetailSerializer(EntitlementsMixin, serializers.ModelSerializer):
     lessons = LessonSerializer(many=True, read_only=True)
     instructor_name = serializers.CharField(source='instructor.full_name', read_only=True)
     enrollment_status = serializers.SerializerMethodField()
@@ -64,7 +103,7 @@ class CourseDetailSerializer(serializers.ModelSerializer):
     
     def get_enrollment_status(self, obj):
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
+        if request and self.entitlements.is_enrolled(obj):
             try:
                 enrollment = Enrollment.objects.get(user=request.user, course=obj)
                 return {
@@ -129,8 +168,22 @@ class LessonProgressSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = LessonProgress
-        fields = ['id', 'lesson', 'lesson_title', 'is_completed', 'completed_at', 'watch_time']
-        read_only_fields = ['completed_at']
+        fields = [
+            'id', 'lesson', 'lesson_title', 'is_completed', 'completed_at',
+            'time_spent', 'last_position', 'client_updated_at'
+        ]
+        read_only_fields = ['completed_at', 'client_updated_at']
+
+class LessonProgressEventSerializer(serializers.Serializer):
+    """A single progress event recorded by an offline/mobile client"""
+    lesson = serializers.IntegerField(min_value=1)
+    completed = serializers.BooleanField(default=False)
+    position = serializers.IntegerField(min_value=0, required=False)
+    time_spent = serializers.IntegerField(min_value=0, required=False)
+    client_timestamp = serializers.DateTimeField()
+
+class LessonProgressSyncSerializer(serializers.Serializer):
+    events = LessonProgressEventSerializer(many=True, allow_empty=False, max_length=500)
 
 class EnrollmentSerializer(serializers.ModelSerializer):
     course_title = serializers.CharField(source='course.title', read_only=True)
@@ -0,0 +1,113 @@
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+
+from django.core.cache import cache
+
+from tests.models import TestPurchase
+from .models import Certificate, Course, CourseCategory, CourseModule, CoursePurchase, CourseReview, Enrollment, Lesson
+from .certificates import certificate_count_cache_key
+from .curriculum import invalidate_curriculum
+from .entitlements import invalidate_entitlements
+from .ratings import apply_review_change
+from .search import bump_catalog_version
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=CourseCategory)
+def invalidate_course_catalog(sender, **kwargs):
+    """Drop cached facet counts whenever the catalog changes"""
+    bump_catalog_version()
+
+
+@receiver(pre_save, sender=CourseModule)
+def remember_previous_module_course(sender, instance, raw=False, **kwargs):
+    """Capture the stored course so moving a module invalidates the old course too"""
+    instance._previous_course_id = None
+    if instance.pk and not raw:
+        instance._previous_course_id = (
+            CourseModule.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=CourseModule)
+def invalidate_module_curriculum(sender, instance, **kwargs):
+    invalidate_curriculum(instance.course_id)
+    previous = getattr(instance, '_previous_course_id', None)
+    if previous and previous != instance.course_id:
+        invalidate_curriculum(previous)
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_previous_lesson_course(sender, instance, raw=False, **kwargs):
+    """Capture the stored course so moving a lesson invalidates the old course too"""
+    instance._previous_course_id = None
+    if instance.pk and not raw:
+        instance._previous_course_id = (
+            Lesson.objects.filter(pk=instance.pk).values_list('module__course_id', flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_lesson_curriculum(sender, instance, **kwargs):
+    # The module may already be gone when lessons are deleted in its cascade;
+    # the module's own signal has invalidated the course in that case
+    course_id = CourseModule.objects.filter(pk=instance.module_id).values_list('course_id', flat=True).first()
+    if course_id:
+        invalidate_curriculum(course_id)
+    previous = getattr(instance, '_previous_course_id', None)
+    if previous and previous != course_id:
+        invalidate_curriculum(previous)
+
+
+def _review_contribution(is_approved, rating, course_id):
+    return (course_id, rating) if is_approved and course_id else None
+
+
+@receiver(pre_save, sender=CourseReview)
+def remember_previous_review(sender, instance, raw=False, **kwargs):
+    """Capture the stored state so post_save can apply only the difference"""
+    previous = None
+    if instance.pk and not raw:
+        previous = (
+            CourseReview.objects.filter(pk=instance.pk)
+            .values('is_approved', 'rating', 'enrollment__course_id')
+            .first()
+        )
+    instance._previous_contribution = previous and _review_contribution(
+        previous['is_approved'], previous['rating'], previous['enrollment__course_id']
+    )
+
+
+@receiver(post_save, sender=CourseReview)
+def update_course_rating_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    course_id = Enrollment.objects.filter(pk=instance.enrollment_id).values_list('course_id', flat=True).first()
+    current = _review_contribution(instance.is_approved, int(instance.rating), course_id)
+    apply_review_change(getattr(instance, '_previous_contribution', None), current)
+
+
+@receiver(pre_delete, sender=CourseReview)
+def remember_review_course(sender, instance, **kwargs):
+    # The enrollment may be deleted in the same cascade, so resolve it now
+    instance._course_id = Enrollment.objects.filter(pk=instance.enrollment_id).values_list('course_id', flat=True).first()
+
+
+@receiver(post_delete, sender=CourseReview)
+def update_course_rating_on_delete(sender, instance, **kwargs):
+    previous = _review_contribution(instance.is_approved, instance.rating, getattr(instance, '_course_id', None))
+    apply_review_change(previous, None)
+
+
+@receiver([post_save, post_delete], sender=Certificate)
+def invalidate_certificate_count(sender, instance, **kwargs):
+    user_id = Enrollment.objects.filter(pk=instance.enrollment_id).values_list('user_id', flat=True).first()
+    if user_id:
+        cache.delete(certificate_count_cache_key(user_id))
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=CoursePurchase)
+@receiver([post_save, post_delete], sender=TestPurchase)
+def invalidate_user_entitlements(sender, instance, **kwargs):
+    invalidate_entitlements([instance.user_id])
@@ -0,0 +1,31 @@
+from celery import shared_task
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .analytics import rollup_course_stats
+from .certificates import issue_certificate, pending_completion_ids
+
+
+@shared_task(ignore_result=True)
+def issue_certificate_task(enrollment_id):
+    """Complete an enrollment and render its certificate off the request path"""
+    issue_certificate(enrollment_id)
+
+
+@shared_task(ignore_result=True)
+def process_completion_backlog(batch_size=200):
+    """Issue certificates for enrollments that reached 100% but were never processed"""
+    for enrollment_id in pending_completion_ids(limit=batch_size):
+        issue_certificate(enrollment_id)
+
+
+@shared_task(ignore_result=True)
+def rollup_course_stats_task(finalize_previous_day=True):
+    """Nightly rollup: close out yesterday and refresh today's running totals"""
+    today = timezone.localdate()
+    if finalize_previous_day:
+        # Shortly after midnight the current state is still yesterday's closing state
+        rollup_course_stats(today - timedelta(days=1), snapshot=True)
+    rollup_course_stats(today)
@@ -1,3 +1,574 @@
-from django.test import TestCase
+import importlib
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone, translation
+from rest_framework.test import APIRequestFactory, force_authenticate
+from PIL import Image, features
+
+from sales.models import Institution, InstitutionSubscription, InstitutionUser, ServicePackage
+from . import api_views
+from .analytics import compute_lesson_funnel, rollup_course_stats
+from .certificates import _shape, issue_certificate, pending_completion_ids
+from .curriculum import get_curriculum
+from .enrollment import BulkEnrollmentError, bulk_enroll
+from .entitlements import get_entitlements, get_user_entitlements
+from .models import (
+    Certificate, Course, CourseCategory, CourseDailyStats, CourseModule, CoursePurchase, CourseRecommendation,
+    CourseReview, Enrollment, Lesson, LessonProgress,
+)
+from .progress import sync_lesson_progress
+from .ratings import recompute_course_ratings
+from .recommendations import compute_course_recommendations, recommended_for_user, related_courses
+from .search import CourseFacetSearch
+
+User = get_user_model()
+
+# A Latin and Persian subset of DejaVu Sans (see testdata/LICENSE_DEJAVU)
+TEST_FONT_PATH = Path(__file__).resolve().parent / 'testdata' / 'DejaVuSans-Persian.ttf'
+
+
+class CourseTestMixin:
+    """Fixtures shared by the course service tests"""
+
+    def make_course(self, **kwargs):
+        if not hasattr(self, 'instructor'):
+            self.instructor = User.objects.create_user(email='instructor@example.com', password='pass')
+            self.category = CourseCategory.objects.create(name='Psychology')
+        count = Course.objects.count()
+        defaults = {
+            'title': f'Course {count}',
+            'slug': f'course-{count}',
+            'description': 'Description',
+            'short_description': 'Short',
+            'category': self.category,
+            'instructor': self.instructor,
+            'difficulty': 'beginner',
+            'status': 'published',
+            'price': 100,
+            'duration_hours': 10,
+            'level': 'Intro',
+            'learning_objectives': 'Objectives',
+        }
+        defaults.update(kwargs)
+        return Course.objects.create(**defaults)
+
+    def make_lessons(self, course, count, module=None):
+        module = module or CourseModule.objects.create(course=course, title='Module', order=course.modules.count() + 1)
+        start = module.lessons.count()
+        return [
+            Lesson.objects.create(module=module, title=f'Lesson {start + i}', lesson_type='text', order=start + i + 1)
+            for i in range(count)
+        ]
+
+    def make_users(self, count, prefix='student'):
+        return [User.objects.create_user(email=f'{prefix}{i}@example.com', password='pass') for i in range(count)]
+
+
+class BulkEnrollTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.course = self.make_course()
+        self.users = self.make_users(4)
+        self.institution = Institution.objects.create(
+            name='University', institution_type='university', contact_person='Contact',
+            email='uni@example.com', phone='0', address='Address', city='Tehran'
+        )
+        package = ServicePackage.objects.create(
+            name='Basic', package_type='basic', description='Basic', price=0, duration_months=12,
+            max_users=100, max_tests=100, max_courses=3, max_sessions=100
+        )
+        today = timezone.now().date()
+        self.subscription = InstitutionSubscription.objects.create(
+            institution=self.institution, package=package, start_date=today,
+            end_date=today + timedelta(days=30), price_paid=0
+        )
+        for user in self.users:
+            InstitutionUser.objects.create(institution=self.institution, user=user)
+
+    def test_skips_existing_and_counts_new(self):
+        Enrollment.objects.create(user=self.users[0], course=self.course)
+
+        result = bulk_enroll(self.course, [user.pk for user in self.users[:3]])
+
+        self.assertEqual(result['created_user_ids'], sorted(user.pk for user in self.users[1:3]))
+        self.assertEqual(result['already_enrolled_user_ids'], [self.users[0].pk])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrollment_count, 2)
+
+    def test_charges_subscription_and_rejects_overflow(self):
+        bulk_enroll(self.course, [self.users[0].pk], institution=self.institution)
+        with self.assertRaises(BulkEnrollmentError):
+            bulk_enroll(self.course, [user.pk for user in self.users], institution=self.institution)
+
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.courses_used, 1)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 1)
+
+    def test_concurrent_enrollment_is_not_charged_twice(self):
+        # The first user is enrolled by someone else right after the lookup
+        Enrollment.objects.create(user=self.users[0], course=self.course)
+        real_filter = Enrollment.objects.filter
+        lookups = []
+
+        def stale_filter(*args, **kwargs):
+            queryset = real_filter(*args, **kwargs)
+            if not lookups:
+                queryset = queryset.exclude(user=self.users[0])
+            lookups.append(queryset)
+            return queryset
+
+        with mock.patch.object(Enrollment.objects, 'filter', side_effect=stale_filter):
+            result = bulk_enroll(self.course, [user.pk for user in self.users[:3]], institution=self.institution)
+
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(result['created_user_ids'], sorted(user.pk for user in self.users[1:3]))
+        self.assertEqual(result['already_enrolled_user_ids'], [self.users[0].pk])
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.courses_used, 2)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrollment_count, 2)
+
+
+    def test_api_rejects_non_numeric_institution(self):
+        request = APIRequestFactory().post('/', {'institution_id': 'abc', 'user_ids': [self.users[0].pk]}, format='json')
+        force_authenticate(request, self.users[0])
+
+        response = api_views.bulk_enroll_course(request, course_slug=self.course.slug)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Enrollment.objects.exists())
+
+
+class LessonProgressSyncTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.course = self.make_course()
+        self.lessons = self.make_lessons(self.course, 2)
+        self.user = self.make_users(1)[0]
+        self.enrollment = Enrollment.objects.create(user=self.user, course=self.course)
+        self.now = timezone.now()
+
+    def event(self, lesson, minutes, completed=False, position=None):
+        return {
+            'lesson': lesson.pk,
+            'completed': completed,
+            'client_timestamp': self.now + timedelta(minutes=minutes),
+            'position': position,
+        }
+
+    def test_newest_event_wins_and_completion_is_sticky(self):
+        sync_lesson_progress(self.user, [self.event(self.lessons[0], 5, completed=True, position=30)])
+        sync_lesson_progress(self.user, [
+            self.event(self.lessons[0], 1, position=10),
+            self.event(self.lessons[1], 2, position=40),
+            self.event(self.lessons[1], 1, position=20),
+        ])
+
+        first, second = (LessonProgress.objects.get(lesson=lesson) for lesson in self.lessons)
+        self.assertTrue(first.is_completed)
+        self.assertEqual(first.last_position, 30)
+        self.assertEqual(second.last_position, 40)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percentage, 50)
+
+    def test_rejects_lessons_of_other_courses(self):
+        other = self.make_lessons(self.make_course(), 1)[0]
+
+        rows, enrollments, rejected = sync_lesson_progress(self.user, [self.event(other, 1)])
+
+        self.assertEqual((rows, rejected), ([], [other.pk]))
+
+    def test_row_inserted_by_concurrent_sync_is_merged(self):
+        # A concurrent sync creates the row after this one looked for it
+        LessonProgress.objects.create(
+            enrollment=self.enrollment, lesson=self.lessons[0], last_position=50,
+            client_updated_at=self.now + timedelta(minutes=10)
+        )
+        real_select_for_update = LessonProgress.objects.select_for_update
+        lookups = []
+
+        def stale_select_for_update(*args, **kwargs):
+            queryset = real_select_for_update(*args, **kwargs)
+            if not lookups:
+                queryset = queryset.exclude(lesson=self.lessons[0])
+            lookups.append(queryset)
+            return queryset
+
+        with mock.patch.object(LessonProgress.objects, 'select_for_update', side_effect=stale_select_for_update):
+            rows, _, _ = sync_lesson_progress(self.user, [self.event(self.lessons[0], 1, completed=True, position=5)])
+
+        progress = LessonProgress.objects.get(lesson=self.lessons[0])
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(progress.is_completed)
+        self.assertEqual(progress.last_position, 50)
+
+
+class CurriculumSnapshotTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course, self.other = self.make_course(), self.make_course()
+        self.lessons = self.make_lessons(self.course, 2)
+        self.other_lesson = self.make_lessons(self.other, 1)[0]
+
+    def test_snapshot_follows_lesson_order(self):
+        self.assertEqual(get_curriculum(self.course.pk).lesson_ids, [lesson.pk for lesson in self.lessons])
+
+    def test_moving_a_lesson_invalidates_both_courses(self):
+        get_curriculum(self.course.pk), get_curriculum(self.other.pk)
+
+        lesson = self.lessons[1]
+        lesson.module = self.other_lesson.module
+        lesson.save()
+
+        self.assertEqual(get_curriculum(self.course.pk).lesson_ids, [self.lessons[0].pk])
+        self.assertEqual(get_curriculum(self.other.pk).lesson_ids, [self.other_lesson.pk, lesson.pk])
+
+    def test_moving_a_module_invalidates_both_courses(self):
+        get_curriculum(self.course.pk), get_curriculum(self.other.pk)
+
+        module = self.lessons[0].module
+        module.course = self.other
+        module.order = 2
+        module.save()
+
+        self.assertEqual(get_curriculum(self.course.pk).lesson_ids, [])
+        self.assertEqual(get_curriculum(self.other.pk).lesson_count, 3)
+
+
+class CertificateIssueTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.enrollment = Enrollment.objects.create(
+            user=self.make_users(1)[0], course=self.make_course(), progress_percentage=100
+        )
+
+    def test_unfinished_enrollment_gets_no_certificate(self):
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(progress_percentage=80)
+
+        self.assertIsNone(issue_certificate(self.enrollment.pk))
+
+    def test_certificate_is_rendered_once_in_persian(self):
+        Course.objects.filter(pk=self.enrollment.course_id).update(title='روانشناسی کودک')
+        User.objects.filter(pk=self.enrollment.user_id).update(first_name='مریم', last_name='احمدی')
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with self.settings(CERTIFICATE_FONT_PATH=str(TEST_FONT_PATH), MEDIA_ROOT=media_root):
+            certificate = issue_certificate(self.enrollment.pk)
+            self.assertEqual(issue_certificate(self.enrollment.pk), certificate)
+            with Image.open(certificate.file.path) as image:
+                self.assertEqual((image.format, image.size), ('PNG', (1600, 1130)))
+
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.status, 'completed')
+        self.assertEqual(pending_completion_ids(), [])
+
+    def test_persian_text_is_shaped_right_to_left(self):
+        shaped = _shape('مریم')
+
+        if not features.check('raqm'):
+            # Joined presentation forms in visual order: final meem first, initial meem last
+            self.assertEqual(shaped, '\ufee2\ufbfe\ufeae\ufee3')
+        self.assertEqual(_shape('SRM-1'), 'SRM-1')
+
+    @override_settings(CERTIFICATE_FONT_PATH='')
+    def test_missing_persian_font_fails_loudly_and_stays_pending(self):
+        with self.assertRaises(ImproperlyConfigured):
+            issue_certificate(self.enrollment.pk)
+
+        self.assertFalse(Certificate.objects.exists())
+        self.assertEqual(pending_completion_ids(), [self.enrollment.pk])
+
+
+class CourseStatsRollupTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.course = self.make_course()
+        self.today = timezone.localdate()
+        self.past = timezone.now() - timedelta(days=3)
+        old, new = self.make_users(2)
+        Enrollment.objects.create(user=old, course=self.course, progress_percentage=100)
+        Enrollment.objects.create(user=new, course=self.course)
+        Enrollment.objects.filter(user=old).update(enrolled_at=self.past, completed_at=self.past, status='completed')
+        CoursePurchase.objects.create(user=old, course=self.course, amount_paid=100, payment_method='online')
+        CoursePurchase.objects.create(user=new, course=self.course, amount_paid=50, payment_method='online')
+        CoursePurchase.objects.filter(user=old).update(purchased_at=self.past)
+
+    def test_totals_are_as_of_the_rolled_up_day(self):
+        rollup_course_stats(self.today)
+        rollup_course_stats(self.past.date() - timedelta(days=1))
+        rollup_course_stats(self.past.date())
+
+        stats = {row.date: row for row in CourseDailyStats.objects.filter(course=self.course)}
+        self.assertEqual(stats[self.today].total_enrollments, 2)
+        self.assertEqual(stats[self.today].total_revenue, 150)
+        self.assertEqual(stats[self.today].average_progress, 50)
+        self.assertEqual(stats[self.past.date()].new_enrollments, 1)
+        self.assertEqual(stats[self.past.date()].completed_enrollments, 1)
+        self.assertEqual(stats[self.past.date()].total_revenue, 100)
+        self.assertEqual(stats[self.past.date() - timedelta(days=1)].total_enrollments, 0)
+
+    def test_backfill_keeps_stored_snapshot_columns(self):
+        day = self.today - timedelta(days=1)
+        rollup_course_stats(day, snapshot=True)
+        Enrollment.objects.update(progress_percentage=0)
+
+        rollup_course_stats(day)
+
+        self.assertEqual(CourseDailyStats.objects.get(course=self.course, date=day).average_progress, 50)
+
+
+class CourseFacetSearchTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.free = self.make_course(difficulty='beginner', is_free=True, price=0)
+        self.cheap = self.make_course(difficulty='beginner', price=600000)
+        self.advanced = self.make_course(difficulty='advanced', price=1500000, duration_hours=25)
+        self.make_course(difficulty='beginner', status='draft')
+
+    def search(self, query):
+        return CourseFacetSearch(QueryDict(query))
+
+    def counts(self, facets, name):
+        return {item['value']: item['count'] for item in facets[name]}
+
+    def test_facet_counts_ignore_their_own_selection(self):
+        search = self.search('difficulty=beginner')
+        facets = search.facet_counts()
+
+        self.assertEqual(set(search.results()), {self.free, self.cheap})
+        self.assertEqual(self.counts(facets, 'difficulty')['advanced'], 1)
+        self.assertEqual(self.counts(facets, 'difficulty')['beginner'], 2)
+        self.assertEqual(self.counts(facets, 'price'), {'free': 1, 'under_500k': 0, '500k_1m': 1, '1m_2m': 0, 'over_2m': 0})
+        self.assertEqual(self.counts(facets, 'duration')['over_20'], 0)
+
+    def test_values_of_one_facet_are_combined(self):
+        search = self.search('price=free,1m_2m&duration=over_20')
+
+        self.assertEqual(list(search.results()), [self.advanced])
+        # Price counts still honour the duration filter
+        self.assertEqual(self.counts(search.facet_counts(), 'price')['free'], 0)
+        self.assertEqual(self.counts(search.facet_counts(), 'price')['1m_2m'], 1)
+
+    def test_unknown_value_selects_nothing(self):
+        self.assertFalse(self.search('price=bogus').results().exists())
+
+    def test_labels_are_cached_per_language(self):
+        search = self.search('difficulty=beginner')
+        with translation.override('fa'):
+            persian = search.cache_key()
+            search.facet_counts()
+        with translation.override('en'):
+            english = search.cache_key()
+            self.assertIsNone(cache.get(english))
+
+        self.assertNotEqual(persian, english)
+        self.assertIsNotNone(cache.get(persian))
+
+    def test_cached_counts_follow_catalog_changes(self):
+        self.assertEqual(self.counts(self.search('').facet_counts(), 'difficulty')['advanced'], 1)
+
+        self.make_course(difficulty='advanced')
+
+        self.assertEqual(self.counts(self.search('').facet_counts(), 'difficulty')['advanced'], 2)
+
+
+class CourseRatingTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.course = self.make_course()
+        self.enrollments = [Enrollment.objects.create(user=user, course=self.course) for user in self.make_users(3)]
+
+    def review(self, enrollment, rating, is_approved=True):
+        return CourseReview.objects.create(
+            enrollment=enrollment, rating=rating, title='Title', content='Content', is_approved=is_approved
+        )
+
+    def aggregates(self):
+        course = Course.objects.get(pk=self.course.pk)
+        return course.review_count, course.rating_sum, course.rating, course.rating_distribution
+
+    def test_only_approved_reviews_count(self):
+        self.review(self.enrollments[0], 5)
+        pending = self.review(self.enrollments[1], 2, is_approved=False)
+        self.review(self.enrollments[2], 4)
+        self.assertEqual(self.aggregates()[:3], (2, 9, 4.5))
+
+        pending.is_approved = True
+        pending.save()
+
+        review_count, rating_sum, rating, distribution = self.aggregates()
+        self.assertEqual((review_count, rating_sum, rating), (3, 11, 11 / 3))
+        self.assertEqual(distribution, {1: 0, 2: 1, 3: 0, 4: 1, 5: 1})
+
+    def test_edits_and_deletes_match_a_recompute(self):
+        first = self.review(self.enrollments[0], 5)
+        second = self.review(self.enrollments[1], 1)
+        first.rating = 3
+        first.save()
+        second.delete()
+        incremental = self.aggregates()
+
+        Course.objects.filter(pk=self.course.pk).update(review_count=0, rating_sum=0, rating=0, rating_3_count=0)
+        recompute_course_ratings()
+
+        self.assertEqual(incremental, (1, 3, 3.0, {1: 0, 2: 0, 3: 1, 4: 0, 5: 0}))
+        self.assertEqual(self.aggregates(), incremental)
+
+    def test_removing_reviews_older_than_the_aggregates_does_not_fail(self):
+        first, second = self.review(self.enrollments[0], 5), self.review(self.enrollments[1], 4)
+        # As on an install whose aggregates were never backfilled
+        Course.objects.filter(pk=self.course.pk).update(review_count=1, rating_sum=4, rating=4, rating_5_count=0)
+
+        first.is_approved = False
+        first.save()
+        second.delete()
+
+        self.assertEqual(self.aggregates(), (0, 0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}))
+
+    def test_migration_backfills_existing_reviews(self):
+        self.review(self.enrollments[0], 5)
+        self.review(self.enrollments[1], 2)
+        expected = self.aggregates()
+        Course.objects.update(review_count=0, rating_sum=0, rating=0, rating_5_count=0, rating_2_count=0)
+
+        migration = importlib.import_module('courses.migrations.0009_backfill_course_ratings')
+        migration.backfill_course_ratings(apps, None)
+
+        self.assertEqual(self.aggregates(), expected)
+
+    def test_last_review_removed_resets_the_average(self):
+        self.review(self.enrollments[0], 4).delete()
+
+        self.assertEqual(self.aggregates()[:3], (0, 0, 0))
+
+
+class CourseRecommendationTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.first, self.second, self.third = (self.make_course() for _ in range(3))
+        self.users = self.make_users(3)
+        for user in self.users:
+            Enrollment.objects.create(user=user, course=self.first)
+        for user in self.users[:2]:
+            Enrollment.objects.create(user=user, course=self.second)
+        # Purchases count as well, and a purchase of an enrolled course counts once
+        CoursePurchase.objects.create(user=self.users[2], course=self.third, amount_paid=100, payment_method='online')
+        CoursePurchase.objects.create(user=self.users[0], course=self.first, amount_paid=100, payment_method='online')
+
+    def recommendations(self):
+        return list(CourseRecommendation.objects.values_list('course_id', 'recommended_course_id', 'rank', 'score'))
+
+    def test_neighbours_are_ranked_by_cosine_similarity(self):
+        compute_course_recommendations()
+
+        self.assertEqual(related_courses(self.first), [self.second, self.third])
+        scores = dict(CourseRecommendation.objects.filter(course=self.first).values_list('recommended_course_id', 'score'))
+        self.assertAlmostEqual(scores[self.second.pk], 2 / 6 ** 0.5)
+        self.assertAlmostEqual(scores[self.third.pk], 1 / 3 ** 0.5)
+        self.assertFalse(CourseRecommendation.objects.filter(course=self.second, recommended_course=self.third).exists())
+
+    def test_chunked_users_give_the_same_result(self):
+        compute_course_recommendations(chunk_size=1)
+        chunked = self.recommendations()
+
+        compute_course_recommendations()
+
+        self.assertEqual(chunked, self.recommendations())
+
+    def test_user_recommendations_exclude_owned_and_unpublished_courses(self):
+        compute_course_recommendations()
+        self.assertEqual(recommended_for_user(self.users[2]), [self.second])
+
+        Course.objects.filter(pk=self.second.pk).update(status='draft')
+
+        self.assertEqual(recommended_for_user(self.users[2]), [])
+        self.assertEqual(recommended_for_user(self.make_users(1, prefix='new')[0]), [])
+
+
+class LessonFunnelTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course = self.make_course()
+        self.lessons = self.make_lessons(self.course, 3)
+        self.enrollments = [Enrollment.objects.create(user=user, course=self.course) for user in self.make_users(4)]
+
+    def progress(self, enrollments, lesson, is_completed=False):
+        for enrollment in enrollments:
+            LessonProgress.objects.create(enrollment=enrollment, lesson=lesson, is_completed=is_completed)
+
+    def test_reach_and_drop_off_follow_curriculum_order(self):
+        self.progress(self.enrollments[:3], self.lessons[0], is_completed=True)
+        self.progress(self.enrollments[3:], self.lessons[0])
+        self.progress(self.enrollments[:2], self.lessons[1])
+        self.progress(self.enrollments[:1], self.lessons[2], is_completed=True)
+
+        funnel = compute_lesson_funnel(self.course.pk)
+
+        self.assertEqual(funnel['enrolled'], 4)
+        self.assertEqual([lesson['lesson_id'] for lesson in funnel['lessons']], [lesson.pk for lesson in self.lessons])
+        self.assertEqual([lesson['reached'] for lesson in funnel['lessons']], [4, 2, 1])
+        self.assertEqual([lesson['drop_off'] for lesson in funnel['lessons']], [0, 50, 50])
+        self.assertEqual([lesson['completion_rate'] for lesson in funnel['lessons']], [75, 0, 25])
+
+    def test_unreached_lessons_and_empty_courses(self):
+        funnel = compute_lesson_funnel(self.make_course().pk)
+        self.assertEqual((funnel['enrolled'], funnel['lessons']), (0, []))
+
+        funnel = compute_lesson_funnel(self.course.pk)
+        self.assertEqual([lesson['drop_off'] for lesson in funnel['lessons']], [100, 0, 0])
+
+
+class EntitlementTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course, self.other = self.make_course(), self.make_course()
+        self.user = self.make_users(1)[0]
+        Enrollment.objects.create(user=self.user, course=self.course)
+        CoursePurchase.objects.create(user=self.user, course=self.other, amount_paid=100, payment_method='online')
+
+    def test_entitlements_are_loaded_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        entitlements = get_entitlements(request)
+        with self.assertNumQueries(0):
+            self.assertIs(get_entitlements(request), entitlements)
+
+        self.assertTrue(entitlements.is_enrolled(self.course))
+        self.assertFalse(entitlements.is_enrolled(self.other.pk))
+        self.assertTrue(entitlements.has_purchased_course(self.other))
+
+    def test_cache_follows_enrollment_changes(self):
+        self.assertFalse(get_user_entitlements(self.user).is_enrolled(self.other))
+        with self.assertNumQueries(0):
+            get_user_entitlements(self.user)
+
+        Enrollment.objects.create(user=self.user, course=self.other)
+        self.assertTrue(get_user_entitlements(self.user).is_enrolled(self.other))
+
+        student = self.make_users(1, prefix='bulk')[0]
+        get_user_entitlements(student)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_enroll(self.other, [student.pk])
+        self.assertTrue(get_user_entitlements(student).is_enrolled(self.other))
+
+    def test_anonymous_users_own_nothing(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(get_user_entitlements(AnonymousUser()).is_enrolled(self.course))
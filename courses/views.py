@@ -1,7 +1,12 @@
 from django.shortcuts import render, get_object_or_404
+from django.http import Http404
 from django.views.generic import ListView, DetailView, CreateView
 from django.contrib import messages
-from .models import Course, CourseCategory, Enrollment
+from .models import Course, CourseCategory, Enrollment, Lesson, LessonProgress
+from .curriculum import get_curriculum
+from .entitlements import get_entitlements
+from .search import CourseFacetSearch
+from .recommendations import related_courses
 
 
 class CourseListView(ListView):
@@ -12,17 +17,13 @@ class CourseListView(ListView):
     paginate_by = 12
     
     def get_queryset(self):
-        queryset = Course.objects.filter(status='published').select_related('category', 'instructor')
-        
-        # Filter by category if specified
-        category_id = self.request.GET.get('category')
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
-            
-        return queryset
+        # Category, difficulty, price band etc. filters come from the query string
+        self.search = CourseFacetSearch(self.request.GET)
+        return self.search.results()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['facets'] = self.search.facet_counts()
         context['categories'] = CourseCategory.objects.filter(is_active=True)
         context['featured_courses'] = Course.objects.filter(
             status='published'
@@ -71,23 +72,21 @@ class CourseDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         course = self.get_object()
         
-        # Get related courses
-        context['related_courses'] = Course.objects.filter(
+        # Get related courses, falling back to the same category until the
+        # co-enrollment job has produced neighbours for this course
+        context['related_courses'] = related_courses(course, limit=3) or Course.objects.filter(
             status='published',
             category=course.category
         ).exclude(id=course.id).select_related('category', 'instructor')[:3]
         
-        # Get user's enrollment status
-        if self.request.user.is_authenticated:
-            try:
-                context['user_enrollment'] = Enrollment.objects.get(
-                    user=self.request.user,
-                    course=course
-                )
-            except Enrollment.DoesNotExist:
-                context['user_enrollment'] = None
-        else:
-            context['user_enrollment'] = None
+        # Get user's enrollment status; the entitlement set answers the
+        # common "not enrolled" case without a query
+        context['user_enrollment'] = None
+        if get_entitlements(self.request).is_enrolled(course):
+            context['user_enrollment'] = Enrollment.objects.filter(
+                user=self.request.user,
+                course=course
+            ).first()
             
         return context
 
@@ -115,28 +114,75 @@ class CourseEnrollView(CreateView):
         return response
 
 
-class CourseLearningView(DetailView):
+class CurriculumMixin:
+    """Adds the cached curriculum snapshot of the course to the context"""
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        self.curriculum = get_curriculum(self.object.pk)
+        context['curriculum'] = self.curriculum
+        context['modules'] = self.curriculum.modules
+        context['total_lessons'] = self.curriculum.lesson_count
+        context['total_duration_minutes'] = self.curriculum.total_duration_minutes
+        return context
+
+
+class CourseLearningView(CurriculumMixin, DetailView):
     """View for course learning interface"""
     model = Course
     template_name = 'courses/course_learning.html'
     context_object_name = 'course'
     slug_field = 'slug'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        completed_ids = set()
+        if self.request.user.is_authenticated:
+            completed_ids = set(LessonProgress.objects.filter(
+                enrollment__user=self.request.user,
+                enrollment__course=self.object,
+                is_completed=True
+            ).values_list('lesson_id', flat=True))
+        context['completed_lesson_ids'] = completed_ids
+        context['next_lesson'] = self.curriculum.first_incomplete_lesson(completed_ids)
+        return context
 
 
-class CourseModuleView(DetailView):
+class CourseModuleView(CurriculumMixin, DetailView):
     """View for course modules"""
     model = Course
     template_name = 'courses/course_module.html'
     context_object_name = 'course'
     slug_field = 'slug'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        module = self.curriculum.get_module(self.kwargs['module_pk'])
+        if module is None:
+            raise Http404
+        context['module'] = module
+        context['module_lessons'] = [self.curriculum.get_lesson(lesson_id) for lesson_id in module['lesson_ids']]
+        return context
 
 
-class CourseLessonView(DetailView):
+class CourseLessonView(CurriculumMixin, DetailView):
     """View for course lessons"""
     model = Course
     template_name = 'courses/course_lesson.html'
     context_object_name = 'course'
     slug_field = 'slug'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        lesson_id = self.kwargs['lesson_pk']
+        if self.curriculum.get_lesson(lesson_id) is None:
+            raise Http404
+        context['lesson'] = get_object_or_404(Lesson, pk=lesson_id)
+        context['module'] = self.curriculum.get_module(context['lesson'].module_id)
+        context['previous_lesson'] = self.curriculum.previous_lesson(lesson_id)
+        context['next_lesson'] = self.curriculum.next_lesson(lesson_id)
+        context['lesson_number'] = self.curriculum.position[lesson_id] + 1
+        return context
 
 
 class CourseProgressView(DetailView):
@@ -11,6 +11,7 @@ from django.contrib.auth.views import LogoutView as BaseLogoutView
 from .models import User, UserProfile, Notification
 from .forms import CustomSignupForm, CustomLoginForm, ProfileEditForm
 from courses.models import Enrollment
+from courses.certificates import certificate_count
 from tests.models import TestResult
 from therapy_sessions.models import Session
 
@@ -38,7 +39,7 @@ class DashboardView(LoginRequiredMixin, ListView):
             status='scheduled',
             scheduled_date__gte=timezone.now().date()
         ).count()
-        context['certificates_count'] = 0  # Placeholder for certificates
+        context['certificates_count'] = certificate_count(user)
         context['sessions_count'] = Session.objects.filter(client=user).count()
         
         # Get recent activities (placeholder)
@@ -73,7 +74,7 @@ class ProfileView(LoginRequiredMixin, DetailView):
         context['enrolled_courses_count'] = Enrollment.objects.filter(user=user).count()
         context['completed_tests_count'] = TestResult.objects.filter(session__user=user).count()
         context['sessions_count'] = Session.objects.filter(client=user).count()
-        context['certificates_count'] = 0  # Placeholder for certificates
+        context['certificates_count'] = certificate_count(user)
         
         return context
 
@@ -0,0 +1,13 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'psychology_institute.settings')
+
+app = Celery('psychology_institute')
+
+# Read CELERY_* settings from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Pick up tasks.py modules from all installed apps
+app.autodiscover_tasks()
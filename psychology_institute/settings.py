@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -93,6 +94,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.i18n',
+                'courses.context_processors.entitlements',
             ],
         },
     },
@@ -108,6 +110,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # The threaded booking tests in therapy_sessions need a file: the
+        # shared in-memory test database fails concurrent writers at once
+        # with "table is locked" instead of letting them wait. The file is
+        # git-ignored and removed when the test run ends
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -232,6 +241,56 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'rollup-course-stats-nightly': {
+        'task': 'courses.tasks.rollup_course_stats_task',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'process-course-completion-backlog': {
+        'task': 'courses.tasks.process_completion_backlog',
+        'schedule': crontab(minute='*/15'),
+    },
+    'compute-test-norms-nightly': {
+        'task': 'tests.tasks.compute_test_norms_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'sweep-abandoned-test-sessions': {
+        'task': 'tests.tasks.sweep_abandoned_sessions_task',
+        'schedule': crontab(minute=10),
+    },
+    'dispatch-session-reminders': {
+        'task': 'therapy_sessions.tasks.dispatch_session_reminders_task',
+        'schedule': crontab(),
+    },
+}
+
+# TrueType font with Persian glyphs (e.g. Vazir) used when rendering course
+# certificates; certificates are not issued until it is set
+CERTIFICATE_FONT_PATH = config('CERTIFICATE_FONT_PATH', default='')
+
+# Store the answers of completed test sessions as one packed sheet per
+# session instead of one Answer row (plus choice rows) per question
+TESTS_COMPACT_ANSWERS = config('TESTS_COMPACT_ANSWERS', default=True, cast=bool)
+
+# In-progress test sessions older than this are marked abandoned by the
+# hourly sweeper, which also deletes their partial answers when enabled
+TESTS_SESSION_ABANDON_HOURS = config('TESTS_SESSION_ABANDON_HOURS', default=24, cast=int)
+TESTS_PURGE_ABANDONED_ANSWERS = config('TESTS_PURGE_ABANDONED_ANSWERS', default=True, cast=bool)
+
+# Granularity of the bookable therapy slots offered inside a therapist's
+# availability windows (a 60 minute session can start every 30 minutes)
+THERAPY_SLOT_STEP_MINUTES = config('THERAPY_SLOT_STEP_MINUTES', default=30, cast=int)
+
+# Reminders created for every booked session, as (type, hours before), and
+# the backend delivering SMS and push reminders (emails use EMAIL_BACKEND)
+THERAPY_REMINDER_SCHEDULE = [('email', 24), ('sms', 2)]
+THERAPY_REMINDER_BACKEND = config('THERAPY_REMINDER_BACKEND', default='therapy_sessions.reminder_backends.ConsoleReminderBackend')
+
+# Undelivered reminders are retried this many minutes apart, at most this
+# many times in total
+THERAPY_REMINDER_RETRY_MINUTES = config('THERAPY_REMINDER_RETRY_MINUTES', default=10, cast=int)
+THERAPY_REMINDER_MAX_ATTEMPTS = config('THERAPY_REMINDER_MAX_ATTEMPTS', default=5, cast=int)
 
 # Email settings
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
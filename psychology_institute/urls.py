@@ -32,6 +32,7 @@ urlpatterns = [
     path('api/blog/', include('blog.api_urls')),
     path('api/dashboard/', include('dashboard.api_urls')),
     path('api/courses/', include('courses.api_urls')),
+    path('api/tests/', include('tests.api_urls')),
     path('api/therapy/', include('therapy_sessions.api_urls')),
     path('api/admin/', include('admin_panel.api_urls')),
     
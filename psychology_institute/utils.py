@@ -0,0 +1,21 @@
+from django.core.cache import cache
+
+
+def get_cache_version(key):
+    """
+    Current value of a version counter stored under ``key``, starting at 1.
+    Cache keys built from it are all invalidated at once by
+    ``bump_cache_version``.
+    """
+    version = cache.get(key)
+    if version is None:
+        version = 1
+        cache.add(key, version, None)
+    return version
+
+
+def bump_cache_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
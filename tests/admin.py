@@ -1,9 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.html import format_html, format_html_join
 from django.utils.translation import gettext_lazy as _
 from .models import (
     TestCategory, PsychologicalTest, Question, Choice, 
-    TestSession, Answer, TestResult, TestPurchase
+    TestSession, Answer, TestResult, TestPurchase, InterpretationBand, TestNorm, RescoreRun
 )
+from .answer_sheets import session_answers
+from .definition import get_test_definition
+from .scoring import start_rescore_run
+from .tasks import rescore_test_task
 
 
 class ChoiceInline(admin.TabularInline):
@@ -13,6 +18,13 @@ class ChoiceInline(admin.TabularInline):
     fields = ['choice_text', 'value', 'order', 'score']
 
 
+class InterpretationBandInline(admin.TabularInline):
+    """Inline admin for test interpretation bands"""
+    model = InterpretationBand
+    extra = 0
+    fields = ['subscale', 'min_percentage', 'max_percentage', 'label', 'interpretation', 'recommendations']
+
+
 @admin.register(TestCategory)
 class TestCategoryAdmin(admin.ModelAdmin):
     """Admin configuration for TestCategory model"""
@@ -30,7 +42,9 @@ class PsychologicalTestAdmin(admin.ModelAdmin):
     list_display = ('title', 'category', 'test_type', 'difficulty', 'is_free', 'price', 'is_active', 'created_at')
     list_filter = ('test_type', 'difficulty', 'is_free', 'is_active', 'requires_therapist', 'category', 'created_at')
     search_fields = ('title', 'description', 'created_by__first_name', 'created_by__last_name')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('completion_count', 'created_at', 'updated_at')
+    inlines = [InterpretationBandInline]
+    actions = ['rescore_results']
     
     fieldsets = (
         (None, {
@@ -46,21 +60,32 @@ class PsychologicalTestAdmin(admin.ModelAdmin):
             'fields': ('requires_therapist', 'min_age', 'max_age')
         }),
         (_('Status'), {
-            'fields': ('is_active',)
+            'fields': ('is_active', 'completion_count')
         }),
         (_('Timestamps'), {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.action(description=_('Regenerate results of selected tests'))
+    def rescore_results(self, request, queryset):
+        try:
+            for test_id in queryset.values_list('id', flat=True):
+                run = start_rescore_run(test_id)
+                rescore_test_task.delay(test_id, run_id=run.pk)
+        except Exception:
+            self.message_user(request, _('Could not queue rescoring; run the rescore_test_results command instead.'), messages.ERROR)
+            return
+        self.message_user(request, _('Rescoring has been queued.'))
 
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     """Admin configuration for Question model"""
     
-    list_display = ('test', 'question_text_short', 'question_type', 'order', 'is_required')
-    list_filter = ('question_type', 'is_required', 'test__category', 'test')
+    list_display = ('test', 'question_text_short', 'question_type', 'order', 'subscale', 'is_reverse_keyed', 'is_required')
+    list_filter = ('question_type', 'is_required', 'is_reverse_keyed', 'test__category', 'test')
     search_fields = ('question_text', 'test__title')
     ordering = ('test', 'order')
     inlines = [ChoiceInline]
@@ -84,12 +109,14 @@ class ChoiceAdmin(admin.ModelAdmin):
     choice_text_short.short_description = _('Choice Text')
 
 
-class AnswerInline(admin.TabularInline):
-    """Inline admin for test session answers"""
-    model = Answer
-    extra = 0
-    readonly_fields = ('question', 'selected_choices', 'text_answer', 'number_answer', 'answered_at')
-    can_delete = False
+def describe_answer(definition, answer):
+    if answer['choices']:
+        return ', '.join(
+            definition.choices.get(choice_id, {}).get('choice_text', str(choice_id)) for choice_id in answer['choices']
+        )
+    if answer['text'] is not None:
+        return answer['text']
+    return '-' if answer['number'] is None else str(answer['number'])
 
 
 @admin.register(TestSession)
@@ -99,8 +126,7 @@ class TestSessionAdmin(admin.ModelAdmin):
     list_display = ('user', 'test', 'status', 'started_at', 'completed_at', 'current_question')
     list_filter = ('status', 'started_at', 'completed_at', 'test__category')
     search_fields = ('user__first_name', 'user__last_name', 'user__email', 'test__title')
-    readonly_fields = ('started_at', 'completed_at')
-    inlines = [AnswerInline]
+    readonly_fields = ('started_at', 'completed_at', 'answers_display')
     
     fieldsets = (
         (None, {
@@ -109,16 +135,41 @@ class TestSessionAdmin(admin.ModelAdmin):
         (_('Progress'), {
             'fields': ('current_question',)
         }),
+        (_('Answers'), {
+            'fields': ('answers_display',)
+        }),
         (_('Timestamps'), {
             'fields': ('started_at', 'completed_at'),
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.display(description=_('Answers'))
+    def answers_display(self, obj):
+        # Read from the packed sheet or the Answer rows, whichever the session has
+        answers = session_answers(obj) if obj.pk else {}
+        if not answers:
+            return '-'
+        definition = get_test_definition(obj.test_id)
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td></tr>',
+            (
+                (question['order'], question['question_text'], describe_answer(definition, answers[question_id]))
+                for question_id in definition.question_ids
+                if question_id in answers
+                for question in [definition.get_question(question_id)]
+            ),
+        )
+        return format_html('<table>{}</table>', rows)
 
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
-    """Admin configuration for Answer model"""
+    """
+    Admin configuration for Answer model. Only sessions that are not packed
+    into an answer sheet have rows here; every session's answers are shown
+    on its TestSession page.
+    """
     
     list_display = ('session', 'question_short', 'answer_summary', 'answered_at')
     list_filter = ('session__test', 'question__question_type', 'answered_at')
@@ -144,17 +195,17 @@ class AnswerAdmin(admin.ModelAdmin):
 class TestResultAdmin(admin.ModelAdmin):
     """Admin configuration for TestResult model"""
     
-    list_display = ('session', 'total_score', 'max_score', 'percentage', 'generated_at')
-    list_filter = ('generated_at', 'session__test__category')
-    search_fields = ('session__user__first_name', 'session__user__last_name', 'session__test__title')
-    readonly_fields = ('generated_at',)
+    list_display = ('session', 'user', 'test', 'total_score', 'max_score', 'percentage', 'generated_at')
+    list_filter = ('generated_at', 'test__category')
+    search_fields = ('user__first_name', 'user__last_name', 'test__title')
+    readonly_fields = ('user', 'test', 'generated_at')
     
     fieldsets = (
         (None, {
-            'fields': ('session',)
+            'fields': ('session', 'user', 'test')
         }),
         (_('Scores'), {
-            'fields': ('total_score', 'max_score', 'percentage')
+            'fields': ('total_score', 'max_score', 'percentage', 'subscale_scores')
         }),
         (_('Results'), {
             'fields': ('interpretation', 'recommendations')
@@ -166,6 +217,25 @@ class TestResultAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(TestNorm)
+class TestNormAdmin(admin.ModelAdmin):
+    """Admin configuration for TestNorm model"""
+    
+    list_display = ('test', 'age_band', 'gender', 'sample_size', 'mean', 'std', 'computed_at')
+    list_filter = ('age_band', 'gender', 'test')
+    search_fields = ('test__title',)
+    readonly_fields = ('test', 'age_band', 'gender', 'sample_size', 'mean', 'std', 'scores', 'cumulative_counts', 'computed_at')
+
+
+@admin.register(RescoreRun)
+class RescoreRunAdmin(admin.ModelAdmin):
+    """Admin configuration for RescoreRun model"""
+    
+    list_display = ('test', 'status', 'last_session_id', 'started_at', 'finished_at')
+    list_filter = ('status', 'test')
+    readonly_fields = ('test', 'status', 'last_session_id', 'started_at', 'finished_at')
+
+
 @admin.register(TestPurchase)
 class TestPurchaseAdmin(admin.ModelAdmin):
     """Admin configuration for TestPurchase model"""
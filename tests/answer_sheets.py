@@ -0,0 +1,97 @@
+import numpy as np
+
+from .models import Answer, TestSession
+
+
+def pack_answers(definition, answers):
+    """
+    Pack cleaned answers (``{question_id: {'choices', 'text', 'number'}}``)
+    into one sheet aligned with the compiled question order. Each entry is
+    the list of selected choice ids, the text or number answer, or None.
+    The question ids are kept alongside so a sheet stays readable after
+    questions are reordered.
+    """
+    entries = []
+    for question_id in definition.question_ids:
+        answer = answers.get(question_id)
+        if answer is None:
+            entries.append(None)
+        elif answer['choices']:
+            entries.append(sorted(answer['choices']))
+        elif answer['text'] is not None:
+            entries.append(answer['text'])
+        else:
+            entries.append(answer['number'])
+    return {'questions': list(definition.question_ids), 'answers': entries}
+
+
+def unpack_answer_sheet(sheet):
+    """The cleaned-answer dict of a packed sheet; unanswered questions are left out"""
+    answers = {}
+    for question_id, entry in zip(sheet['questions'], sheet['answers']):
+        if entry is None:
+            continue
+        answers[question_id] = {
+            'choices': entry if isinstance(entry, list) else [],
+            'text': entry if isinstance(entry, str) else None,
+            'number': entry if isinstance(entry, (int, float)) else None,
+        }
+    return answers
+
+
+def load_answer_rows(session_ids):
+    """Cleaned answers of sessions still stored as Answer rows, with two queries"""
+    answers = {}
+    for session_id, question_id, text, number in Answer.objects.filter(session_id__in=session_ids).values_list(
+        'session_id', 'question_id', 'text_answer', 'number_answer'
+    ):
+        answers.setdefault(session_id, {})[question_id] = {'choices': [], 'text': text, 'number': number}
+    for session_id, question_id, choice_id in Answer.selected_choices.through.objects.filter(
+        answer__session_id__in=session_ids
+    ).values_list('answer__session_id', 'answer__question_id', 'choice_id'):
+        answers[session_id][question_id]['choices'].append(choice_id)
+    return answers
+
+
+def session_answers(session):
+    """A session's answers keyed by question id, from its sheet or its Answer rows"""
+    if session.answer_sheet is not None:
+        return unpack_answer_sheet(session.answer_sheet)
+    return load_answer_rows([session.pk]).get(session.pk, {})
+
+
+def load_selected_choices(sessions):
+    """
+    Parallel (session id, choice id) arrays of every choice selected in the
+    given TestSession queryset: one query over packed sheets and one over
+    the selected-choice rows of sessions that are not packed yet.
+    """
+    pairs = []
+    for session_id, sheet in sessions.filter(answer_sheet__isnull=False).values_list('id', 'answer_sheet'):
+        for entry in sheet['answers']:
+            if isinstance(entry, list):
+                pairs.extend((session_id, choice_id) for choice_id in entry)
+    pairs.extend(
+        Answer.selected_choices.through.objects.filter(
+            answer__session__in=sessions.filter(answer_sheet__isnull=True).values('id')
+        ).values_list('answer__session_id', 'choice_id')
+    )
+    flat = np.fromiter((value for pair in pairs for value in pair), dtype=np.int64, count=len(pairs) * 2)
+    return flat[0::2], flat[1::2]
+
+
+def pack_completed_sessions(definition, session_ids, keep_rows=False):
+    """
+    Move completed sessions from Answer rows to packed sheets: answers are
+    read with two queries, sheets written with one ``bulk_update`` and the
+    rows deleted unless ``keep_rows`` archives them. Returns the number of
+    sessions packed.
+    """
+    answers = load_answer_rows(session_ids)
+    sessions = list(TestSession.objects.filter(id__in=session_ids, answer_sheet__isnull=True))
+    for session in sessions:
+        session.answer_sheet = pack_answers(definition, answers.get(session.pk, {}))
+    TestSession.objects.bulk_update(sessions, ['answer_sheet'], batch_size=500)
+    if not keep_rows:
+        Answer.objects.filter(session_id__in=[session.pk for session in sessions]).delete()
+    return len(sessions)
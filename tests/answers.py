@@ -0,0 +1,182 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Answer, TestSession
+from .answer_sheets import pack_answers
+from .catalog import record_completion
+from .definition import get_test_definition
+from .scoring import save_results
+
+
+ANSWER_BUFFER_TIMEOUT = 60 * 60 * 24
+CHOICE_QUESTION_TYPES = ('single_choice', 'likert_scale')
+SESSION_CLOSED_MESSAGE = 'این جلسه آزمون قبلا ثبت شده است'
+
+
+def answer_buffer_key(session_id, question_id):
+    return f'tests:answers:{session_id}:{question_id}'
+
+
+class AnswerValidationError(Exception):
+    """Raised when answers do not fit the test; ``errors`` maps question ids to messages"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(errors)
+
+
+def clean_answer(question, choices=None, text_answer=None, number_answer=None):
+    """
+    Normalize one answer against a compiled question and return it as
+    ``{'choices': [...], 'text': ..., 'number': ...}``.
+    """
+    allowed = {choice['id'] for choice in question['choices']}
+    question_type = question['question_type']
+    answer = {'choices': [], 'text': None, 'number': None}
+
+    if question_type in CHOICE_QUESTION_TYPES or question_type == 'multiple_choice':
+        try:
+            selected = sorted({int(choice_id) for choice_id in choices or []})
+        except (TypeError, ValueError):
+            raise AnswerValidationError({question['id']: 'گزینه انتخاب شده نامعتبر است'})
+        if not set(selected) <= allowed:
+            raise AnswerValidationError({question['id']: 'گزینه انتخاب شده متعلق به این سوال نیست'})
+        if question_type in CHOICE_QUESTION_TYPES and len(selected) > 1:
+            raise AnswerValidationError({question['id']: 'برای این سوال تنها یک گزینه قابل انتخاب است'})
+        answer['choices'] = selected
+    elif question_type == 'text':
+        answer['text'] = (text_answer or '').strip() or None
+    elif question_type == 'number':
+        if number_answer not in (None, ''):
+            try:
+                answer['number'] = float(number_answer)
+            except (TypeError, ValueError):
+                raise AnswerValidationError({question['id']: 'پاسخ باید یک عدد باشد'})
+    return answer
+
+
+def is_blank(answer):
+    return answer is None or (not answer['choices'] and answer['text'] is None and answer['number'] is None)
+
+
+def get_buffered_answers(session_id, question_ids):
+    """Buffered answers of a session for the given questions, with one ``get_many``"""
+    keys = {answer_buffer_key(session_id, question_id): question_id for question_id in question_ids}
+    return {keys[key]: answer for key, answer in cache.get_many(keys).items()}
+
+
+def clear_buffered_answers(session_id, question_ids):
+    cache.delete_many([answer_buffer_key(session_id, question_id) for question_id in question_ids])
+
+
+def buffer_answers(session, answers, definition=None):
+    """
+    Validate answers for an in-progress session and keep them in the cache
+    until submit. ``answers`` maps question ids to ``clean_answer`` keyword
+    arguments; later answers for a question replace earlier ones.
+
+    Every question is buffered under its own key, so concurrent autosaves
+    of one session never overwrite each other's questions. Returns all the
+    session's buffered answers.
+    """
+    definition = definition or get_test_definition(session.test_id)
+    errors, cleaned = {}, {}
+    for question_id, raw in answers.items():
+        question = definition.get_question(question_id)
+        if question is None:
+            errors[question_id] = 'این سوال متعلق به این آزمون نیست'
+            continue
+        try:
+            cleaned[question_id] = clean_answer(question, **raw)
+        except AnswerValidationError as exc:
+            errors.update(exc.errors)
+    if errors:
+        raise AnswerValidationError(errors)
+
+    cache.set_many(
+        {answer_buffer_key(session.pk, question_id): answer for question_id, answer in cleaned.items()},
+        ANSWER_BUFFER_TIMEOUT,
+    )
+    return get_buffered_answers(session.pk, definition.question_ids)
+
+
+def write_answer_rows(session, answers):
+    """Insert Answer rows and their selected-choice rows with two ``bulk_create`` calls"""
+    rows = Answer.objects.bulk_create([
+        Answer(session=session, question_id=question_id, text_answer=answer['text'], number_answer=answer['number'])
+        for question_id, answer in answers.items()
+    ])
+    if any(row.pk is None for row in rows):
+        # Backends that cannot return ids from a bulk insert
+        answer_ids = dict(Answer.objects.filter(session=session).values_list('question_id', 'id'))
+    else:
+        answer_ids = {row.question_id: row.pk for row in rows}
+
+    Through = Answer.selected_choices.through
+    Through.objects.bulk_create([
+        Through(answer_id=answer_ids[question_id], choice_id=choice_id)
+        for question_id, answer in answers.items()
+        for choice_id in answer['choices']
+    ])
+
+
+def commit_answers(session, definition=None):
+    """
+    Validate every buffered answer against the compiled test and write them
+    in one transaction, either as the session's packed answer sheet
+    (``TESTS_COMPACT_ANSWERS``) or as Answer and selected-choice rows. The
+    session is then scored, marked completed and the buffer dropped.
+    Returns the session's TestResult.
+    """
+    if session.status != 'in_progress':
+        raise AnswerValidationError({'session': SESSION_CLOSED_MESSAGE})
+    definition = definition or get_test_definition(session.test_id)
+    buffered = get_buffered_answers(session.pk, definition.question_ids)
+
+    errors, cleaned = {}, {}
+    for question_id in definition.question_ids:
+        question = definition.get_question(question_id)
+        answer = buffered.get(question_id)
+        if answer is not None:
+            try:
+                answer = clean_answer(
+                    question,
+                    choices=answer['choices'],
+                    text_answer=answer['text'],
+                    number_answer=answer['number'],
+                )
+            except AnswerValidationError as exc:
+                errors.update(exc.errors)
+                continue
+        if is_blank(answer):
+            if question['is_required']:
+                errors[question_id] = 'پاسخ به این سوال الزامی است'
+            continue
+        cleaned[question_id] = answer
+    if errors:
+        raise AnswerValidationError(errors)
+
+    with transaction.atomic():
+        locked = TestSession.objects.select_for_update().filter(pk=session.pk, status='in_progress').first()
+        if locked is None:
+            raise AnswerValidationError({'session': SESSION_CLOSED_MESSAGE})
+
+        # Rows saved one question at a time by older clients are replaced wholesale
+        Answer.objects.filter(session=session).delete()
+        if getattr(settings, 'TESTS_COMPACT_ANSWERS', False):
+            session.answer_sheet = pack_answers(definition, cleaned)
+        else:
+            write_answer_rows(session, cleaned)
+
+        session.status = 'completed'
+        session.completed_at = timezone.now()
+        session.current_question = None
+        session.save(update_fields=['status', 'completed_at', 'current_question', 'answer_sheet'])
+        record_completion(session.test_id)
+        results, created, changes = save_results(session.test_id, [session.pk])
+        result = results[session.pk]
+        transaction.on_commit(lambda: clear_buffered_answers(session.pk, definition.question_ids))
+
+    return result
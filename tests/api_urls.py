@@ -0,0 +1,14 @@
+from django.urls import path
+from .api_views import (
+    test_definition,
+    save_answers,
+    submit_session,
+    test_result_history
+)
+
+urlpatterns = [
+    path('test/<int:pk>/definition/', test_definition, name='api_test_definition'),
+    path('session/<int:pk>/answers/', save_answers, name='api_save_answers'),
+    path('session/<int:pk>/submit/', submit_session, name='api_submit_session'),
+    path('results/history/', test_result_history, name='api_test_result_history'),
+]
@@ -0,0 +1,91 @@
+from rest_framework import status, permissions
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, permission_classes
+from django.shortcuts import get_object_or_404
+from .models import PsychologicalTest, TestSession
+from .definition import get_test_definition
+from .answers import AnswerValidationError, buffer_answers, commit_answers
+from .serializers import AnswerBatchSerializer, TestResultSerializer
+from .history import HISTORY_MAX_POINTS, HISTORY_MAX_POINTS_LIMIT, result_history
+from courses.entitlements import get_entitlements
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def test_definition(request, pk):
+    """
+    The whole test (questions and choices in order) in a single payload
+    """
+    test = get_object_or_404(PsychologicalTest, pk=pk, is_active=True)
+    is_staff = request.user.is_staff or request.user.user_type == 'admin'
+    if not test.is_free and not is_staff and not get_entitlements(request).has_purchased_test(test):
+        return Response({'error': 'برای شرکت در این آزمون ابتدا باید آن را خریداری کنید'}, status=status.HTTP_403_FORBIDDEN)
+    
+    definition = get_test_definition(test.id)
+    return Response({
+        'id': test.id,
+        'title': test.title,
+        'instructions': test.instructions,
+        'estimated_duration': test.estimated_duration,
+        'question_count': definition.question_count,
+        'questions': definition.as_payload(),
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def save_answers(request, pk):
+    """
+    Buffer a batch of answers for an in-progress session until submit
+    """
+    session = get_object_or_404(TestSession, pk=pk, user=request.user, status='in_progress')
+    serializer = AnswerBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    answers = {
+        answer.pop('question'): answer
+        for answer in serializer.validated_data['answers']
+    }
+    try:
+        buffered = buffer_answers(session, answers)
+    except AnswerValidationError as exc:
+        return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'answered_count': len(buffered)})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def submit_session(request, pk):
+    """
+    Validate the buffered answers, store and score them, completing the session
+    """
+    session = get_object_or_404(TestSession, pk=pk, user=request.user)
+    try:
+        result = commit_answers(session)
+    except AnswerValidationError as exc:
+        return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'message': 'پاسخ‌های شما با موفقیت ثبت شد',
+        'result': TestResultSerializer(result).data,
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def test_result_history(request):
+    """
+    The current user's score series per test with deltas between attempts;
+    ``test`` narrows it to one test and ``max_points`` caps each series
+    """
+    try:
+        max_points = int(request.GET.get('max_points', HISTORY_MAX_POINTS))
+        test_ids = [int(request.GET['test'])] if request.GET.get('test') else None
+    except ValueError:
+        return Response({'error': 'پارامترهای درخواست نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+    max_points = min(max(max_points, 3), HISTORY_MAX_POINTS_LIMIT)
+    
+    history = result_history(request.user.id, test_ids=test_ids, max_points=max_points)
+    return Response({
+        'tests': [
+            {'test_id': test_id, **series}
+            for test_id, series in history.items()
+        ]
+    })
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from psychology_institute.utils import bump_cache_version, get_cache_version
+from .models import PsychologicalTest, TestCategory, TestSession
+
+
+CATALOG_VERSION_KEY = 'tests:catalog_version'
+# Completion counts move without touching the catalog version, so cached
+# popularity rankings are only as fresh as this timeout
+CATALOG_CACHE_TIMEOUT = 60 * 10
+FEATURED_TESTS = 6
+POPULAR_TESTS = 5
+RELATED_TESTS = 3
+
+
+def get_catalog_version():
+    return get_cache_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached test catalog payload by moving to a new version"""
+    bump_cache_version(CATALOG_VERSION_KEY)
+
+
+def catalog_cache_key(name):
+    return f'tests:catalog:{get_catalog_version()}:{name}'
+
+
+def active_tests():
+    return PsychologicalTest.objects.filter(is_active=True).select_related('category', 'created_by')
+
+
+def popular_tests(queryset):
+    return queryset.order_by('-completion_count', '-created_at')
+
+
+def build_catalog_summary():
+    """
+    Everything the test listing pages show besides the paginated list: the
+    active categories with their active test counts, the total, free and
+    paid test counts in one conditional aggregate, and the featured and most
+    completed tests.
+    """
+    counts = PsychologicalTest.objects.filter(is_active=True).aggregate(
+        total=Count('id'),
+        free=Count('id', filter=Q(is_free=True)),
+        paid=Count('id', filter=Q(is_free=False)),
+    )
+    categories = list(
+        TestCategory.objects.filter(is_active=True)
+        .annotate(test_count=Count('tests', filter=Q(tests__is_active=True)))
+    )
+    return {
+        'categories': categories,
+        'total_tests': counts['total'],
+        'free_tests_count': counts['free'],
+        'paid_tests_count': counts['paid'],
+        'featured_tests': list(active_tests()[:FEATURED_TESTS]),
+        'popular_tests': list(popular_tests(active_tests())[:POPULAR_TESTS]),
+    }
+
+
+def catalog_summary():
+    key = catalog_cache_key('summary')
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_catalog_summary()
+        cache.set(key, summary, CATALOG_CACHE_TIMEOUT)
+    return summary
+
+
+def related_tests(test, limit=RELATED_TESTS):
+    """The most completed other active tests of ``test``'s category"""
+    key = catalog_cache_key(f'related:{test.pk}:{limit}')
+    tests = cache.get(key)
+    if tests is None:
+        tests = list(
+            popular_tests(active_tests().filter(category_id=test.category_id).exclude(pk=test.pk))[:limit]
+        )
+        cache.set(key, tests, CATALOG_CACHE_TIMEOUT)
+    return tests
+
+
+def record_completion(test_id):
+    """Count a completed session towards its test's popularity"""
+    PsychologicalTest.objects.filter(pk=test_id).update(completion_count=F('completion_count') + 1)
+
+
+def recompute_completion_counts():
+    """
+    Rebuild every test's completion count from its completed sessions with
+    a single GROUP BY. Returns the number of tests that have completions.
+    """
+    rows = (
+        TestSession.objects.filter(status='completed')
+        .values('test_id')
+        .annotate(completions=Count('id'))
+        .order_by()
+    )
+    tests = [PsychologicalTest(pk=row['test_id'], completion_count=row['completions']) for row in rows]
+    with transaction.atomic():
+        PsychologicalTest.objects.exclude(pk__in=[test.pk for test in tests]).update(completion_count=0)
+        PsychologicalTest.objects.bulk_update(tests, ['completion_count'], batch_size=500)
+    bump_catalog_version()
+    return len(tests)
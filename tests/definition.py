@@ -0,0 +1,139 @@
+from django.core.cache import cache
+
+from .models import Choice, InterpretationBand, Question
+
+
+DEFINITION_CACHE_TIMEOUT = 60 * 60 * 24
+SCORING_KEYS = ('subscale', 'is_reverse_keyed', 'score')
+
+
+def test_definition_cache_key(test_id):
+    return f'tests:definition:v2:{test_id}'
+
+
+class TestDefinition:
+    """
+    Compiled, ordered question/choice outline of a psychological test.
+
+    Only the compact ``data`` tuples are cached; the lookup tables below are
+    rebuilt in memory on load so position and navigation are dictionary
+    accesses instead of queries over the question list.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.test_id = data['test_id']
+        self.question_ids = []
+        self.questions = {}
+        self.choices = {}
+        for question_id, text, question_type, order, is_required, subscale, reverse, choices in data['questions']:
+            self.question_ids.append(question_id)
+            self.questions[question_id] = {
+                'id': question_id,
+                'question_text': text,
+                'question_type': question_type,
+                'order': order,
+                'is_required': is_required,
+                'subscale': subscale,
+                'is_reverse_keyed': reverse,
+                'choices': [
+                    {'id': choice_id, 'choice_text': choice_text, 'value': value, 'order': choice_order, 'score': score}
+                    for choice_id, choice_text, value, choice_order, score in choices
+                ],
+            }
+            for choice in self.questions[question_id]['choices']:
+                self.choices[choice['id']] = {**choice, 'question_id': question_id}
+        self.position = {question_id: index for index, question_id in enumerate(self.question_ids)}
+        self.bands = [
+            {'subscale': subscale, 'min_percentage': low, 'max_percentage': high, 'label': label,
+             'interpretation': interpretation, 'recommendations': recommendations}
+            for subscale, low, high, label, interpretation, recommendations in data['bands']
+        ]
+
+    @property
+    def question_count(self):
+        return len(self.question_ids)
+
+    def get_question(self, question_id):
+        return self.questions.get(question_id)
+
+    def index_of(self, question_id):
+        return self.position.get(question_id)
+
+    def previous_question(self, question_id):
+        index = self.position.get(question_id)
+        if not index:
+            return None
+        return self.questions[self.question_ids[index - 1]]
+
+    def next_question(self, question_id):
+        index = self.position.get(question_id)
+        if index is None or index + 1 >= len(self.question_ids):
+            return None
+        return self.questions[self.question_ids[index + 1]]
+
+    def progress_percentage(self, question_id):
+        index = self.position.get(question_id)
+        if index is None or not self.question_ids:
+            return 0
+        return index / len(self.question_ids) * 100
+
+    def choice_ids_for(self, question_id):
+        return {choice['id'] for choice in self.questions[question_id]['choices']}
+
+    def as_payload(self):
+        """Questions and choices for the client, without scoring keys"""
+        return [
+            {
+                **{
+                    key: value for key, value in self.questions[question_id].items()
+                    if key != 'choices' and key not in SCORING_KEYS
+                },
+                'choices': [
+                    {key: value for key, value in choice.items() if key not in SCORING_KEYS}
+                    for choice in self.questions[question_id]['choices']
+                ],
+            }
+            for question_id in self.question_ids
+        ]
+
+
+def build_test_definition_data(test_id):
+    """Load questions, choices and interpretation bands with three queries"""
+    questions = list(
+        Question.objects.filter(test_id=test_id)
+        .order_by('order')
+        .values_list('id', 'question_text', 'question_type', 'order', 'is_required', 'subscale', 'is_reverse_keyed')
+    )
+    choices_by_question = {}
+    for choice in (
+        Choice.objects.filter(question__test_id=test_id)
+        .order_by('question__order', 'order')
+        .values_list('question_id', 'id', 'choice_text', 'value', 'order', 'score')
+    ):
+        choices_by_question.setdefault(choice[0], []).append(choice[1:])
+    return {
+        'test_id': test_id,
+        'questions': [
+            (*question, tuple(choices_by_question.get(question[0], ())))
+            for question in questions
+        ],
+        'bands': list(
+            InterpretationBand.objects.filter(test_id=test_id)
+            .order_by('subscale', 'min_percentage')
+            .values_list('subscale', 'min_percentage', 'max_percentage', 'label', 'interpretation', 'recommendations')
+        ),
+    }
+
+
+def get_test_definition(test_id):
+    key = test_definition_cache_key(test_id)
+    data = cache.get(key)
+    if data is None:
+        data = build_test_definition_data(test_id)
+        cache.set(key, data, DEFINITION_CACHE_TIMEOUT)
+    return TestDefinition(data)
+
+
+def invalidate_test_definition(test_id):
+    cache.delete(test_definition_cache_key(test_id))
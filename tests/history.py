@@ -0,0 +1,89 @@
+import numpy as np
+
+from .models import TestResult
+
+
+HISTORY_MAX_POINTS = 50
+HISTORY_MAX_POINTS_LIMIT = 500
+
+
+def downsample(values, max_points):
+    """
+    Indexes of at most ``max_points`` points of a series that keep its shape,
+    chosen with the largest-triangle-three-buckets algorithm: the first and
+    last points are always kept and every bucket in between contributes the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    count = len(values)
+    if count <= max_points:
+        return np.arange(count)
+    max_points = max(max_points, 3)
+    x = np.arange(count, dtype=float)
+    y = np.asarray(values, dtype=float)
+    edges = np.linspace(1, count - 1, max_points - 1).astype(int)
+    kept = [0]
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else count
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        previous = kept[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        kept.append(start + int(areas.argmax()))
+    kept.append(count - 1)
+    return np.array(kept)
+
+
+def _series(title, dates, scores, max_points):
+    scores = np.array(scores, dtype=float)
+    deltas = np.diff(scores, prepend=scores[0])
+    kept = downsample(scores, max_points)
+    return {
+        'title': title,
+        'attempts': len(scores),
+        'first_score': float(scores[0]),
+        'latest_score': float(scores[-1]),
+        'best_score': float(scores.max()),
+        'mean_score': round(float(scores.mean()), 2),
+        'change': float(scores[-1] - scores[0]),
+        'last_delta': float(deltas[-1]),
+        'downsampled': len(kept) < len(scores),
+        'points': [
+            {
+                'attempt': int(index) + 1,
+                'generated_at': dates[index],
+                'total_score': float(scores[index]),
+                # Against the previous attempt, even when that one was dropped
+                'delta': float(deltas[index]) if index else None,
+            }
+            for index in kept
+        ],
+    }
+
+
+def result_history(user_id, test_ids=None, max_points=HISTORY_MAX_POINTS):
+    """
+    A user's total-score series per test, keyed by test id, read with one
+    query over the result history index. Each series carries the delta of
+    every attempt against the one before it and summary figures over all
+    attempts; series longer than ``max_points`` are downsampled.
+    """
+    results = TestResult.objects.filter(user_id=user_id)
+    if test_ids is not None:
+        results = results.filter(test_id__in=test_ids)
+    rows = results.order_by('test_id', 'generated_at').values_list(
+        'test_id', 'test__title', 'generated_at', 'total_score'
+    )
+
+    grouped = {}
+    for test_id, title, generated_at, total_score in rows:
+        series = grouped.setdefault(test_id, (title, [], []))
+        series[1].append(generated_at)
+        series[2].append(total_score)
+    return {
+        test_id: _series(title, dates, scores, max_points)
+        for test_id, (title, dates, scores) in grouped.items()
+    }
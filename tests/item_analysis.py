@@ -0,0 +1,134 @@
+import numpy as np
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from reports.models import Report
+from .answer_sheets import load_selected_choices
+from .models import PsychologicalTest, TestSession
+from .definition import get_test_definition
+from .scoring import ScoringKey
+
+
+MIN_ANALYSIS_SAMPLE = 2
+
+
+def _column_correlations(items, totals):
+    """Pearson correlation of every item column with the matching column of ``totals``"""
+    items = items - items.mean(axis=0)
+    totals = totals - totals.mean(axis=0)
+    denominator = np.sqrt((items ** 2).sum(axis=0) * (totals ** 2).sum(axis=0))
+    return np.divide((items * totals).sum(axis=0), denominator, out=np.zeros(items.shape[1]), where=denominator > 0)
+
+
+def cronbach_alpha(items):
+    """Cronbach's alpha of a sessions x items score matrix"""
+    count = items.shape[1]
+    if count < 2 or items.shape[0] < 2:
+        return None
+    total_variance = items.sum(axis=1).var(ddof=1)
+    if not total_variance:
+        return None
+    return float(count / (count - 1) * (1 - items.var(axis=0, ddof=1).sum() / total_variance))
+
+
+def item_statistics(items, low, high):
+    """
+    Classical item statistics for a complete sessions x items matrix:
+    difficulty (mean score scaled to the item's range), corrected
+    item-total correlation and alpha if the item were deleted.
+    """
+    count = items.shape[1]
+    totals = items.sum(axis=1)
+    rest = totals[:, None] - items
+    span = high - low
+    difficulty = np.divide(items.mean(axis=0) - low, span, out=np.zeros(count), where=span > 0)
+    correlation = _column_correlations(items, rest)
+
+    alpha_if_deleted = np.full(count, np.nan)
+    if count > 2:
+        item_variances = items.var(axis=0, ddof=1)
+        rest_variances = rest.var(axis=0, ddof=1)
+        alpha_if_deleted = (count - 1) / (count - 2) * (1 - np.divide(
+            item_variances.sum() - item_variances, rest_variances,
+            out=np.full(count, np.nan), where=rest_variances > 0,
+        ))
+    return difficulty, correlation, items.std(axis=0, ddof=1), alpha_if_deleted
+
+
+def _rounded(value):
+    return None if value is None or np.isnan(value) else round(float(value), 4)
+
+
+def analyze_test_items(test_id):
+    """
+    Pivot every selected choice of a test's completed sessions (packed
+    sheets and Answer rows alike) into a sessions x items score matrix and
+    compute item statistics and Cronbach's alpha (overall and per subscale)
+    on the sessions that answered every scored item.
+    """
+    definition = get_test_definition(test_id)
+    key = ScoringKey(definition)
+    answer_sessions, choice_ids = load_selected_choices(
+        TestSession.objects.filter(test_id=test_id, status='completed')
+    )
+
+    session_ids, rows = np.unique(answer_sessions, return_inverse=True)
+    scores, answered = key.item_matrix(rows, choice_ids, len(session_ids))
+    complete = answered.all(axis=1) if key.question_ids else np.zeros(len(session_ids), dtype=bool)
+    items = scores[complete]
+
+    data = {
+        'test_id': test_id,
+        'sessions': int(len(session_ids)),
+        'complete_sessions': int(complete.sum()),
+        'alpha': None,
+        'subscales': {},
+        'items': [],
+    }
+    if len(items) < MIN_ANALYSIS_SAMPLE:
+        return data
+
+    difficulty, correlation, deviation, alpha_if_deleted = item_statistics(items, key.question_min, key.question_max)
+    data['alpha'] = _rounded(cronbach_alpha(items))
+    for index, name in enumerate(key.subscales):
+        columns = key.question_subscales == index
+        data['subscales'][name] = {
+            'items': int(columns.sum()),
+            'alpha': _rounded(cronbach_alpha(items[:, columns])),
+        }
+    data['items'] = [
+        {
+            'question_id': question_id,
+            'question_text': definition.get_question(question_id)['question_text'],
+            'subscale': definition.get_question(question_id)['subscale'],
+            'answered': int(answered[:, index].sum()),
+            'mean': _rounded(items[:, index].mean()),
+            'std': _rounded(deviation[index]),
+            'difficulty': _rounded(difficulty[index]),
+            'item_total_correlation': _rounded(correlation[index]),
+            'alpha_if_deleted': _rounded(alpha_if_deleted[index]),
+        }
+        for index, question_id in enumerate(key.question_ids)
+    ]
+    return data
+
+
+def generate_item_analysis_report(test_id, generated_by=None):
+    """Run the item analysis of a test and store it as a ``test_analytics`` Report"""
+    test = PsychologicalTest.objects.get(pk=test_id)
+    data = analyze_test_items(test_id)
+    period = TestSession.objects.filter(test_id=test_id, status='completed').aggregate(
+        first=Min('completed_at'), last=Max('completed_at')
+    )
+    first, last = period['first'], period['last']
+    today = timezone.localdate()
+    return Report.objects.create(
+        name=f'Item analysis: {test.title}',
+        report_type='test_analytics',
+        description=f'Item difficulty, item-total correlation and Cronbach\'s alpha from {data["complete_sessions"]} complete sessions',
+        data=data,
+        filters={'test_id': test_id, 'analysis': 'items'},
+        generated_by=generated_by or test.created_by,
+        period_start=timezone.localtime(first).date() if first else today,
+        period_end=timezone.localtime(last).date() if last else today,
+    )
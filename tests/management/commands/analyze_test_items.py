@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from tests.item_analysis import generate_item_analysis_report
+from tests.models import PsychologicalTest
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compute item difficulty, item-total correlations and Cronbach\'s alpha for tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_ids', nargs='*', type=int, help='Tests to analyze (default: all active tests)')
+        parser.add_argument('--user', help='Email of the user the reports are generated by (default: test author)')
+
+    def handle(self, *args, **options):
+        generated_by = None
+        if options['user']:
+            generated_by = User.objects.filter(email=options['user']).first()
+            if generated_by is None:
+                raise CommandError(f'User "{options["user"]}" does not exist')
+
+        tests = PsychologicalTest.objects.filter(id__in=options['test_ids']) if options['test_ids'] else \
+            PsychologicalTest.objects.filter(is_active=True)
+        for test in tests.order_by('id'):
+            report = generate_item_analysis_report(test.id, generated_by=generated_by)
+            alpha = report.data['alpha']
+            self.stdout.write(
+                f'{test.title}: {report.data["complete_sessions"]} complete sessions, '
+                f'alpha {"n/a" if alpha is None else alpha} (report {report.pk})'
+            )
+        self.stdout.write(self.style.SUCCESS('Successfully generated item analysis reports'))
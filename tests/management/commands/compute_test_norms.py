@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from tests.norms import MIN_NORM_SAMPLE, compute_all_test_norms, compute_test_norms
+
+
+class Command(BaseCommand):
+    help = 'Rebuild norm tables (score distributions) for psychological tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_ids', nargs='*', type=int, help='Tests to rebuild (default: all active tests)')
+        parser.add_argument('--min-sample', type=int, default=MIN_NORM_SAMPLE, help='Smallest group that gets its own norm')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Computing test norms...')
+        if options['test_ids']:
+            stored = {
+                test_id: compute_test_norms(test_id, min_sample=options['min_sample'])
+                for test_id in options['test_ids']
+            }
+        else:
+            stored = compute_all_test_norms(min_sample=options['min_sample'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully stored {sum(stored.values())} norm groups for {len(stored)} tests'
+        ))
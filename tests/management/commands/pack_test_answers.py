@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tests.answer_sheets import pack_completed_sessions
+from tests.definition import get_test_definition
+from tests.models import TestSession
+
+
+class Command(BaseCommand):
+    help = 'Pack the Answer rows of completed test sessions into one answer sheet per session'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test', type=int, action='append', dest='test_ids', help='Only pack sessions of this test')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Sessions packed per transaction')
+        parser.add_argument('--keep-rows', action='store_true', help='Keep the Answer rows as an archive')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Packing completed test sessions...')
+        sessions = TestSession.objects.filter(status='completed', answer_sheet__isnull=True)
+        if options['test_ids']:
+            sessions = sessions.filter(test_id__in=options['test_ids'])
+
+        packed = 0
+        for test_id in sessions.values_list('test_id', flat=True).distinct().order_by('test_id'):
+            definition = get_test_definition(test_id)
+            last_id = 0
+            while True:
+                chunk = list(
+                    sessions.filter(test_id=test_id, id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    packed += pack_completed_sessions(definition, chunk, keep_rows=options['keep_rows'])
+                last_id = chunk[-1]
+                self.stdout.write(f'Packed {packed} sessions')
+        self.stdout.write(self.style.SUCCESS(f'Successfully packed {packed} sessions'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from tests.catalog import recompute_completion_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute test completion counts, used to rank popular tests, from completed sessions'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recomputing test completion counts...')
+        completed = recompute_completion_counts()
+        self.stdout.write(self.style.SUCCESS(f'Successfully recomputed completion counts ({completed} tests with completions)'))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from tests.models import PsychologicalTest
+from tests.scoring import rescore_test, resumable_rescore_run
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the results of completed sessions after a test scoring key changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_ids', nargs='*', type=int, help='Tests to rescore (default: all active tests)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Sessions scored per chunk')
+        parser.add_argument('--after-id', type=int, default=0, help='Only rescore sessions with a larger id')
+        parser.add_argument('--resume', action='store_true', help='Continue the unfinished run instead of starting a new one')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing')
+        parser.add_argument('--show', type=int, default=20, help='Changed results printed per test in dry-run mode')
+
+    def handle(self, *args, **options):
+        tests = PsychologicalTest.objects.all()
+        if options['test_ids']:
+            tests = tests.filter(id__in=options['test_ids'])
+            missing = set(options['test_ids']) - set(tests.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f'Unknown tests: {", ".join(map(str, sorted(missing)))}')
+        else:
+            tests = tests.filter(is_active=True)
+
+        for test in tests.order_by('id'):
+            after_id = options['after_id']
+            run = resumable_rescore_run(test.id) if options['resume'] and not options['dry_run'] else None
+            if run is not None:
+                after_id = max(after_id, run.last_session_id)
+            self.stdout.write(f'Rescoring "{test.title}" from session {after_id}...')
+
+            scored = created = changed = shown = 0
+            for progress in rescore_test(test.id, options['chunk_size'], after_id, options['dry_run'], run=run):
+                scored += progress['scored']
+                created += progress['created']
+                changed += len(progress['changes'])
+                if options['dry_run']:
+                    for session_id, diff in progress['changes'].items():
+                        if shown >= options['show']:
+                            break
+                        shown += 1
+                        for field, (old, new) in diff.items():
+                            self.stdout.write(f'  session {session_id} {field}: {old!r} -> {new!r}')
+                self.stdout.write(f'  {scored} sessions scored (up to session {progress["last_session_id"]})')
+
+            if options['dry_run']:
+                self.stdout.write(f'Would update {changed} and create {created} results for "{test.title}" ({scored} sessions)')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Successfully updated {changed} and created {created} results for "{test.title}" ({scored} sessions)'
+                ))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from tests.sweeper import sweep_abandoned_sessions
+
+
+class Command(BaseCommand):
+    help = 'Mark stale in-progress test sessions as abandoned and purge their partial answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help='Age after which a session is abandoned (default: settings)')
+        parser.add_argument('--keep-answers', action='store_true', help='Do not delete answers of abandoned sessions')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Sessions updated per statement')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Sweeping test sessions...')
+        stats = sweep_abandoned_sessions(
+            older_than=timedelta(hours=options['hours']) if options['hours'] else None,
+            purge_answers=False if options['keep_answers'] else None,
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully abandoned {stats["abandoned_sessions"]} sessions and purged '
+            f'{stats["purged_answers"]} answers ({stats["in_progress_sessions"]} still in progress)'
+        ))
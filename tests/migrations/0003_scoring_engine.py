@@ -0,0 +1,49 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:12
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0002_add_slug_to_testcategory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='is_reverse_keyed',
+            field=models.BooleanField(default=False, verbose_name='Is Reverse Keyed'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='subscale',
+            field=models.CharField(blank=True, default='', help_text='Leave empty to count towards the total score only', max_length=100, verbose_name='Subscale'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='subscale_scores',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Subscale Scores'),
+        ),
+        migrations.CreateModel(
+            name='InterpretationBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subscale', models.CharField(blank=True, default='', help_text='Leave empty for the total score', max_length=100, verbose_name='Subscale')),
+                ('min_percentage', models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='Minimum Percentage')),
+                ('max_percentage', models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='Maximum Percentage')),
+                ('label', models.CharField(max_length=100, verbose_name='Label')),
+                ('interpretation', models.TextField(verbose_name='Interpretation')),
+                ('recommendations', models.TextField(blank=True, null=True, verbose_name='Recommendations')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interpretation_bands', to='tests.psychologicaltest', verbose_name='Test')),
+            ],
+            options={
+                'verbose_name': 'Interpretation Band',
+                'verbose_name_plural': 'Interpretation Bands',
+                'ordering': ['test', 'subscale', 'min_percentage'],
+                'unique_together': {('test', 'subscale', 'min_percentage')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0003_scoring_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestNorm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('age_band', models.CharField(blank=True, default='', help_text='Empty for all ages', max_length=20, verbose_name='Age Band')),
+                ('gender', models.CharField(blank=True, default='', help_text='Empty for all genders', max_length=1, verbose_name='Gender')),
+                ('sample_size', models.PositiveIntegerField(verbose_name='Sample Size')),
+                ('mean', models.FloatField(verbose_name='Mean')),
+                ('std', models.FloatField(verbose_name='Standard Deviation')),
+                ('scores', models.JSONField(default=list, help_text='Distinct scores in ascending order', verbose_name='Scores')),
+                ('cumulative_counts', models.JSONField(default=list, help_text='Number of results at or below each score', verbose_name='Cumulative Counts')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Computed At')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='norms', to='tests.psychologicaltest', verbose_name='Test')),
+            ],
+            options={
+                'verbose_name': 'Test Norm',
+                'verbose_name_plural': 'Test Norms',
+                'ordering': ['test', 'age_band', 'gender'],
+                'unique_together': {('test', 'age_band', 'gender')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0004_test_norms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testsession',
+            name='answer_sheet',
+            field=models.JSONField(blank=True, help_text='Packed answers of a completed session, replacing its Answer rows', null=True, verbose_name='Answer Sheet'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0005_testsession_answer_sheet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='psychologicaltest',
+            name='completion_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Completion Count'),
+        ),
+    ]
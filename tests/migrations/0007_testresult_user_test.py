@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_session_user_and_test(apps, schema_editor):
+    TestResult = apps.get_model('tests', 'TestResult')
+    TestSession = apps.get_model('tests', 'TestSession')
+    sessions = TestSession.objects.filter(pk=models.OuterRef('session_id'))
+    TestResult.objects.update(
+        user_id=models.Subquery(sessions.values('user_id')[:1]),
+        test_id=models.Subquery(sessions.values('test_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tests', '0006_psychologicaltest_completion_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='test',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='results', to='tests.psychologicaltest', verbose_name='Test'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+        migrations.RunPython(copy_session_user_and_test, migrations.RunPython.noop),
+    ]
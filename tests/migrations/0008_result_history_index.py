@@ -0,0 +1,30 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tests', '0007_testresult_user_test'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='testresult',
+            name='test',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='tests.psychologicaltest', verbose_name='Test'),
+        ),
+        migrations.AlterField(
+            model_name='testresult',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['user', 'test', 'generated_at', 'total_score'], name='tests_result_history_idx'),
+        ),
+    ]
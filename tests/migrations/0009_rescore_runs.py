@@ -0,0 +1,30 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0008_result_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RescoreRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('superseded', 'Superseded')], default='running', max_length=20, verbose_name='Status')),
+                ('last_session_id', models.PositiveIntegerField(default=0, help_text='Last session whose result was written', verbose_name='Last Session ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Started At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rescore_runs', to='tests.psychologicaltest', verbose_name='Test')),
+            ],
+            options={
+                'verbose_name': 'Rescore Run',
+                'verbose_name_plural': 'Rescore Runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
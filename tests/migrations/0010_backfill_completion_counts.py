@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-19 10:20
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_completion_counts(apps, schema_editor):
+    PsychologicalTest = apps.get_model('tests', 'PsychologicalTest')
+    TestSession = apps.get_model('tests', 'TestSession')
+    completions = (
+        TestSession.objects.filter(test_id=models.OuterRef('pk'), status='completed')
+        .order_by()
+        .values('test_id')
+        .annotate(total=models.Count('id'))
+        .values('total')
+    )
+    PsychologicalTest.objects.update(completion_count=Coalesce(models.Subquery(completions[:1]), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0009_rescore_runs'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_completion_counts, migrations.RunPython.noop),
+    ]
@@ -72,6 +72,7 @@ class PsychologicalTest(models.Model):
     requires_therapist = models.BooleanField(default=False, verbose_name=_('Requires Therapist'))
     min_age = models.PositiveIntegerField(default=0, verbose_name=_('Minimum Age'))
     max_age = models.PositiveIntegerField(default=100, verbose_name=_('Maximum Age'))
+    completion_count = models.PositiveIntegerField(default=0, verbose_name=_('Completion Count'))
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tests', verbose_name=_('Created By'))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -101,6 +102,8 @@ class Question(models.Model):
     question_type = models.CharField(max_length=20, choices=QUESTION_TYPES, verbose_name=_('Question Type'))
     order = models.PositiveIntegerField(verbose_name=_('Order'))
     is_required = models.BooleanField(default=True, verbose_name=_('Is Required'))
+    subscale = models.CharField(max_length=100, blank=True, default='', help_text=_('Leave empty to count towards the total score only'), verbose_name=_('Subscale'))
+    is_reverse_keyed = models.BooleanField(default=False, verbose_name=_('Is Reverse Keyed'))
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -132,6 +135,27 @@ class Choice(models.Model):
         return f"{self.question.question_text[:30]}... - {self.choice_text}"
 
 
+class InterpretationBand(models.Model):
+    """Interpretation of a score range on a test or one of its subscales"""
+    
+    test = models.ForeignKey(PsychologicalTest, on_delete=models.CASCADE, related_name='interpretation_bands', verbose_name=_('Test'))
+    subscale = models.CharField(max_length=100, blank=True, default='', help_text=_('Leave empty for the total score'), verbose_name=_('Subscale'))
+    min_percentage = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(100)], verbose_name=_('Minimum Percentage'))
+    max_percentage = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(100)], verbose_name=_('Maximum Percentage'))
+    label = models.CharField(max_length=100, verbose_name=_('Label'))
+    interpretation = models.TextField(verbose_name=_('Interpretation'))
+    recommendations = models.TextField(blank=True, null=True, verbose_name=_('Recommendations'))
+    
+    class Meta:
+        verbose_name = _('Interpretation Band')
+        verbose_name_plural = _('Interpretation Bands')
+        ordering = ['test', 'subscale', 'min_percentage']
+        unique_together = ['test', 'subscale', 'min_percentage']
+    
+    def __str__(self):
+        return f"{self.test.title} {self.subscale or _('Total')}: {self.label}"
+
+
 class TestSession(models.Model):
     """User test sessions"""
     
@@ -147,6 +171,7 @@ class TestSession(models.Model):
     started_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Started At'))
     completed_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Completed At'))
     current_question = models.ForeignKey(Question, on_delete=models.SET_NULL, blank=True, null=True, verbose_name=_('Current Question'))
+    answer_sheet = models.JSONField(blank=True, null=True, help_text=_('Packed answers of a completed session, replacing its Answer rows'), verbose_name=_('Answer Sheet'))
     
     class Meta:
         verbose_name = _('Test Session')
@@ -180,19 +205,80 @@ class TestResult(models.Model):
     """Results of completed tests"""
     
     session = models.OneToOneField(TestSession, on_delete=models.CASCADE, related_name='result', verbose_name=_('Session'))
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_results', verbose_name=_('User'))
+    test = models.ForeignKey(PsychologicalTest, on_delete=models.CASCADE, related_name='results', verbose_name=_('Test'))
     total_score = models.FloatField(verbose_name=_('Total Score'))
     max_score = models.FloatField(verbose_name=_('Maximum Score'))
     percentage = models.FloatField(verbose_name=_('Percentage'))
     interpretation = models.TextField(verbose_name=_('Interpretation'))
     recommendations = models.TextField(blank=True, null=True, verbose_name=_('Recommendations'))
+    subscale_scores = models.JSONField(default=dict, blank=True, verbose_name=_('Subscale Scores'))
     generated_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Generated At'))
     
     class Meta:
         verbose_name = _('Test Result')
         verbose_name_plural = _('Test Results')
+        indexes = [
+            # Covers a user's score history per test without touching the table
+            models.Index(fields=['user', 'test', 'generated_at', 'total_score'], name='tests_result_history_idx'),
+        ]
     
     def __str__(self):
         return f"Result for {self.session.user.full_name} - {self.session.test.title}"
+    
+    def save(self, *args, **kwargs):
+        # Denormalized from the session for the result history index
+        if not self.user_id or not self.test_id:
+            self.user_id = self.session.user_id
+            self.test_id = self.session.test_id
+        super().save(*args, **kwargs)
+
+
+class TestNorm(models.Model):
+    """Distribution of total scores for a test, overall or within an age band/gender group"""
+    
+    test = models.ForeignKey(PsychologicalTest, on_delete=models.CASCADE, related_name='norms', verbose_name=_('Test'))
+    age_band = models.CharField(max_length=20, blank=True, default='', help_text=_('Empty for all ages'), verbose_name=_('Age Band'))
+    gender = models.CharField(max_length=1, blank=True, default='', help_text=_('Empty for all genders'), verbose_name=_('Gender'))
+    sample_size = models.PositiveIntegerField(verbose_name=_('Sample Size'))
+    mean = models.FloatField(verbose_name=_('Mean'))
+    std = models.FloatField(verbose_name=_('Standard Deviation'))
+    scores = models.JSONField(default=list, help_text=_('Distinct scores in ascending order'), verbose_name=_('Scores'))
+    cumulative_counts = models.JSONField(default=list, help_text=_('Number of results at or below each score'), verbose_name=_('Cumulative Counts'))
+    computed_at = models.DateTimeField(auto_now=True, verbose_name=_('Computed At'))
+    
+    class Meta:
+        verbose_name = _('Test Norm')
+        verbose_name_plural = _('Test Norms')
+        ordering = ['test', 'age_band', 'gender']
+        unique_together = ['test', 'age_band', 'gender']
+    
+    def __str__(self):
+        return f"{self.test.title} ({self.age_band or _('All ages')}, {self.gender or _('All genders')})"
+
+
+class RescoreRun(models.Model):
+    """One regeneration of a test's results, with a checkpoint to resume it from"""
+    
+    STATUS_CHOICES = [
+        ('running', _('Running')),
+        ('completed', _('Completed')),
+        ('superseded', _('Superseded')),
+    ]
+    
+    test = models.ForeignKey(PsychologicalTest, on_delete=models.CASCADE, related_name='rescore_runs', verbose_name=_('Test'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', verbose_name=_('Status'))
+    last_session_id = models.PositiveIntegerField(default=0, help_text=_('Last session whose result was written'), verbose_name=_('Last Session ID'))
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Started At'))
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Finished At'))
+    
+    class Meta:
+        verbose_name = _('Rescore Run')
+        verbose_name_plural = _('Rescore Runs')
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.test.title} rescore ({self.get_status_display()})"
 
 
 class TestPurchase(models.Model):
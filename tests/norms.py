@@ -0,0 +1,168 @@
+import bisect
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PsychologicalTest, TestNorm, TestResult
+
+
+NORMS_CACHE_TIMEOUT = 60 * 60 * 24
+MIN_NORM_SAMPLE = 30
+AGE_BANDS = [(0, 'under-18'), (18, '18-29'), (30, '30-44'), (45, '45-64'), (65, '65+')]
+AGE_BAND_STARTS = [start for start, label in AGE_BANDS]
+NORM_FIELDS = ['sample_size', 'mean', 'std', 'scores', 'cumulative_counts', 'computed_at']
+
+
+def norms_cache_key(test_id):
+    return f'tests:norms:{test_id}'
+
+
+def age_band(birth_date, on_date):
+    """Label of the age band someone born on ``birth_date`` was in on ``on_date``"""
+    if birth_date is None:
+        return ''
+    age = on_date.year - birth_date.year - ((on_date.month, on_date.day) < (birth_date.month, birth_date.day))
+    return AGE_BANDS[max(bisect.bisect_right(AGE_BAND_STARTS, age) - 1, 0)][1]
+
+
+class NormTable:
+    """
+    Compact cumulative distribution of a norm group: the distinct scores in
+    ascending order and how many results scored at or below each of them.
+    Percentiles are a binary search over ``scores``.
+    """
+
+    def __init__(self, sample_size, mean, std, scores, cumulative_counts, age_band='', gender=''):
+        self.sample_size = sample_size
+        self.mean = mean
+        self.std = std
+        self.scores = scores
+        self.cumulative_counts = cumulative_counts
+        self.age_band = age_band
+        self.gender = gender
+
+    def _count_at_or_below(self, index):
+        return self.cumulative_counts[index - 1] if index else 0
+
+    def percentile(self, score):
+        """Mid-rank percentile: results below ``score`` plus half of those equal to it"""
+        below = self._count_at_or_below(bisect.bisect_left(self.scores, score))
+        at_or_below = self._count_at_or_below(bisect.bisect_right(self.scores, score))
+        return round((below + (at_or_below - below) / 2) / self.sample_size * 100, 1)
+
+    def t_score(self, score):
+        if not self.std:
+            return 50.0
+        return round(50 + 10 * (score - self.mean) / self.std, 1)
+
+
+def build_norm_fields(scores):
+    values, counts = np.unique(np.asarray(scores, dtype=float), return_counts=True)
+    return {
+        'sample_size': int(counts.sum()),
+        'mean': float(np.mean(scores)),
+        'std': float(np.std(scores)),
+        'scores': values.tolist(),
+        'cumulative_counts': np.cumsum(counts).tolist(),
+    }
+
+
+def compute_test_norms(test_id, min_sample=MIN_NORM_SAMPLE):
+    """
+    Rebuild a test's norm tables from its completed results with one query.
+
+    Besides the overall group, a norm is stored per age band (age at
+    completion, from ``User.birth_date``), per gender and per age
+    band/gender pair, as long as the group has at least ``min_sample``
+    results. Groups that fell below that size are removed. Returns the
+    number of norm groups stored.
+    """
+    rows = list(
+        TestResult.objects.filter(session__test_id=test_id, session__status='completed')
+        .values_list('total_score', 'session__user__birth_date', 'session__user__gender', 'session__completed_at')
+    )
+    scores = np.array([row[0] for row in rows], dtype=float)
+    bands = np.array([
+        age_band(birth_date, timezone.localtime(completed_at).date() if completed_at else timezone.localdate())
+        for score, birth_date, gender, completed_at in rows
+    ], dtype=object)
+    genders = np.array([gender or '' for score, birth_date, gender, completed_at in rows], dtype=object)
+
+    groups = {('', ''): np.ones(len(rows), dtype=bool)}
+    for band in set(bands) - {''}:
+        groups[(band, '')] = bands == band
+    for gender in set(genders) - {''}:
+        groups[('', gender)] = genders == gender
+        for band in set(bands) - {''}:
+            groups[(band, gender)] = (bands == band) & (genders == gender)
+
+    norms = [
+        TestNorm(test_id=test_id, age_band=band, gender=gender, **build_norm_fields(scores[mask]))
+        for (band, gender), mask in groups.items()
+        if mask.sum() >= max(min_sample, 1)
+    ]
+
+    with transaction.atomic():
+        TestNorm.objects.bulk_create(
+            norms,
+            update_conflicts=True,
+            unique_fields=['test', 'age_band', 'gender'],
+            update_fields=NORM_FIELDS,
+        )
+        kept = Q(pk__in=[])
+        for norm in norms:
+            kept |= Q(age_band=norm.age_band, gender=norm.gender)
+        TestNorm.objects.filter(test_id=test_id).exclude(kept).delete()
+        transaction.on_commit(lambda: cache.delete(norms_cache_key(test_id)))
+    return len(norms)
+
+
+def compute_all_test_norms(min_sample=MIN_NORM_SAMPLE):
+    return {
+        test_id: compute_test_norms(test_id, min_sample=min_sample)
+        for test_id in PsychologicalTest.objects.filter(is_active=True).values_list('id', flat=True)
+    }
+
+
+def get_norm_tables(test_id):
+    """A test's norm tables keyed by ``(age_band, gender)``, cached until the next recompute"""
+    key = norms_cache_key(test_id)
+    data = cache.get(key)
+    if data is None:
+        data = list(
+            TestNorm.objects.filter(test_id=test_id)
+            .values_list('age_band', 'gender', 'sample_size', 'mean', 'std', 'scores', 'cumulative_counts')
+        )
+        cache.set(key, data, NORMS_CACHE_TIMEOUT)
+    return {
+        (band, gender): NormTable(size, mean, std, scores, cumulative, band, gender)
+        for band, gender, size, mean, std, scores, cumulative in data
+    }
+
+
+def norm_scores(result):
+    """
+    Percentile and T-score of a result against the most specific norm group
+    available for the test taker, or None if the test has no norms yet.
+    """
+    session = result.session
+    tables = get_norm_tables(session.test_id)
+    if not tables:
+        return None
+    user = session.user
+    on_date = timezone.localtime(session.completed_at).date() if session.completed_at else timezone.localdate()
+    band, gender = age_band(user.birth_date, on_date), user.gender or ''
+    for group in ((band, gender), (band, ''), ('', gender), ('', '')):
+        table = tables.get(group)
+        if table is not None:
+            return {
+                'percentile': table.percentile(result.total_score),
+                't_score': table.t_score(result.total_score),
+                'age_band': table.age_band,
+                'gender': table.gender,
+                'sample_size': table.sample_size,
+            }
+    return None
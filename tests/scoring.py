@@ -0,0 +1,286 @@
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .answer_sheets import load_selected_choices
+from .definition import get_test_definition
+from .models import RescoreRun, TestResult, TestSession
+
+
+SCORED_QUESTION_TYPES = ('single_choice', 'likert_scale', 'multiple_choice')
+RESULT_FIELDS = ['total_score', 'max_score', 'percentage', 'interpretation', 'recommendations', 'subscale_scores']
+
+
+def _percentages(scores, low, high):
+    span = high - low
+    return np.divide(scores - low, span, out=np.zeros_like(scores), where=span > 0) * 100
+
+
+class ScoringKey:
+    """
+    NumPy form of a test's scoring rules.
+
+    Every choice becomes a column holding its (already reverse-keyed) score
+    and the subscale of its question, so scoring any number of sessions is
+    one weighted ``bincount`` over (session, subscale) pairs. The last
+    subscale column collects questions that only count towards the total.
+    """
+
+    def __init__(self, definition):
+        self.test_id = definition.test_id
+        self.subscales = sorted({
+            question['subscale'] for question in definition.questions.values() if question['subscale']
+        })
+        subscale_index = {name: index for index, name in enumerate(self.subscales)}
+        unassigned = len(self.subscales)
+        self.width = unassigned + 1
+
+        choice_ids, scores, choice_subscales, choice_questions = [], [], [], []
+        self.question_ids, question_subscales, question_min, question_max = [], [], [], []
+        for question_id in definition.question_ids:
+            question = definition.get_question(question_id)
+            if question['question_type'] not in SCORED_QUESTION_TYPES or not question['choices']:
+                continue
+            raw = np.array([choice['score'] for choice in question['choices']], dtype=float)
+            if question['is_reverse_keyed']:
+                raw = raw.min() + raw.max() - raw
+            if question['question_type'] == 'multiple_choice':
+                low, high = raw[raw < 0].sum(), raw[raw > 0].sum()
+            else:
+                low, high = raw.min(), raw.max()
+            subscale = subscale_index.get(question['subscale'], unassigned)
+
+            choice_ids.extend(choice['id'] for choice in question['choices'])
+            scores.extend(raw)
+            choice_subscales.extend([subscale] * len(raw))
+            choice_questions.extend([len(self.question_ids)] * len(raw))
+            self.question_ids.append(question_id)
+            question_subscales.append(subscale)
+            question_min.append(low)
+            question_max.append(high)
+
+        choice_ids = np.array(choice_ids, dtype=np.int64)
+        order = np.argsort(choice_ids)
+        self.sorted_choice_ids = choice_ids[order]
+        self.choice_scores = np.array(scores, dtype=float)[order]
+        self.choice_subscales = np.array(choice_subscales, dtype=np.int64)[order]
+        self.choice_questions = np.array(choice_questions, dtype=np.int64)[order]
+
+        self.question_subscales = np.array(question_subscales, dtype=np.int64)
+        self.question_min = np.array(question_min, dtype=float)
+        self.question_max = np.array(question_max, dtype=float)
+        self.subscale_min = np.bincount(self.question_subscales, weights=self.question_min, minlength=self.width)
+        self.subscale_max = np.bincount(self.question_subscales, weights=self.question_max, minlength=self.width)
+
+        self.bands = {}
+        for band in definition.bands:
+            self.bands.setdefault(band['subscale'], []).append(band)
+
+    @property
+    def min_score(self):
+        return float(self.subscale_min.sum())
+
+    @property
+    def max_score(self):
+        return float(self.subscale_max.sum())
+
+    def _choice_columns(self, rows, choice_ids):
+        """Keep the selections of choices that are still part of the test, with their column"""
+        rows = np.asarray(rows, dtype=np.int64)
+        choice_ids = np.asarray(choice_ids, dtype=np.int64)
+        if not len(self.sorted_choice_ids):
+            return rows[:0], choice_ids[:0]
+        columns = np.searchsorted(self.sorted_choice_ids, choice_ids).clip(max=len(self.sorted_choice_ids) - 1)
+        known = self.sorted_choice_ids[columns] == choice_ids
+        return rows[known], columns[known]
+
+    def _pivot(self, rows, columns, groups, width, count, weights=None):
+        cells = rows * width + groups[columns]
+        return np.bincount(cells, weights=weights, minlength=count * width).reshape(count, width)
+
+    def score_matrix(self, rows, choice_ids, count):
+        """
+        Raw scores of ``count`` sessions from parallel arrays of session row
+        indexes and selected choice ids, as a ``(count, width)`` matrix.
+        Choices that are no longer part of the test are ignored.
+        """
+        rows, columns = self._choice_columns(rows, choice_ids)
+        return self._pivot(rows, columns, self.choice_subscales, self.width, count, self.choice_scores[columns])
+
+    def item_matrix(self, rows, choice_ids, count):
+        """
+        Per-question scores as a ``(count, len(question_ids))`` matrix, plus
+        a boolean matrix of which questions each session answered.
+        """
+        rows, columns = self._choice_columns(rows, choice_ids)
+        width = len(self.question_ids)
+        scores = self._pivot(rows, columns, self.choice_questions, width, count, self.choice_scores[columns])
+        answered = self._pivot(rows, columns, self.choice_questions, width, count) > 0
+        return scores, answered
+
+    def band_indexes(self, subscale, percentages):
+        """Index into ``self.bands[subscale]`` for each percentage, -1 where no band applies"""
+        bands = self.bands.get(subscale)
+        if not bands:
+            return np.full(len(percentages), -1)
+        lows = np.array([band['min_percentage'] for band in bands])
+        highs = np.array([band['max_percentage'] for band in bands])
+        indexes = np.searchsorted(lows, percentages, side='right') - 1
+        inside = (indexes >= 0) & (percentages <= highs[indexes.clip(min=0)])
+        return np.where(inside, indexes, -1)
+
+    def score(self, rows, choice_ids, count):
+        """
+        Score ``count`` sessions and return one result dict per row with the
+        TestResult fields. Percentages are relative to the attainable range,
+        so reverse-keyed and 1-based scales still span 0-100.
+        """
+        matrix = self.score_matrix(rows, choice_ids, count)
+        totals = matrix.sum(axis=1)
+        total_percentages = _percentages(totals, self.min_score, self.max_score)
+        subscale_percentages = _percentages(matrix, self.subscale_min, self.subscale_max)
+
+        total_bands = self.band_indexes('', total_percentages)
+        subscale_bands = [
+            self.band_indexes(name, subscale_percentages[:, index])
+            for index, name in enumerate(self.subscales)
+        ]
+
+        results = []
+        for row in range(count):
+            band = self.bands[''][total_bands[row]] if total_bands[row] >= 0 else None
+            subscale_scores = {}
+            for index, name in enumerate(self.subscales):
+                band_index = subscale_bands[index][row]
+                subscale_scores[name] = {
+                    'score': float(matrix[row, index]),
+                    'max_score': float(self.subscale_max[index]),
+                    'percentage': round(float(subscale_percentages[row, index]), 2),
+                    'label': self.bands[name][band_index]['label'] if band_index >= 0 else '',
+                }
+            results.append({
+                'total_score': float(totals[row]),
+                'max_score': self.max_score,
+                'percentage': round(float(total_percentages[row]), 2),
+                'interpretation': band['interpretation'] if band else '',
+                'recommendations': band['recommendations'] if band else None,
+                'subscale_scores': subscale_scores,
+            })
+        return results
+
+
+def get_scoring_key(test_id):
+    return ScoringKey(get_test_definition(test_id))
+
+
+def score_sessions(test_id, session_ids, key=None):
+    """Score many sessions of one test; returns ``{session_id: result fields}``"""
+    key = key or get_scoring_key(test_id)
+    session_ids = np.array(sorted(set(session_ids)), dtype=np.int64)
+    answer_sessions, choice_ids = load_selected_choices(TestSession.objects.filter(id__in=session_ids.tolist()))
+    rows = np.searchsorted(session_ids, answer_sessions)
+    results = key.score(rows, choice_ids, len(session_ids))
+    return dict(zip(session_ids.tolist(), results))
+
+
+def _plan_results(scored, existing):
+    """Split scored sessions into new results and changed existing ones, with per-field diffs"""
+    to_create, to_update, changes = [], [], {}
+    for session_id, fields in scored.items():
+        result = existing.get(session_id)
+        if result is None:
+            to_create.append(TestResult(session_id=session_id, **fields))
+            continue
+        diff = {
+            field: (getattr(result, field), value)
+            for field, value in fields.items()
+            if getattr(result, field) != value
+        }
+        if diff:
+            for field, (old, new) in diff.items():
+                setattr(result, field, new)
+            to_update.append(result)
+            changes[session_id] = diff
+    return to_create, to_update, changes
+
+
+def save_results(test_id, session_ids, key=None, dry_run=False):
+    """
+    Score sessions and write their TestResult rows: one ``bulk_create`` for
+    new results and one ``bulk_update`` for the ones whose scores changed.
+    Returns ``(results, created, changes)``: TestResults keyed by session
+    id, the number of new results and the ``{field: (old, new)}`` diff of
+    every changed result. With ``dry_run`` nothing is written.
+    """
+    scored = score_sessions(test_id, session_ids, key=key)
+    existing = {result.session_id: result for result in TestResult.objects.filter(session_id__in=scored)}
+    to_create, to_update, changes = _plan_results(scored, existing)
+    if to_create:
+        users = dict(TestSession.objects.filter(id__in=[result.session_id for result in to_create]).values_list('id', 'user_id'))
+        for result in to_create:
+            result.user_id, result.test_id = users[result.session_id], test_id
+    if not dry_run:
+        TestResult.objects.bulk_create(to_create, batch_size=500)
+        TestResult.objects.bulk_update(to_update, RESULT_FIELDS, batch_size=500)
+    results = {**existing, **{result.session_id: result for result in to_create}}
+    return results, len(to_create), changes
+
+
+def start_rescore_run(test_id):
+    """Start a new rescoring run of a test, superseding any unfinished one"""
+    with transaction.atomic():
+        RescoreRun.objects.filter(test_id=test_id, status='running').update(
+            status='superseded', finished_at=timezone.now()
+        )
+        return RescoreRun.objects.create(test_id=test_id)
+
+
+def resumable_rescore_run(test_id):
+    """The test's latest unfinished rescoring run, or None"""
+    return RescoreRun.objects.filter(test_id=test_id, status='running').order_by('-started_at', '-id').first()
+
+
+def completed_session_chunks(test_id, chunk_size, after_id=0):
+    """Ids of a test's completed sessions in ascending chunks, paged by id"""
+    while True:
+        chunk = list(
+            TestSession.objects.filter(test_id=test_id, status='completed', id__gt=after_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        after_id = chunk[-1]
+
+
+def rescore_test(test_id, chunk_size=500, after_id=0, dry_run=False, run=None):
+    """
+    Regenerate the results of every completed session of a test, one chunk
+    at a time, after its scoring key or interpretation bands changed.
+
+    The scoring key is compiled once. Unless it is a dry run the work is
+    tracked by a RescoreRun (a new one unless ``run`` is given): each
+    chunk's results and the run's checkpoint are written in the same
+    transaction, so resuming the run continues after the last written
+    session, and a run stops once a newer one supersedes it. Yields a
+    progress dict per chunk.
+    """
+    key = get_scoring_key(test_id)
+    if not dry_run:
+        run = run or start_rescore_run(test_id)
+        after_id = max(after_id, run.last_session_id)
+    for chunk in completed_session_chunks(test_id, chunk_size, after_id):
+        with transaction.atomic():
+            if not dry_run and not RescoreRun.objects.filter(pk=run.pk, status='running').update(last_session_id=chunk[-1]):
+                # A newer run took over; its scoring key wins
+                return
+            results, created, changes = save_results(test_id, chunk, key=key, dry_run=dry_run)
+        yield {
+            'last_session_id': chunk[-1],
+            'scored': len(chunk),
+            'created': created,
+            'changes': changes,
+        }
+    if not dry_run:
+        RescoreRun.objects.filter(pk=run.pk, status='running').update(status='completed', finished_at=timezone.now())
@@ -0,0 +1,27 @@
+from rest_framework import serializers
+from .models import TestResult
+from .norms import norm_scores
+
+
+class AnswerInputSerializer(serializers.Serializer):
+    """A single answer posted by the test-taking client"""
+    question = serializers.IntegerField(min_value=1)
+    choices = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    text_answer = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    number_answer = serializers.FloatField(required=False, allow_null=True)
+
+class AnswerBatchSerializer(serializers.Serializer):
+    answers = AnswerInputSerializer(many=True, allow_empty=False, max_length=500)
+
+class TestResultSerializer(serializers.ModelSerializer):
+    norms = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = TestResult
+        fields = [
+            'id', 'session', 'test', 'total_score', 'max_score', 'percentage',
+            'interpretation', 'recommendations', 'subscale_scores', 'norms', 'generated_at'
+        ]
+    
+    def get_norms(self, obj):
+        return norm_scores(obj)
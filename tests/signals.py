@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Choice, InterpretationBand, PsychologicalTest, Question, TestCategory
+from .catalog import bump_catalog_version
+from .definition import invalidate_test_definition
+
+
+@receiver([post_save, post_delete], sender=PsychologicalTest)
+@receiver([post_save, post_delete], sender=TestCategory)
+def invalidate_test_catalog(sender, **kwargs):
+    """Drop cached catalog summaries whenever a test or category changes"""
+    bump_catalog_version()
+
+
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=InterpretationBand)
+def invalidate_test_definition_of(sender, instance, **kwargs):
+    invalidate_test_definition(instance.test_id)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def invalidate_choice_definition(sender, instance, **kwargs):
+    # The question may already be gone when choices are deleted in its
+    # cascade; the question's own signal has invalidated the test then
+    test_id = Question.objects.filter(pk=instance.question_id).values_list('test_id', flat=True).first()
+    if test_id:
+        invalidate_test_definition(test_id)
@@ -0,0 +1,83 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .answers import answer_buffer_key
+from .definition import get_test_definition
+from .models import Answer, TestSession
+
+logger = logging.getLogger(__name__)
+
+SWEEP_STATS_KEY = 'tests:sweeper:last_run'
+SWEEP_STATS_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _id_chunks(queryset, chunk_size):
+    """Primary keys of ``queryset`` in ascending chunks, paged by id"""
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def sweep_abandoned_sessions(older_than=None, purge_answers=None, chunk_size=1000):
+    """
+    Mark in-progress test sessions started more than ``older_than`` ago as
+    abandoned, one bulk UPDATE per chunk, and drop their buffered answers.
+
+    With ``purge_answers`` the Answer rows of abandoned sessions are deleted
+    in chunks as well. The counts of the run are logged and kept in the
+    cache under ``SWEEP_STATS_KEY`` for monitoring, and returned.
+    """
+    if older_than is None:
+        older_than = timedelta(hours=getattr(settings, 'TESTS_SESSION_ABANDON_HOURS', 24))
+    if purge_answers is None:
+        purge_answers = getattr(settings, 'TESTS_PURGE_ABANDONED_ANSWERS', True)
+    now = timezone.now()
+    cutoff = now - older_than
+
+    abandoned = 0
+    definitions = {}
+    stale = TestSession.objects.filter(status='in_progress', started_at__lt=cutoff)
+    for chunk in _id_chunks(stale, chunk_size):
+        # Re-check the status so a session submitted meanwhile is left alone
+        abandoned += TestSession.objects.filter(id__in=chunk, status='in_progress').update(
+            status='abandoned', current_question=None
+        )
+        # Answers are buffered per question, so the keys come from each test's questions
+        buffer_keys = []
+        for session_id, test_id in TestSession.objects.filter(id__in=chunk).values_list('id', 'test_id'):
+            if test_id not in definitions:
+                definitions[test_id] = get_test_definition(test_id)
+            buffer_keys.extend(answer_buffer_key(session_id, question_id) for question_id in definitions[test_id].question_ids)
+        cache.delete_many(buffer_keys)
+
+    purged = 0
+    if purge_answers:
+        with_answers = TestSession.objects.filter(status='abandoned', answers__isnull=False).distinct()
+        for chunk in _id_chunks(with_answers, chunk_size):
+            purged += Answer.objects.filter(session_id__in=chunk).delete()[1].get(Answer._meta.label, 0)
+
+    stats = {
+        'ran_at': now.isoformat(),
+        'cutoff': cutoff.isoformat(),
+        'abandoned_sessions': abandoned,
+        'purged_answers': purged,
+        'in_progress_sessions': TestSession.objects.filter(status='in_progress').count(),
+    }
+    cache.set(SWEEP_STATS_KEY, stats, SWEEP_STATS_TIMEOUT)
+    logger.info(
+        'Test session sweep: %(abandoned_sessions)s sessions abandoned, %(purged_answers)s answers purged, '
+        '%(in_progress_sessions)s still in progress', stats
+    )
+    return stats
+
+
+def last_sweep_stats():
+    return cache.get(SWEEP_STATS_KEY)
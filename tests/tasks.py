@@ -0,0 +1,41 @@
+from celery import shared_task
+
+from .item_analysis import generate_item_analysis_report
+from .norms import compute_all_test_norms
+from .models import RescoreRun
+from .scoring import rescore_test
+from .sweeper import sweep_abandoned_sessions
+
+
+@shared_task(ignore_result=True)
+def rescore_test_task(test_id, chunk_size=500, run_id=None):
+    """
+    Regenerate a test's results in the background. Given a ``run_id`` the
+    run resumes from its checkpoint, unless it has finished or been
+    superseded meanwhile.
+    """
+    run = None
+    if run_id is not None:
+        run = RescoreRun.objects.filter(pk=run_id, test_id=test_id, status='running').first()
+        if run is None:
+            return
+    for _ in rescore_test(test_id, chunk_size, run=run):
+        pass
+
+
+@shared_task(ignore_result=True)
+def compute_test_norms_task():
+    """Scheduled rebuild of every active test's norm tables"""
+    compute_all_test_norms()
+
+
+@shared_task(ignore_result=True)
+def item_analysis_task(test_id):
+    """Build a test's item-analysis report off the request path"""
+    generate_item_analysis_report(test_id)
+
+
+@shared_task(ignore_result=True)
+def sweep_abandoned_sessions_task():
+    """Periodically close test sessions nobody is going to finish"""
+    sweep_abandoned_sessions()
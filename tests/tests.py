@@ -1,3 +1,508 @@
-from django.test import TestCase
+import importlib
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.admin.sites import site
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .admin import TestSessionAdmin
+from .answers import AnswerValidationError, buffer_answers, commit_answers, get_buffered_answers
+from .catalog import catalog_summary, recompute_completion_counts
+from .definition import get_test_definition
+from .history import downsample, result_history
+from .item_analysis import analyze_test_items, cronbach_alpha, generate_item_analysis_report, item_statistics
+from .norms import NormTable, build_norm_fields, compute_test_norms, norm_scores
+from .models import (
+    Answer, Choice, InterpretationBand, PsychologicalTest, Question, RescoreRun, TestCategory, TestResult, TestSession,
+)
+from .scoring import rescore_test, resumable_rescore_run, save_results, score_sessions, start_rescore_run
+from .sweeper import last_sweep_stats, sweep_abandoned_sessions
+
+User = get_user_model()
+
+
+class PsychologicalTestMixin:
+    """A Likert test whose choices score 0-3, shared by the test service tests"""
+
+    def make_test(self, questions=4, **kwargs):
+        if not hasattr(self, 'author'):
+            self.author = User.objects.create_user(email='author@example.com', password='pass')
+            self.category = TestCategory.objects.create(name='Anxiety')
+        defaults = {
+            'title': 'Anxiety Scale',
+            'description': 'Description',
+            'category': self.category,
+            'test_type': 'clinical',
+            'difficulty': 'easy',
+            'estimated_duration': 10,
+            'instructions': 'Instructions',
+            'created_by': self.author,
+        }
+        defaults.update(kwargs)
+        test = PsychologicalTest.objects.create(**defaults)
+        for order in range(1, questions + 1):
+            question = Question.objects.create(
+                test=test, question_text=f'Question {order}', question_type='likert_scale', order=order
+            )
+            for score in range(4):
+                Choice.objects.create(
+                    question=question, choice_text=f'Choice {score}', value=str(score), order=score + 1, score=score
+                )
+        return test
+
+    def choice_for(self, question_id, score):
+        return Choice.objects.get(question_id=question_id, score=score).pk
+
+    def complete_session(self, test, user, scores):
+        """A completed, scored session answering every question with the given choice scores"""
+        session = TestSession.objects.create(user=user, test=test)
+        definition = get_test_definition(test.pk)
+        buffer_answers(session, self.answers(test, scores), definition)
+        commit_answers(session, definition)
+        return session
+
+    def answers(self, test, scores):
+        """clean_answer arguments for each question in order, with the given choice scores"""
+        question_ids = list(test.questions.order_by('order').values_list('id', flat=True))
+        return {
+            question_id: {'choices': [self.choice_for(question_id, score)]}
+            for question_id, score in zip(question_ids, scores)
+        }
+
+
+class AnswerBufferTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=8)
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+        self.session = TestSession.objects.create(user=self.user, test=self.test)
+        self.definition = get_test_definition(self.test.pk)
+
+    def test_concurrent_autosaves_keep_every_question(self):
+        answers = self.answers(self.test, [1] * 8)
+        barrier = threading.Barrier(len(answers))
+
+        def autosave(question_id, raw):
+            barrier.wait()
+            buffer_answers(self.session, {question_id: raw}, self.definition)
+
+        threads = [threading.Thread(target=autosave, args=item) for item in answers.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(set(get_buffered_answers(self.session.pk, self.definition.question_ids)), set(answers))
+
+    def test_rejects_choices_of_other_questions(self):
+        first, second = self.definition.question_ids[:2]
+
+        with self.assertRaises(AnswerValidationError) as raised:
+            buffer_answers(self.session, {first: {'choices': [self.choice_for(second, 0)]}}, self.definition)
+        self.assertIn(first, raised.exception.errors)
+
+    def test_commit_requires_every_answer_then_scores_and_clears(self):
+        answers = self.answers(self.test, [1, 2, 3, 0, 1, 2, 3, 0])
+        buffer_answers(self.session, dict(list(answers.items())[:4]), self.definition)
+        with self.assertRaises(AnswerValidationError):
+            commit_answers(self.session, self.definition)
+
+        buffer_answers(self.session, answers, self.definition)
+        with self.captureOnCommitCallbacks(execute=True):
+            result = commit_answers(self.session, self.definition)
+
+        self.assertEqual(result.total_score, 12)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'completed')
+        self.assertEqual(get_buffered_answers(self.session.pk, self.definition.question_ids), {})
+
+
+class RescoreTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=2)
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+        self.sessions = [self.complete_session(self.test, self.user, [1, 1]) for _ in range(3)]
+        # Double every choice score; the stored results are now stale
+        for choice in Choice.objects.filter(question__test=self.test):
+            choice.score *= 2
+            choice.save()
+
+    def scores(self):
+        return list(TestResult.objects.filter(test=self.test).order_by('session_id').values_list('total_score', flat=True))
+
+    def test_rescore_updates_results_and_completes_the_run(self):
+        self.assertEqual(self.scores(), [2, 2, 2])
+
+        list(rescore_test(self.test.pk, chunk_size=2))
+
+        self.assertEqual(self.scores(), [4, 4, 4])
+        self.assertIsNone(resumable_rescore_run(self.test.pk))
+        self.assertEqual(RescoreRun.objects.get(test=self.test).status, 'completed')
+
+    def test_interrupted_run_resumes_from_its_checkpoint(self):
+        run = start_rescore_run(self.test.pk)
+        next(rescore_test(self.test.pk, chunk_size=1, run=run))
+        TestResult.objects.filter(session=self.sessions[0]).update(total_score=0)
+
+        list(rescore_test(self.test.pk, chunk_size=1, run=resumable_rescore_run(self.test.pk)))
+
+        # The first session was done before the interruption and is not rescored again
+        self.assertEqual(self.scores(), [0, 4, 4])
+
+    def test_new_run_ignores_and_supersedes_an_old_checkpoint(self):
+        stale = start_rescore_run(self.test.pk)
+        RescoreRun.objects.filter(pk=stale.pk).update(last_session_id=self.sessions[-1].pk)
+
+        list(rescore_test(self.test.pk))
+
+        self.assertEqual(self.scores(), [4, 4, 4])
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'superseded')
+        self.assertEqual(list(rescore_test(self.test.pk, run=stale)), [])
+
+
+class TestSessionAdminTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=2)
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+        self.admin = TestSessionAdmin(TestSession, site)
+
+    def assert_answers_shown(self, session):
+        html = self.admin.answers_display(session)
+        self.assertIn('Question 1', html)
+        self.assertIn('Choice 2', html)
+        self.assertIn('Choice 3', html)
+
+    @override_settings(TESTS_COMPACT_ANSWERS=True)
+    def test_shows_answers_of_packed_sessions(self):
+        session = self.complete_session(self.test, self.user, [2, 3])
+        self.assertIsNotNone(session.answer_sheet)
+
+        self.assert_answers_shown(session)
+
+    @override_settings(TESTS_COMPACT_ANSWERS=False)
+    def test_shows_answers_stored_as_rows(self):
+        session = self.complete_session(self.test, self.user, [2, 3])
+        self.assertIsNone(session.answer_sheet)
+
+        self.assert_answers_shown(session)
+
+
+class CatalogSummaryTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+
+    def test_summary_is_refreshed_when_a_test_changes(self):
+        self.make_test(questions=1)
+        self.assertEqual(catalog_summary()['total_tests'], 1)
+
+        self.make_test(questions=1, title='Depression Scale', is_free=False, price=10)
+        summary = catalog_summary()
+
+        self.assertEqual((summary['total_tests'], summary['free_tests_count'], summary['paid_tests_count']), (2, 1, 1))
+        self.assertEqual(summary['categories'][0].test_count, 2)
+
+    def test_completions_rank_popular_tests_and_can_be_recomputed(self):
+        self.make_test(questions=1, title='Quiet')
+        busy = self.make_test(questions=1, title='Busy')
+        for _ in range(2):
+            self.complete_session(busy, self.user, [1])
+
+        busy.refresh_from_db()
+        self.assertEqual(busy.completion_count, 2)
+        self.assertEqual(catalog_summary()['popular_tests'][0], busy)
+
+        PsychologicalTest.objects.update(completion_count=7)
+        recompute_completion_counts()
+        self.assertEqual(
+            dict(PsychologicalTest.objects.values_list('title', 'completion_count')), {'Quiet': 0, 'Busy': 2}
+        )
+
+    def test_migration_backfills_completion_counts(self):
+        quiet = self.make_test(questions=1, title='Quiet')
+        busy = self.make_test(questions=1, title='Busy')
+        for _ in range(2):
+            self.complete_session(busy, self.user, [1])
+        TestSession.objects.create(user=self.user, test=quiet)
+        PsychologicalTest.objects.update(completion_count=0)
+
+        migration = importlib.import_module('tests.migrations.0010_backfill_completion_counts')
+        migration.backfill_completion_counts(apps, None)
+
+        self.assertEqual(
+            dict(PsychologicalTest.objects.values_list('title', 'completion_count')), {'Quiet': 0, 'Busy': 2}
+        )
+
+
+class TestDefinitionTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=3)
+        self.question_ids = list(self.test.questions.order_by('order').values_list('id', flat=True))
+
+    def test_navigation_follows_question_order(self):
+        definition = get_test_definition(self.test.pk)
+        first, second, third = self.question_ids
+
+        self.assertEqual(definition.question_ids, self.question_ids)
+        self.assertIsNone(definition.previous_question(first))
+        self.assertEqual(definition.next_question(first)['id'], second)
+        self.assertEqual(definition.previous_question(third)['id'], second)
+        self.assertIsNone(definition.next_question(third))
+        self.assertAlmostEqual(definition.progress_percentage(second), 100 / 3)
+        self.assertEqual(definition.choice_ids_for(first), set(Choice.objects.filter(question_id=first).values_list('id', flat=True)))
+
+    def test_cached_definition_is_rebuilt_without_queries(self):
+        get_test_definition(self.test.pk)
+
+        with self.assertNumQueries(0):
+            definition = get_test_definition(self.test.pk)
+            definition.next_question(self.question_ids[0])
+
+    def test_payload_hides_scoring_keys(self):
+        payload = get_test_definition(self.test.pk).as_payload()
+
+        self.assertNotIn('is_reverse_keyed', payload[0])
+        self.assertNotIn('score', payload[0]['choices'][0])
+        self.assertEqual(payload[0]['choices'][0]['choice_text'], 'Choice 0')
+
+    def test_question_changes_invalidate_the_definition(self):
+        get_test_definition(self.test.pk)
+
+        Question.objects.get(pk=self.question_ids[0]).delete()
+        Choice.objects.create(question_id=self.question_ids[1], choice_text='Choice 4', value='4', order=5, score=4)
+
+        definition = get_test_definition(self.test.pk)
+        self.assertEqual(definition.question_ids, self.question_ids[1:])
+        self.assertEqual(len(definition.get_question(self.question_ids[1])['choices']), 5)
+
+
+class ScoringEngineTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        self.test = self.make_test(questions=4)
+        first, second, third, fourth = self.test.questions.order_by('order')
+        Question.objects.filter(pk__in=[first.pk, second.pk]).update(subscale='worry')
+        Question.objects.filter(pk=third.pk).update(is_reverse_keyed=True)
+        InterpretationBand.objects.create(test=self.test, min_percentage=0, max_percentage=50, label='Low', interpretation='Low')
+        InterpretationBand.objects.create(test=self.test, min_percentage=50.01, max_percentage=100, label='High', interpretation='High')
+        InterpretationBand.objects.create(
+            test=self.test, subscale='worry', min_percentage=80, max_percentage=100, label='Worried', interpretation='Worried'
+        )
+        cache.clear()
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+
+    def test_reverse_keying_subscales_and_bands(self):
+        session = self.complete_session(self.test, self.user, [3, 2, 0, 1])
+
+        result = session.result
+        # The reverse-keyed 0 counts as 3
+        self.assertEqual((result.total_score, result.max_score, result.percentage), (9, 12, 75))
+        self.assertEqual(result.interpretation, 'High')
+        self.assertEqual(result.subscale_scores['worry'], {'score': 5, 'max_score': 6, 'percentage': 83.33, 'label': 'Worried'})
+
+    def test_batch_scoring_matches_single_sessions(self):
+        patterns = [[0, 0, 3, 0], [1, 2, 3, 0], [3, 3, 0, 3]]
+        sessions = [self.complete_session(self.test, self.user, scores) for scores in patterns]
+
+        batch = score_sessions(self.test.pk, [session.pk for session in sessions])
+
+        for session in sessions:
+            self.assertEqual(batch[session.pk], score_sessions(self.test.pk, [session.pk])[session.pk])
+        self.assertEqual([batch[session.pk]['total_score'] for session in sessions], [0, 3, 12])
+        self.assertEqual([batch[session.pk]['interpretation'] for session in sessions], ['Low', 'Low', 'High'])
+
+    def test_save_results_reports_changes_and_honours_dry_run(self):
+        session = self.complete_session(self.test, self.user, [3, 3, 3, 3])
+        Choice.objects.filter(question__test=self.test, score=3).update(score=6)
+        cache.clear()
+
+        results, created, changes = save_results(self.test.pk, [session.pk], dry_run=True)
+
+        self.assertEqual(created, 0)
+        self.assertEqual(changes[session.pk]['total_score'], (9, 18))
+        self.assertEqual(TestResult.objects.get(session=session).total_score, 9)
+
+        save_results(self.test.pk, [session.pk])
+        self.assertEqual(TestResult.objects.get(session=session).total_score, 18)
+
+
+class NormTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=1)
+        today = timezone.localdate()
+        self.results = {}
+        for name, gender, years, score in [
+            ('young0', 'F', 25, 0), ('young1', 'F', 25, 1), ('young2', 'F', 25, 2), ('old0', 'M', 50, 3), ('old1', 'M', 50, 3),
+        ]:
+            user = User.objects.create_user(
+                email=f'{name}@example.com', password='pass', gender=gender, birth_date=today - timedelta(days=years * 366)
+            )
+            self.results[name] = self.complete_session(self.test, user, [score]).result
+
+    def compute(self, min_sample):
+        with self.captureOnCommitCallbacks(execute=True):
+            return compute_test_norms(self.test.pk, min_sample=min_sample)
+
+    def test_percentiles_use_mid_ranks(self):
+        table = NormTable(**build_norm_fields([1, 2, 2, 3]))
+
+        self.assertEqual([table.percentile(score) for score in (0, 1, 2, 3, 4)], [0, 12.5, 50, 87.5, 100])
+        self.assertEqual(table.t_score(2), 50)
+        self.assertEqual(table.t_score(3), 64.1)
+
+    def test_most_specific_group_is_used(self):
+        self.assertIsNone(norm_scores(self.results['old0']))
+        self.assertEqual(self.compute(min_sample=2), 7)
+
+        scores = norm_scores(self.results['old0'])
+
+        self.assertEqual((scores['age_band'], scores['gender'], scores['sample_size']), ('45-64', 'M', 2))
+        self.assertEqual(scores['percentile'], 50)
+
+    def test_small_groups_are_dropped_and_fall_back(self):
+        self.compute(min_sample=2)
+        self.assertEqual(self.compute(min_sample=3), 4)
+
+        scores = norm_scores(self.results['old0'])
+
+        self.assertEqual((scores['age_band'], scores['gender'], scores['sample_size']), ('', '', 5))
+        self.assertEqual(scores['percentile'], 80)
+
+
+class ItemAnalysisTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=3)
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+
+    def test_alpha_and_alpha_if_deleted(self):
+        self.assertEqual(cronbach_alpha(np.array([[0, 0], [1, 1], [3, 3]], dtype=float)), 1)
+        self.assertIsNone(cronbach_alpha(np.array([[1, 2]], dtype=float)))
+
+        items = np.array([[0, 1, 3], [1, 1, 2], [2, 3, 3], [3, 2, 0], [3, 3, 1]], dtype=float)
+        difficulty, correlation, deviation, alpha_if_deleted = item_statistics(items, np.zeros(3), np.full(3, 3.0))
+
+        for index in range(3):
+            self.assertAlmostEqual(alpha_if_deleted[index], cronbach_alpha(np.delete(items, index, axis=1)))
+        self.assertAlmostEqual(difficulty[0], 0.6)
+        self.assertLess(correlation[2], 0)
+
+    def test_report_covers_every_scored_item(self):
+        for scores in ([0, 0, 3], [1, 1, 3], [2, 3, 3], [3, 3, 3]):
+            self.complete_session(self.test, self.user, scores)
+
+        report = generate_item_analysis_report(self.test.pk)
+
+        data = report.data
+        self.assertEqual((data['sessions'], data['complete_sessions']), (4, 4))
+        self.assertEqual([item['question_text'] for item in data['items']], ['Question 1', 'Question 2', 'Question 3'])
+        # An item everyone answers the same way has no spread to correlate
+        self.assertEqual((data['items'][2]['difficulty'], data['items'][2]['item_total_correlation']), (1, 0))
+        self.assertEqual(report.generated_by, self.author)
+
+    def test_too_few_sessions_give_no_statistics(self):
+        self.complete_session(self.test, self.user, [1, 2, 3])
+
+        data = analyze_test_items(self.test.pk)
+
+        self.assertEqual((data['sessions'], data['alpha'], data['items']), (1, None, []))
+
+
+class SweepAbandonedSessionsTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=2)
+        self.definition = get_test_definition(self.test.pk)
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+        self.stale = [TestSession.objects.create(user=self.user, test=self.test) for _ in range(3)]
+        self.fresh = TestSession.objects.create(user=self.user, test=self.test)
+        TestSession.objects.filter(pk__in=[session.pk for session in self.stale]).update(
+            started_at=timezone.now() - timedelta(days=2)
+        )
+        buffer_answers(self.stale[0], self.answers(self.test, [1]), self.definition)
+        Answer.objects.create(session=self.stale[1], question_id=self.definition.question_ids[0])
+
+    def statuses(self):
+        return list(TestSession.objects.order_by('pk').values_list('status', flat=True))
+
+    def test_stale_sessions_are_abandoned_in_chunks(self):
+        stats = sweep_abandoned_sessions(chunk_size=2)
+
+        self.assertEqual(self.statuses(), ['abandoned'] * 3 + ['in_progress'])
+        self.assertEqual(get_buffered_answers(self.stale[0].pk, self.definition.question_ids), {})
+        self.assertFalse(Answer.objects.exists())
+        self.assertEqual((stats['abandoned_sessions'], stats['purged_answers'], stats['in_progress_sessions']), (3, 1, 1))
+        self.assertEqual(last_sweep_stats(), stats)
+
+    def test_answers_can_be_kept(self):
+        stats = sweep_abandoned_sessions(older_than=timedelta(days=3), purge_answers=False)
+        self.assertEqual(stats['abandoned_sessions'], 0)
+
+        sweep_abandoned_sessions(purge_answers=False)
+
+        self.assertEqual(self.statuses(), ['abandoned'] * 3 + ['in_progress'])
+        self.assertEqual(Answer.objects.count(), 1)
+
+
+class ResultHistoryTests(PsychologicalTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test = self.make_test(questions=1)
+        self.other = self.make_test(questions=1, title='Depression Scale')
+        self.user = User.objects.create_user(email='client@example.com', password='pass')
+        start = timezone.now() - timedelta(days=10)
+        for day, (test, score) in enumerate([(self.test, 1), (self.other, 3), (self.test, 3), (self.test, 2)]):
+            result = self.complete_session(test, self.user, [score]).result
+            TestResult.objects.filter(pk=result.pk).update(generated_at=start + timedelta(days=day))
+        self.complete_session(self.test, User.objects.create_user(email='other@example.com', password='pass'), [0])
+
+    def test_series_per_test_with_deltas(self):
+        history = result_history(self.user.pk)
+
+        series = history[self.test.pk]
+        self.assertEqual(set(history), {self.test.pk, self.other.pk})
+        self.assertEqual([point['total_score'] for point in series['points']], [1, 3, 2])
+        self.assertEqual([point['delta'] for point in series['points']], [None, 2, -1])
+        self.assertEqual((series['attempts'], series['best_score'], series['change'], series['downsampled']), (3, 3, 1, False))
+        self.assertEqual(list(result_history(self.user.pk, test_ids=[self.other.pk])), [self.other.pk])
+
+    def test_downsampling_keeps_the_ends_and_spikes(self):
+        values = [0.0] * 100
+        values[37] = 10.0
+
+        kept = downsample(values, 10)
+
+        self.assertEqual(len(kept), 10)
+        self.assertEqual((kept[0], kept[-1]), (0, 99))
+        self.assertIn(37, kept)
+        self.assertEqual(list(downsample(values[:5], 10)), [0, 1, 2, 3, 4])
+
+    def test_downsampled_points_keep_deltas_to_the_previous_attempt(self):
+        for score in (0, 3):
+            self.complete_session(self.test, self.user, [score])
+
+        series = result_history(self.user.pk, max_points=3)[self.test.pk]
+
+        # Scores 1, 3, 2, 0, 3: the middle bucket keeps the dip to 0
+        self.assertTrue(series['downsampled'])
+        self.assertEqual([point['attempt'] for point in series['points']], [1, 4, 5])
+        self.assertEqual([point['delta'] for point in series['points']], [None, -2, 3])
@@ -2,10 +2,16 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.db.models import Q, Count
 from django.utils import timezone
 from .models import PsychologicalTest, TestCategory, TestSession, TestResult, Question, Answer
+from .definition import get_test_definition
+from .answers import AnswerValidationError, buffer_answers, commit_answers
+from .norms import norm_scores
+from .answer_sheets import session_answers
+from .catalog import catalog_summary, related_tests
+from .history import result_history
 
 
 class TestListView(ListView):
@@ -20,17 +26,12 @@ class TestListView(ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = TestCategory.objects.filter(is_active=True)
-        context['featured_tests'] = PsychologicalTest.objects.filter(
-            is_active=True
-        ).select_related('category', 'created_by')[:6]
-        context['total_tests'] = PsychologicalTest.objects.filter(is_active=True).count()
-        context['free_tests_count'] = PsychologicalTest.objects.filter(
-            is_active=True, is_free=True
-        ).count()
-        context['popular_tests'] = PsychologicalTest.objects.filter(
-            is_active=True
-        ).select_related('category', 'created_by')[:5]
+        summary = catalog_summary()
+        context['categories'] = summary['categories']
+        context['featured_tests'] = summary['featured_tests']
+        context['total_tests'] = summary['total_tests']
+        context['free_tests_count'] = summary['free_tests_count']
+        context['popular_tests'] = summary['popular_tests']
         return context
 
 
@@ -51,7 +52,7 @@ class TestCategoryView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['category'] = self.category
-        context['categories'] = TestCategory.objects.filter(is_active=True)
+        context['categories'] = catalog_summary()['categories']
         return context
 
 
@@ -66,25 +67,21 @@ class TestDetailView(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        test = self.get_object()
+        test = self.object
         
         # Get related tests
-        context['related_tests'] = PsychologicalTest.objects.filter(
-            is_active=True,
-            category=test.category
-        ).exclude(id=test.id).select_related('category', 'created_by')[:3]
+        context['related_tests'] = related_tests(test)
         
-        # Get user's test result if exists
+        # Get user's latest test result and score history if any
         if self.request.user.is_authenticated:
-            try:
-                context['user_test_result'] = TestResult.objects.get(
-                    session__user=self.request.user,
-                    session__test=test
-                )
-            except TestResult.DoesNotExist:
-                context['user_test_result'] = None
+            context['user_test_result'] = TestResult.objects.filter(
+                user=self.request.user,
+                test=test
+            ).order_by('-generated_at').first()
+            context['user_result_history'] = result_history(self.request.user.id, test_ids=[test.id]).get(test.id)
         else:
             context['user_test_result'] = None
+            context['user_result_history'] = None
             
         return context
 
@@ -125,81 +122,81 @@ class TestQuestionView(LoginRequiredMixin, DetailView):
     template_name = 'tests/test_session.html'
     context_object_name = 'session'
     
+    def get_queryset(self):
+        return TestSession.objects.filter(user=self.request.user)
+    
+    def get_question(self, definition):
+        question = definition.get_question(self.kwargs['question_pk'])
+        if question is None:
+            raise Http404('Question does not belong to this test')
+        return question
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        session = self.get_object()
-        question = get_object_or_404(Question, pk=self.kwargs['question_pk'])
-        
-        # Get all questions for this test
-        all_questions = session.test.questions.all().order_by('order')
-        current_index = list(all_questions).index(question)
+        definition = get_test_definition(self.object.test_id)
+        question = self.get_question(definition)
+        current_index = definition.index_of(question['id'])
         
         context['question'] = question
         context['current_question_number'] = current_index + 1
-        context['total_questions'] = all_questions.count()
-        context['progress_percentage'] = (current_index / all_questions.count()) * 100
+        context['total_questions'] = definition.question_count
+        context['progress_percentage'] = definition.progress_percentage(question['id'])
         
         # Navigation
-        context['has_previous'] = current_index > 0
-        context['has_next'] = current_index < all_questions.count() - 1
-        
-        if context['has_previous']:
-            context['previous_question'] = all_questions[current_index - 1]
-        if context['has_next']:
-            context['next_question'] = all_questions[current_index + 1]
+        context['previous_question'] = definition.previous_question(question['id'])
+        context['next_question'] = definition.next_question(question['id'])
+        context['has_previous'] = context['previous_question'] is not None
+        context['has_next'] = context['next_question'] is not None
             
         return context
     
     def post(self, request, *args, **kwargs):
         session = self.get_object()
-        question = get_object_or_404(Question, pk=self.kwargs['question_pk'])
-        
-        # Save the answer
-        answer, created = Answer.objects.get_or_create(
-            session=session,
-            question=question
-        )
+        if session.status != 'in_progress':
+            return redirect('tests:test_session', session.pk)
+        definition = get_test_definition(session.test_id)
+        question = self.get_question(definition)
         
-        # Update answer based on question type
-        if question.question_type == 'single_choice':
-            choice_id = request.POST.get('choice')
-            if choice_id:
-                answer.selected_choices.clear()
-                answer.selected_choices.add(choice_id)
-        elif question.question_type == 'multiple_choice':
-            choice_ids = request.POST.getlist('choices')
-            answer.selected_choices.clear()
-            for choice_id in choice_ids:
-                answer.selected_choices.add(choice_id)
-        elif question.question_type == 'text':
-            answer.text_answer = request.POST.get('text_answer', '')
-        elif question.question_type == 'number':
-            answer.number_answer = request.POST.get('number_answer')
-            
-        answer.save()
+        # Keep the answer in the buffer; rows are written once at submit
+        try:
+            buffer_answers(session, {question['id']: {
+                'choices': request.POST.getlist('choices') or request.POST.getlist('choice'),
+                'text_answer': request.POST.get('text_answer'),
+                'number_answer': request.POST.get('number_answer'),
+            }}, definition)
+        except AnswerValidationError as exc:
+            messages.error(request, exc.errors[question['id']])
+            return redirect('tests:test_question', session.pk, question['id'])
         
         # Navigate to next question or finish test
-        all_questions = session.test.questions.all().order_by('order')
-        current_index = list(all_questions).index(question)
+        next_question = definition.next_question(question['id'])
         
-        if current_index < all_questions.count() - 1:
-            next_question = all_questions[current_index + 1]
-            return redirect('tests:test_question', session.pk, next_question.pk)
+        if next_question is not None:
+            return redirect('tests:test_question', session.pk, next_question['id'])
         else:
-            # Test completed
-            session.status = 'completed'
-            session.completed_at = timezone.now()
-            session.save()
             return redirect('tests:test_session_submit', session.pk)
 
 
-class TestSessionSubmitView(CreateView):
+class TestSessionSubmitView(LoginRequiredMixin, CreateView):
     """View for submitting test sessions"""
     template_name = 'tests/test_submit.html'
     
     def get(self, request, *args, **kwargs):
-        session = get_object_or_404(TestSession, pk=kwargs['pk'])
+        session = get_object_or_404(TestSession, pk=kwargs['pk'], user=request.user)
         return render(request, self.template_name, {'session': session})
+    
+    def post(self, request, *args, **kwargs):
+        session = get_object_or_404(TestSession, pk=kwargs['pk'], user=request.user)
+        try:
+            result = commit_answers(session)
+        except AnswerValidationError as exc:
+            for message in exc.errors.values():
+                messages.error(request, message)
+            question_ids = [key for key in exc.errors if isinstance(key, int)]
+            if question_ids:
+                return redirect('tests:test_question', session.pk, question_ids[0])
+            return redirect('tests:test_session', session.pk)
+        return redirect('tests:test_result', result.pk)
 
 
 class TestResultView(DetailView):
@@ -207,6 +204,22 @@ class TestResultView(DetailView):
     model = TestResult
     template_name = 'tests/test_result.html'
     context_object_name = 'result'
+    
+    def get_queryset(self):
+        return TestResult.objects.select_related('session__user', 'session__test')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['norms'] = norm_scores(self.object)
+        
+        # Answers in question order, read from the packed sheet when present
+        definition = get_test_definition(self.object.session.test_id)
+        answers = session_answers(self.object.session)
+        context['answers'] = [
+            {'question': definition.get_question(question_id), 'answer': answers.get(question_id)}
+            for question_id in definition.question_ids
+        ]
+        return context
 
 
 class UserTestResultsView(ListView):
@@ -218,8 +231,8 @@ class UserTestResultsView(ListView):
     
     def get_queryset(self):
         return TestResult.objects.filter(
-            session__user=self.request.user
-        ).select_related('session__test')
+            user=self.request.user
+        ).select_related('session__test').order_by('-generated_at')
 
 
 class FreeTestListView(ListView):
@@ -233,4 +246,12 @@ class FreeTestListView(ListView):
         return PsychologicalTest.objects.filter(
             is_active=True,
             is_free=True
-        ).select_related('category', 'created_by')
\ No newline at end of file
+        ).select_related('category', 'created_by')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        summary = catalog_summary()
+        context['categories'] = summary['categories']
+        context['free_tests_count'] = summary['free_tests_count']
+        context['total_tests'] = summary['total_tests']
+        return context
@@ -2,8 +2,8 @@ from django.urls import path
 from .api_views import (
     TherapistListAPIView, TherapistDetailAPIView, SessionTypeListAPIView,
     SessionBookingCreateAPIView, UserSessionListAPIView, SessionDetailAPIView,
-    SessionRatingAPIView, therapist_availability, confirm_session,
-    cancel_session, TherapistStatsAPIView
+    SessionRatingAPIView, therapist_availability, earliest_available_slots,
+    confirm_session, cancel_session, TherapistStatsAPIView
 )
 
 urlpatterns = [
@@ -12,6 +12,7 @@ urlpatterns = [
     path('therapists/<int:pk>/', TherapistDetailAPIView.as_view(), name='api_therapist_detail'),
     path('therapists/<int:therapist_id>/availability/', therapist_availability, name='api_therapist_availability'),
     path('therapists/<int:therapist_id>/stats/', TherapistStatsAPIView.as_view(), name='api_therapist_stats'),
+    path('slots/earliest/', earliest_available_slots, name='api_earliest_slots'),
     
     # Session Types
     path('session-types/', SessionTypeListAPIView.as_view(), name='api_session_types'),
@@ -1,17 +1,26 @@
 from rest_framework import generics, views, status, permissions, filters
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Avg
 from django.utils import timezone
-from .models import Therapist, Session, SessionType, SessionBooking
+from .models import Session, SessionType, SessionRating, SessionCancellation
 from .serializers import (
     TherapistSerializer, SessionTypeSerializer, SessionBookingSerializer,
     SessionSerializer, SessionRatingSerializer
 )
+from .availability import available_slots, earliest_slots
+from .booking import BookingError, book_session
+from .stats import stats_for
 from django_filters.rest_framework import DjangoFilterBackend
 import jdatetime
 
+User = get_user_model()
+
+MAX_AVAILABILITY_DAYS = 31
+MAX_EARLIEST_SLOTS = 50
+
 class TherapistListAPIView(generics.ListAPIView):
     """
     List all available therapists with filtering
@@ -19,39 +28,36 @@ class TherapistListAPIView(generics.ListAPIView):
     serializer_class = TherapistSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['specialization', 'is_available']
-    search_fields = ['user__first_name', 'user__last_name', 'bio', 'education']
-    ordering_fields = ['hourly_rate', 'created_at']
-    ordering = ['-created_at']
+    filterset_fields = ['specialization']
+    search_fields = ['first_name', 'last_name', 'bio', 'specialization']
+    ordering_fields = ['hourly_rate', 'experience_years', 'date_joined']
+    ordering = ['-date_joined']
 
     def get_queryset(self):
-        queryset = Therapist.objects.filter(is_available=True).select_related('user')
-        
+        queryset = User.objects.filter(
+            user_type='therapist', is_active=True, is_available=True
+        ).select_related('therapist_stats')
+
         # Filter by experience years
         experience = self.request.query_params.get('experience')
-        if experience:
-            if experience == '0-2':
-                queryset = queryset.filter(experience_start_date__gte=timezone.now().date().replace(year=timezone.now().year-2))
-            elif experience == '3-5':
-                queryset = queryset.filter(
-                    experience_start_date__gte=timezone.now().date().replace(year=timezone.now().year-5),
-                    experience_start_date__lt=timezone.now().date().replace(year=timezone.now().year-3)
-                )
-            elif experience == '6-10':
-                queryset = queryset.filter(
-                    experience_start_date__gte=timezone.now().date().replace(year=timezone.now().year-10),
-                    experience_start_date__lt=timezone.now().date().replace(year=timezone.now().year-6)
-                )
-            elif experience == '10+':
-                queryset = queryset.filter(experience_start_date__lt=timezone.now().date().replace(year=timezone.now().year-10))
-        
+        if experience == '0-2':
+            queryset = queryset.filter(experience_years__lte=2)
+        elif experience == '3-5':
+            queryset = queryset.filter(experience_years__gte=3, experience_years__lte=5)
+        elif experience == '6-10':
+            queryset = queryset.filter(experience_years__gte=6, experience_years__lte=10)
+        elif experience == '10+':
+            queryset = queryset.filter(experience_years__gt=10)
+
         return queryset
 
 class TherapistDetailAPIView(generics.RetrieveAPIView):
     """
     Get therapist details
     """
-    queryset = Therapist.objects.filter(is_available=True)
+    queryset = User.objects.filter(
+        user_type='therapist', is_active=True, is_available=True
+    ).select_related('therapist_stats')
     serializer_class = TherapistSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -59,7 +65,7 @@ class SessionTypeListAPIView(generics.ListAPIView):
     """
     List all available session types
     """
-    queryset = SessionType.objects.filter(is_available=True)
+    queryset = SessionType.objects.filter(is_active=True)
     serializer_class = SessionTypeSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -71,7 +77,10 @@ class SessionBookingCreateAPIView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        try:
+            serializer.instance = book_session(client=self.request.user, **serializer.validated_data)
+        except BookingError as exc:
+            raise ValidationError({'error': exc.message})
 
 class UserSessionListAPIView(generics.ListAPIView):
     """
@@ -81,12 +90,12 @@ class UserSessionListAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'therapist']
-    ordering_fields = ['start_time', 'created_at']
-    ordering = ['-start_time']
+    ordering_fields = ['scheduled_date', 'created_at']
+    ordering = ['-scheduled_date', '-scheduled_time']
 
     def get_queryset(self):
-        return Session.objects.filter(user=self.request.user).select_related(
-            'therapist__user', 'session_type'
+        return Session.objects.filter(client=self.request.user).select_related(
+            'therapist', 'client', 'session_type'
         )
 
 class SessionDetailAPIView(generics.RetrieveUpdateAPIView):
@@ -97,104 +106,152 @@ class SessionDetailAPIView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Session.objects.filter(user=self.request.user)
+        return Session.objects.filter(client=self.request.user)
 
-class SessionRatingAPIView(generics.UpdateAPIView):
+class SessionRatingAPIView(generics.CreateAPIView):
     """
     Rate a completed session
     """
     serializer_class = SessionRatingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
-        return Session.objects.filter(
-            user=self.request.user,
-            status='completed',
-            rating__isnull=True
+    def perform_create(self, serializer):
+        session = get_object_or_404(
+            Session,
+            pk=self.kwargs['session_id'],
+            client=self.request.user,
+            status='completed'
         )
+        if SessionRating.objects.filter(session=session).exists():
+            raise ValidationError({'error': 'شما قبلاً این جلسه را امتیاز داده‌اید'})
+        serializer.save(session=session)
+
+def parse_persian_date(value):
+    return jdatetime.datetime.strptime(value, '%Y/%m/%d').togregorian().date()
 
-    def perform_update(self, serializer):
-        serializer.save()
+def get_session_type(value):
+    """The active session type of a ``session_type`` query parameter, if given"""
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValidationError({'error': 'نوع جلسه نامعتبر است'})
+    return get_object_or_404(SessionType, id=value, is_active=True)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def therapist_availability(request, therapist_id):
     """
-    Get therapist availability for a specific date
+    Get bookable slots of a therapist from a date on, for a session type's
+    duration (or ``duration`` minutes) over ``days`` days
     """
-    therapist = get_object_or_404(Therapist, id=therapist_id, is_available=True)
+    therapist = get_object_or_404(User, id=therapist_id, user_type='therapist', is_active=True, is_available=True)
     date_str = request.query_params.get('date')
-    
+
     if not date_str:
         return Response({'error': 'تاریخ الزامی است'}, status=status.HTTP_400_BAD_REQUEST)
-    
+
     try:
         # Parse Persian date
-        date_obj = jdatetime.datetime.strptime(date_str, '%Y/%m/%d').date()
+        date_obj = parse_persian_date(date_str)
+        days = int(request.query_params.get('days', 1))
+        duration = int(request.query_params.get('duration', 60))
     except ValueError:
         return Response({'error': 'فرمت تاریخ نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Get booked sessions for the date
-    booked_sessions = Session.objects.filter(
-        therapist=therapist,
-        start_time__date=date_obj,
-        status__in=['scheduled', 'in_progress']
-    ).values_list('start_time__hour', 'end_time__hour')
-    
-    # Generate available time slots (9 AM to 9 PM)
-    available_slots = []
-    for hour in range(9, 21):
-        is_available = True
-        for start_hour, end_hour in booked_sessions:
-            if start_hour <= hour < end_hour:
-                is_available = False
-                break
-        
-        if is_available:
-            available_slots.append({
-                'hour': hour,
-                'time_display': f"{hour:02d}:00"
-            })
-    
+
+    session_type = get_session_type(request.query_params.get('session_type'))
+    if session_type:
+        duration = session_type.duration_minutes
+    if not 1 <= days <= MAX_AVAILABILITY_DAYS or duration <= 0:
+        return Response({'error': 'بازه زمانی درخواست شده نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+
+    slots = available_slots(therapist.id, date_obj, days=days, duration=duration)
     return Response({
         'therapist_id': therapist_id,
         'date': date_str,
-        'available_slots': available_slots
+        'duration_minutes': duration,
+        'days': [
+            {
+                'date': day,
+                'date_persian': jdatetime.date.fromgregorian(date=day).strftime('%Y/%m/%d'),
+                'available_slots': [
+                    {'start': start.strftime('%H:%M'), 'end': end.strftime('%H:%M')}
+                    for start, end in day_slots
+                ],
+            }
+            for day, day_slots in slots.items()
+        ]
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def earliest_available_slots(request):
+    """
+    The earliest bookable slots with any available therapist, optionally
+    narrowed by specialization, for a session type's duration
+    """
+    params = request.query_params
+    try:
+        date_obj = parse_persian_date(params['date']) if params.get('date') else timezone.localdate()
+        days = int(params.get('days', 7))
+        duration = int(params.get('duration', 60))
+        limit = int(params.get('limit', 10))
+    except ValueError:
+        return Response({'error': 'فرمت تاریخ نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+
+    mode = params.get('mode')
+    if mode and mode not in dict(Session.SESSION_MODES):
+        return Response({'error': 'نحوه برگزاری نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+    session_type = get_session_type(params.get('session_type'))
+    if session_type:
+        duration = session_type.duration_minutes
+    if not 1 <= days <= MAX_AVAILABILITY_DAYS or duration <= 0 or not 1 <= limit <= MAX_EARLIEST_SLOTS:
+        return Response({'error': 'بازه زمانی درخواست شده نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+
+    therapists = User.objects.filter(user_type='therapist', is_active=True, is_available=True)
+    if params.get('specialization'):
+        therapists = therapists.filter(specialization__icontains=params['specialization'])
+    therapists = {
+        therapist['id']: therapist
+        for therapist in therapists.values('id', 'first_name', 'last_name', 'specialization')
+    }
+
+    slots = earliest_slots(therapists, date_obj, days=days, duration=duration, limit=limit)
+    return Response({
+        'duration_minutes': duration,
+        'mode': mode,
+        'slots': [
+            {
+                'therapist_id': therapist_id,
+                'therapist_name': f"{therapists[therapist_id]['first_name']} {therapists[therapist_id]['last_name']}".strip(),
+                'specialization': therapists[therapist_id]['specialization'],
+                'date': day,
+                'date_persian': jdatetime.date.fromgregorian(date=day).strftime('%Y/%m/%d'),
+                'start': start.strftime('%H:%M'),
+                'end': end.strftime('%H:%M'),
+            }
+            for day, start, end, therapist_id in slots
+        ]
     })
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def confirm_session(request, booking_id):
     """
-    Confirm a session booking
+    Confirm a session booking (by its therapist)
     """
-    booking = get_object_or_404(SessionBooking, id=booking_id, user=request.user)
-    
-    if booking.status != 'pending':
+    session = get_object_or_404(Session, id=booking_id, therapist=request.user)
+
+    if session.status != 'scheduled':
         return Response(
-            {'error': 'این رزرو قبلاً تایید یا لغو شده است'}, 
+            {'error': 'این رزرو قبلاً تایید یا لغو شده است'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    
-    # Create session from booking
-    session = Session.objects.create(
-        user=booking.user,
-        therapist=booking.therapist,
-        session_type=booking.session_type,
-        start_time=booking.preferred_date.replace(hour=booking.preferred_time.hour),
-        end_time=booking.preferred_date.replace(
-            hour=booking.preferred_time.hour + booking.duration.hour
-        ),
-        status='scheduled',
-        notes=booking.notes
-    )
-    
-    # Update booking status
-    booking.status = 'confirmed'
-    booking.save()
-    
+
+    session.status = 'confirmed'
+    session.save()
+
     serializer = SessionSerializer(session)
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.data)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -202,17 +259,26 @@ def cancel_session(request, session_id):
     """
     Cancel a session
     """
-    session = get_object_or_404(Session, id=session_id, user=request.user)
-    
-    if session.status not in ['scheduled', 'pending']:
+    session = get_object_or_404(Session, id=session_id, client=request.user)
+
+    if session.status not in ['scheduled', 'confirmed']:
         return Response(
-            {'error': 'این جلسه قابل لغو نیست'}, 
+            {'error': 'این جلسه قابل لغو نیست'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    
+    reason = request.data.get('reason') or 'client_request'
+    if not isinstance(reason, str) or reason not in dict(SessionCancellation.CANCELLATION_REASONS):
+        return Response({'error': 'دلیل لغو نامعتبر است'}, status=status.HTTP_400_BAD_REQUEST)
+
     session.status = 'cancelled'
     session.save()
-    
+    SessionCancellation.objects.create(
+        session=session,
+        cancelled_by=request.user,
+        reason=reason,
+        explanation=request.data.get('explanation', '')
+    )
+
     return Response({'message': 'جلسه با موفقیت لغو شد'})
 
 class TherapistStatsAPIView(views.APIView):
@@ -222,33 +288,27 @@ class TherapistStatsAPIView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, therapist_id):
-        therapist = get_object_or_404(Therapist, id=therapist_id)
-        
+        therapist = get_object_or_404(
+            User.objects.select_related('therapist_stats'), id=therapist_id, user_type='therapist'
+        )
+        stats = stats_for(therapist)
+
         # Get session statistics
         total_sessions = Session.objects.filter(therapist=therapist).count()
-        completed_sessions = Session.objects.filter(
-            therapist=therapist, 
-            status='completed'
-        ).count()
-        
-        # Calculate average rating
-        avg_rating = Session.objects.filter(
-            therapist=therapist,
-            status='completed',
-            rating__isnull=False
-        ).aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-        
+
         # Get recent reviews
-        recent_sessions = Session.objects.filter(
-            therapist=therapist,
-            status='completed',
-            feedback__isnull=False
-        ).order_by('-created_at')[:5]
-        
+        ratings = SessionRating.objects.filter(session__therapist=therapist)
+        recent_ratings = ratings.exclude(comments__isnull=True).exclude(comments='').order_by('-created_at')[:5]
+
         return Response({
             'therapist_id': therapist_id,
             'total_sessions': total_sessions,
-            'completed_sessions': completed_sessions,
-            'average_rating': round(avg_rating, 1),
-            'recent_reviews': SessionSerializer(recent_sessions, many=True).data
+            'completed_sessions': stats.completed_sessions,
+            'average_rating': stats.average(),
+            'rating_count': stats.rating_count,
+            'recommend_rate': stats.recommend_rate,
+            'rating_distribution': {
+                dimension: stats.distribution(dimension) for dimension in stats.RATING_DIMENSIONS
+            },
+            'recent_reviews': SessionRatingSerializer(recent_ratings, many=True).data
         })
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class TherapySessionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'therapy_sessions'
-    verbose_name = 'Therapy Sessions'
\ No newline at end of file
+    verbose_name = 'Therapy Sessions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
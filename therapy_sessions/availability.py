@@ -0,0 +1,224 @@
+import heapq
+from datetime import time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from psychology_institute.utils import bump_cache_version, get_cache_version
+from .models import Session, TherapistAvailability
+
+
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60 * 24
+WEEKDAYS = [day for day, label in TherapistAvailability.DAYS_OF_WEEK]
+# Sessions in these states hold their time; cancelled and no-show ones free it
+BLOCKING_STATUSES = ('scheduled', 'confirmed', 'in_progress', 'completed')
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals):
+    """Sort ``(start, end)`` minute intervals and merge the overlapping or touching ones"""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+def subtract_intervals(free, busy):
+    """
+    Remove the ``busy`` intervals from the ``free`` ones, both sorted and
+    merged, in one sweep over the two lists.
+    """
+    result = []
+    index = 0
+    for start, end in free:
+        # Busy intervals ending before this free one can't affect it or any later one
+        while index < len(busy) and busy[index][1] <= start:
+            index += 1
+        cursor, probe = start, index
+        while probe < len(busy) and busy[probe][0] < end:
+            if busy[probe][0] > cursor:
+                result.append((cursor, busy[probe][0]))
+            cursor = max(cursor, busy[probe][1])
+            probe += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def slot_starts(free, duration, step):
+    """Start minutes of every ``duration``-long slot inside the free intervals, ``step`` apart"""
+    starts = []
+    for start, end in free:
+        # Align to the step grid so slots read 10:00, 10:30... rather than 10:07
+        first = -(-start // step) * step
+        starts.extend(range(first, end - duration + 1, step))
+    return starts
+
+
+def slot_step():
+    return getattr(settings, 'THERAPY_SLOT_STEP_MINUTES', 30)
+
+
+def availability_version_key(therapist_id):
+    return f'therapy:availability_version:{therapist_id}'
+
+
+def get_availability_version(therapist_id):
+    return get_cache_version(availability_version_key(therapist_id))
+
+
+def bump_availability_version(therapist_id):
+    """Invalidate every cached day of a therapist after their weekly schedule changed"""
+    bump_cache_version(availability_version_key(therapist_id))
+
+
+def free_intervals_cache_key(therapist_id, day, version=None):
+    version = version or get_availability_version(therapist_id)
+    return f'therapy:free:{therapist_id}:{version}:{day.isoformat()}'
+
+
+def invalidate_therapist_day(therapist_id, day):
+    """Drop a therapist's cached free time on ``day`` after a booking there changed"""
+    cache.delete(free_intervals_cache_key(therapist_id, day))
+
+
+def weekly_windows(availability):
+    """Merged availability windows per weekday index from ``(day_of_week, start, end)`` rows"""
+    windows = {}
+    for day_of_week, start, end in availability:
+        windows.setdefault(WEEKDAYS.index(day_of_week), []).append((to_minutes(start), to_minutes(end)))
+    return {weekday: merge_intervals(intervals) for weekday, intervals in windows.items()}
+
+
+def booked_intervals(sessions):
+    """Merged busy minutes per day from ``(date, time, duration_minutes)`` rows"""
+    busy = {}
+    for scheduled_date, scheduled_time, duration in sessions:
+        start = to_minutes(scheduled_time)
+        busy.setdefault(scheduled_date, []).append((start, min(start + duration, MINUTES_PER_DAY)))
+    return {day: merge_intervals(intervals) for day, intervals in busy.items()}
+
+
+def compute_free_intervals(windows, busy, days):
+    """A therapist's free minute intervals for each of ``days``"""
+    return {
+        day: subtract_intervals(windows.get(day.weekday(), []), busy.get(day, []))
+        for day in days
+    }
+
+
+def load_schedules(therapist_ids, days):
+    """
+    Weekly windows and booked intervals of many therapists over ``days``,
+    with one query for availability and one for sessions.
+    """
+    windows, busy = {therapist_id: [] for therapist_id in therapist_ids}, {}
+    for therapist_id, day_of_week, start, end in TherapistAvailability.objects.filter(
+        therapist_id__in=therapist_ids, is_available=True
+    ).values_list('therapist_id', 'day_of_week', 'start_time', 'end_time'):
+        windows[therapist_id].append((day_of_week, start, end))
+    for therapist_id, scheduled_date, scheduled_time, duration in Session.objects.filter(
+        therapist_id__in=therapist_ids,
+        status__in=BLOCKING_STATUSES,
+        scheduled_date__gte=min(days),
+        scheduled_date__lte=max(days),
+    ).values_list('therapist_id', 'scheduled_date', 'scheduled_time', 'duration_minutes'):
+        busy.setdefault(therapist_id, []).append((scheduled_date, scheduled_time, duration))
+    return {
+        therapist_id: (weekly_windows(rows), booked_intervals(busy.get(therapist_id, [])))
+        for therapist_id, rows in windows.items()
+    }
+
+
+def therapist_free_intervals(therapist_id, days):
+    """
+    A therapist's free minute intervals per day: weekly availability with
+    booked sessions taken out. Each day is cached on its own; days missing
+    from the cache are computed together with two queries.
+    """
+    version = get_availability_version(therapist_id)
+    keys = {day: free_intervals_cache_key(therapist_id, day, version) for day in days}
+    cached = cache.get_many(list(keys.values()))
+    free = {day: cached[key] for day, key in keys.items() if key in cached}
+    missing = [day for day in days if day not in free]
+    if missing:
+        windows, busy = load_schedules([therapist_id], missing)[therapist_id]
+        computed = compute_free_intervals(windows, busy, missing)
+        cache.set_many({keys[day]: intervals for day, intervals in computed.items()}, AVAILABILITY_CACHE_TIMEOUT)
+        free.update(computed)
+    return free
+
+
+def _bookable_starts(day, free, duration, step, now):
+    starts = slot_starts(free, duration, step)
+    if day == now.date():
+        starts = [start for start in starts if start > to_minutes(now)]
+    elif day < now.date():
+        starts = []
+    return starts
+
+
+def available_slots(therapist_id, start_date, days=1, duration=60, step=None):
+    """
+    Bookable ``duration``-minute slots of a therapist from ``start_date`` on,
+    as ``{date: [(start time, end time), ...]}``. Past times are left out.
+    """
+    step = step or slot_step()
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    free = therapist_free_intervals(therapist_id, dates)
+    now = timezone.localtime()
+    return {
+        day: [
+            (to_time(start), to_time((start + duration) % MINUTES_PER_DAY))
+            for start in _bookable_starts(day, free[day], duration, step, now)
+        ]
+        for day in dates
+    }
+
+
+def _therapist_slots(therapist_id, windows, busy, dates, duration, step, now):
+    """Lazily yield ``(date, start minute, therapist id)`` for one therapist in time order"""
+    for day in dates:
+        free = subtract_intervals(windows.get(day.weekday(), []), busy.get(day, []))
+        for start in _bookable_starts(day, free, duration, step, now):
+            yield day, start, therapist_id
+
+
+def earliest_slots(therapist_ids, start_date, days=7, duration=60, limit=10, step=None):
+    """
+    The ``limit`` earliest bookable slots across many therapists, as
+    ``(date, start time, end time, therapist id)`` tuples. Schedules are
+    loaded with two queries whatever the number of therapists; each
+    therapist's slots are swept lazily and merged with a heap, so only as
+    many days are swept as the earliest slots need.
+    """
+    step = step or slot_step()
+    therapist_ids = list(therapist_ids)
+    if not therapist_ids or days < 1:
+        return []
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    schedules = load_schedules(therapist_ids, dates)
+    now = timezone.localtime()
+    merged = heapq.merge(*(
+        _therapist_slots(therapist_id, windows, busy, dates, duration, step, now)
+        for therapist_id, (windows, busy) in schedules.items()
+    ))
+    return [
+        (day, to_time(start), to_time((start + duration) % MINUTES_PER_DAY), therapist_id)
+        for day, start, therapist_id in islice(merged, limit)
+    ]
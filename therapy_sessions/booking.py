@@ -0,0 +1,121 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .models import Session, TherapistAvailability, TherapistDayLock
+from .availability import (
+    BLOCKING_STATUSES, WEEKDAYS, booked_intervals, subtract_intervals, to_minutes, weekly_windows
+)
+
+
+class BookingError(Exception):
+    """A requested slot can't be booked; ``message`` is shown to the client"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def lock_therapist_day(therapist_id, day):
+    """
+    Serialize bookings on one therapist's day for the rest of the transaction.
+
+    The day's lock row is claimed with an UPDATE rather than SELECT FOR
+    UPDATE: it takes the same row lock on PostgreSQL and MySQL, and on
+    SQLite, which ignores FOR UPDATE, being the transaction's first write
+    it takes the database write lock up front. The row is created the
+    first time a day is booked.
+    """
+    now = timezone.now()
+    if TherapistDayLock.objects.filter(therapist_id=therapist_id, date=day).update(locked_at=now):
+        return
+    lock, created = TherapistDayLock.objects.get_or_create(therapist_id=therapist_id, date=day, defaults={'locked_at': now})
+    if not created:
+        # Another booking created the row first; wait for it like any other
+        TherapistDayLock.objects.filter(pk=lock.pk).update(locked_at=now)
+
+
+def _fits(start, end, intervals):
+    return any(free_start <= start and end <= free_end for free_start, free_end in intervals)
+
+
+def check_slot(therapist_id, day, start_time, duration, exclude_session_id=None):
+    """
+    Raise BookingError unless ``duration`` minutes from ``start_time`` on
+    ``day`` fall inside the therapist's availability and overlap none of
+    their sessions. Reads the database directly, never the slot cache.
+    """
+    if timezone.make_aware(datetime.combine(day, start_time)) <= timezone.now():
+        raise BookingError('زمان جلسه نمی‌تواند در گذشته باشد.')
+
+    windows = weekly_windows(
+        TherapistAvailability.objects.filter(
+            therapist_id=therapist_id, day_of_week=WEEKDAYS[day.weekday()], is_available=True
+        ).values_list('day_of_week', 'start_time', 'end_time')
+    )
+    sessions = Session.objects.filter(therapist_id=therapist_id, scheduled_date=day, status__in=BLOCKING_STATUSES)
+    if exclude_session_id:
+        sessions = sessions.exclude(pk=exclude_session_id)
+    busy = booked_intervals(sessions.values_list('scheduled_date', 'scheduled_time', 'duration_minutes'))
+
+    start, end = to_minutes(start_time), to_minutes(start_time) + duration
+    window = windows.get(day.weekday(), [])
+    if _fits(start, end, subtract_intervals(window, busy.get(day, []))):
+        return
+    if _fits(start, end, window):
+        raise BookingError('این زمان قبلاً رزرو شده است. لطفاً زمان دیگری انتخاب کنید.')
+    raise BookingError('درمانگر در این زمان در دسترس نیست.')
+
+
+def book_session(client, therapist, session_type, scheduled_date, scheduled_time, mode, location=None):
+    """
+    Create a scheduled session once the slot is confirmed free, with the
+    therapist's day locked so concurrent bookings of the same slot can't
+    both succeed. Raises BookingError otherwise.
+    """
+    if therapist.user_type != 'therapist' or not therapist.is_active or not therapist.is_available:
+        raise BookingError('درمانگر انتخاب شده در دسترس نیست.')
+    if not session_type.is_active:
+        raise BookingError('نوع جلسه انتخاب شده فعال نیست.')
+
+    with transaction.atomic():
+        lock_therapist_day(therapist.pk, scheduled_date)
+        check_slot(therapist.pk, scheduled_date, scheduled_time, session_type.duration_minutes)
+        session = Session.objects.create(
+            client=client,
+            therapist=therapist,
+            session_type=session_type,
+            mode=mode,
+            location=location,
+            scheduled_date=scheduled_date,
+            scheduled_time=scheduled_time,
+            duration_minutes=session_type.duration_minutes,
+            price=session_type.price,
+        )
+
+        # Meeting details need the session id
+        if mode == 'online':
+            session.meeting_link = f"https://meet.example.com/{session.pk}"
+            session.meeting_id = f"MEET{session.pk:06d}"
+            session.meeting_password = get_random_string(6, '0123456789')
+            session.save(update_fields=['meeting_link', 'meeting_id', 'meeting_password'])
+    return session
+
+
+def reschedule_session(session, scheduled_date, scheduled_time):
+    """Move a scheduled or confirmed session to a new free slot of the same therapist"""
+    if session.status not in ('scheduled', 'confirmed'):
+        raise BookingError('این جلسه قابل تغییر زمان نیست.')
+
+    with transaction.atomic():
+        lock_therapist_day(session.therapist_id, scheduled_date)
+        check_slot(
+            session.therapist_id, scheduled_date, scheduled_time, session.duration_minutes,
+            exclude_session_id=session.pk
+        )
+        session.scheduled_date = scheduled_date
+        session.scheduled_time = scheduled_time
+        session.save(update_fields=['scheduled_date', 'scheduled_time', 'updated_at'])
+    return session
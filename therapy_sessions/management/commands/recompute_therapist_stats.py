@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from therapy_sessions.stats import recompute_therapist_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute therapist completed-session counts and rating aggregates from sessions and ratings'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recomputing therapist stats...')
+        therapists = recompute_therapist_stats()
+        self.stdout.write(self.style.SUCCESS(f'Successfully recomputed stats ({therapists} therapists with sessions or ratings)'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from therapy_sessions.models import Session
+from therapy_sessions.reminders import REMINDABLE_STATUSES, dispatch_all_due_reminders, schedule_reminders
+
+
+class Command(BaseCommand):
+    help = 'Send due therapy session reminders, optionally generating them for upcoming sessions first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Reminders claimed per transaction')
+        parser.add_argument(
+            '--schedule-upcoming', action='store_true',
+            help='Regenerate the unsent reminders of every upcoming session before sending'
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule_upcoming']:
+            session_ids = list(Session.objects.filter(
+                status__in=REMINDABLE_STATUSES, scheduled_date__gte=timezone.localdate()
+            ).values_list('id', flat=True))
+            created = schedule_reminders(session_ids)
+            self.stdout.write(f'Scheduled {created} reminders for {len(session_ids)} upcoming sessions')
+
+        self.stdout.write('Sending session reminders...')
+        sent = dispatch_all_due_reminders(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully sent {sent} reminders'))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('therapy_sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TherapistDayLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Locked At')),
+            ],
+            options={
+                'verbose_name': 'Therapist Day Lock',
+                'verbose_name_plural': 'Therapist Day Locks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['therapist', 'scheduled_date', 'scheduled_time'], name='therapy_session_slot_idx'),
+        ),
+        migrations.AddField(
+            model_name='therapistdaylock',
+            name='therapist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_locks', to=settings.AUTH_USER_MODEL, verbose_name='Therapist'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='therapistdaylock',
+            unique_together={('therapist', 'date')},
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.24 on 2026-10-19 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('therapy_sessions', '0002_booking_locks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TherapistStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_sessions', models.PositiveIntegerField(default=0, verbose_name='Completed Sessions')),
+                ('rating_count', models.PositiveIntegerField(default=0, verbose_name='Rating Count')),
+                ('recommend_count', models.PositiveIntegerField(default=0, verbose_name='Would Recommend Count')),
+                ('overall_rating_sum', models.PositiveIntegerField(default=0, verbose_name='Overall Rating Sum')),
+                ('overall_rating_1_count', models.PositiveIntegerField(default=0, verbose_name='Overall 1-Star Ratings')),
+                ('overall_rating_2_count', models.PositiveIntegerField(default=0, verbose_name='Overall 2-Star Ratings')),
+                ('overall_rating_3_count', models.PositiveIntegerField(default=0, verbose_name='Overall 3-Star Ratings')),
+                ('overall_rating_4_count', models.PositiveIntegerField(default=0, verbose_name='Overall 4-Star Ratings')),
+                ('overall_rating_5_count', models.PositiveIntegerField(default=0, verbose_name='Overall 5-Star Ratings')),
+                ('therapist_rating_sum', models.PositiveIntegerField(default=0, verbose_name='Therapist Rating Sum')),
+                ('therapist_rating_1_count', models.PositiveIntegerField(default=0, verbose_name='Therapist 1-Star Ratings')),
+                ('therapist_rating_2_count', models.PositiveIntegerField(default=0, verbose_name='Therapist 2-Star Ratings')),
+                ('therapist_rating_3_count', models.PositiveIntegerField(default=0, verbose_name='Therapist 3-Star Ratings')),
+                ('therapist_rating_4_count', models.PositiveIntegerField(default=0, verbose_name='Therapist 4-Star Ratings')),
+                ('therapist_rating_5_count', models.PositiveIntegerField(default=0, verbose_name='Therapist 5-Star Ratings')),
+                ('environment_rating_sum', models.PositiveIntegerField(default=0, verbose_name='Environment Rating Sum')),
+                ('environment_rating_1_count', models.PositiveIntegerField(default=0, verbose_name='Environment 1-Star Ratings')),
+                ('environment_rating_2_count', models.PositiveIntegerField(default=0, verbose_name='Environment 2-Star Ratings')),
+                ('environment_rating_3_count', models.PositiveIntegerField(default=0, verbose_name='Environment 3-Star Ratings')),
+                ('environment_rating_4_count', models.PositiveIntegerField(default=0, verbose_name='Environment 4-Star Ratings')),
+                ('environment_rating_5_count', models.PositiveIntegerField(default=0, verbose_name='Environment 5-Star Ratings')),
+                ('helpfulness_rating_sum', models.PositiveIntegerField(default=0, verbose_name='Helpfulness Rating Sum')),
+                ('helpfulness_rating_1_count', models.PositiveIntegerField(default=0, verbose_name='Helpfulness 1-Star Ratings')),
+                ('helpfulness_rating_2_count', models.PositiveIntegerField(default=0, verbose_name='Helpfulness 2-Star Ratings')),
+                ('helpfulness_rating_3_count', models.PositiveIntegerField(default=0, verbose_name='Helpfulness 3-Star Ratings')),
+                ('helpfulness_rating_4_count', models.PositiveIntegerField(default=0, verbose_name='Helpfulness 4-Star Ratings')),
+                ('helpfulness_rating_5_count', models.PositiveIntegerField(default=0, verbose_name='Helpfulness 5-Star Ratings')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('therapist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='therapist_stats', to=settings.AUTH_USER_MODEL, verbose_name='Therapist')),
+            ],
+            options={
+                'verbose_name': 'Therapist Stats',
+                'verbose_name_plural': 'Therapist Stats',
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.24 on 2026-10-19 09:12
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+DIMENSIONS = ['overall', 'therapist', 'environment', 'helpfulness']
+STARS = range(1, 6)
+
+
+def backfill_therapist_stats(apps, schema_editor):
+    # Mirrors therapy_sessions.stats.recompute_therapist_stats with the historical models
+    Session = apps.get_model('therapy_sessions', 'Session')
+    SessionRating = apps.get_model('therapy_sessions', 'SessionRating')
+    TherapistStats = apps.get_model('therapy_sessions', 'TherapistStats')
+
+    completed = dict(
+        Session.objects.filter(status='completed')
+        .values('therapist_id')
+        .annotate(total=Count('id'))
+        .order_by()
+        .values_list('therapist_id', 'total')
+    )
+    rating_rows = (
+        SessionRating.objects.values('session__therapist_id')
+        .annotate(
+            total=Count('id'),
+            recommended=Count('id', filter=Q(would_recommend=True)),
+            **{f'{dimension}_sum': Sum(f'{dimension}_rating') for dimension in DIMENSIONS},
+            **{
+                f'{dimension}_{star}': Count('id', filter=Q(**{f'{dimension}_rating': star}))
+                for dimension in DIMENSIONS
+                for star in STARS
+            },
+        )
+        .order_by()
+    )
+    ratings = {row['session__therapist_id']: row for row in rating_rows}
+
+    stats = []
+    for therapist_id in completed.keys() | ratings.keys():
+        row = ratings.get(therapist_id, {})
+        therapist_stats = TherapistStats(
+            therapist_id=therapist_id,
+            completed_sessions=completed.get(therapist_id, 0),
+            rating_count=row.get('total', 0),
+            recommend_count=row.get('recommended', 0),
+        )
+        for dimension in DIMENSIONS:
+            setattr(therapist_stats, f'{dimension}_rating_sum', row.get(f'{dimension}_sum') or 0)
+            for star in STARS:
+                setattr(therapist_stats, f'{dimension}_rating_{star}_count', row.get(f'{dimension}_{star}', 0))
+        stats.append(therapist_stats)
+
+    TherapistStats.objects.all().delete()
+    TherapistStats.objects.bulk_create(stats, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy_sessions', '0003_therapist_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_therapist_stats, migrations.RunPython.noop),
+    ]
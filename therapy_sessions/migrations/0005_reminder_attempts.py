@@ -0,0 +1,23 @@
+# Generated by Django 4.2.24 on 2026-10-19 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy_sessions', '0004_backfill_therapist_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionreminder',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='sessionreminder',
+            name='last_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Last Attempt At'),
+        ),
+    ]
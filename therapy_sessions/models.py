@@ -111,11 +111,31 @@ class Session(models.Model):
         verbose_name = _('Session')
         verbose_name_plural = _('Sessions')
         ordering = ['-scheduled_date', '-scheduled_time']
+        indexes = [
+            # Overlap checks and availability look up a therapist's sessions by day
+            models.Index(fields=['therapist', 'scheduled_date', 'scheduled_time'], name='therapy_session_slot_idx'),
+        ]
     
     def __str__(self):
         return f"{self.client.full_name} with {self.therapist.full_name} - {self.scheduled_date} {self.scheduled_time}"
 
 
+class TherapistDayLock(models.Model):
+    """Row locked while a booking on a therapist's day is checked and written"""
+    
+    therapist = models.ForeignKey(User, on_delete=models.CASCADE, related_name='day_locks', verbose_name=_('Therapist'))
+    date = models.DateField(verbose_name=_('Date'))
+    locked_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Locked At'))
+    
+    class Meta:
+        verbose_name = _('Therapist Day Lock')
+        verbose_name_plural = _('Therapist Day Locks')
+        unique_together = ['therapist', 'date']
+    
+    def __str__(self):
+        return f"{self.therapist.full_name} - {self.date}"
+
+
 class SessionNote(models.Model):
     """Therapist notes for sessions"""
     
@@ -164,6 +184,70 @@ class SessionRating(models.Model):
         return f"Rating for {self.session} - {self.overall_rating}/5"
 
 
+class TherapistStats(models.Model):
+    """Per-therapist session and rating aggregates, maintained incrementally by therapy_sessions.signals"""
+    
+    RATING_DIMENSIONS = ['overall', 'therapist', 'environment', 'helpfulness']
+    
+    therapist = models.OneToOneField(User, on_delete=models.CASCADE, related_name='therapist_stats', verbose_name=_('Therapist'))
+    completed_sessions = models.PositiveIntegerField(default=0, verbose_name=_('Completed Sessions'))
+    rating_count = models.PositiveIntegerField(default=0, verbose_name=_('Rating Count'))
+    recommend_count = models.PositiveIntegerField(default=0, verbose_name=_('Would Recommend Count'))
+    
+    overall_rating_sum = models.PositiveIntegerField(default=0, verbose_name=_('Overall Rating Sum'))
+    overall_rating_1_count = models.PositiveIntegerField(default=0, verbose_name=_('Overall 1-Star Ratings'))
+    overall_rating_2_count = models.PositiveIntegerField(default=0, verbose_name=_('Overall 2-Star Ratings'))
+    overall_rating_3_count = models.PositiveIntegerField(default=0, verbose_name=_('Overall 3-Star Ratings'))
+    overall_rating_4_count = models.PositiveIntegerField(default=0, verbose_name=_('Overall 4-Star Ratings'))
+    overall_rating_5_count = models.PositiveIntegerField(default=0, verbose_name=_('Overall 5-Star Ratings'))
+    
+    therapist_rating_sum = models.PositiveIntegerField(default=0, verbose_name=_('Therapist Rating Sum'))
+    therapist_rating_1_count = models.PositiveIntegerField(default=0, verbose_name=_('Therapist 1-Star Ratings'))
+    therapist_rating_2_count = models.PositiveIntegerField(default=0, verbose_name=_('Therapist 2-Star Ratings'))
+    therapist_rating_3_count = models.PositiveIntegerField(default=0, verbose_name=_('Therapist 3-Star Ratings'))
+    therapist_rating_4_count = models.PositiveIntegerField(default=0, verbose_name=_('Therapist 4-Star Ratings'))
+    therapist_rating_5_count = models.PositiveIntegerField(default=0, verbose_name=_('Therapist 5-Star Ratings'))
+    
+    environment_rating_sum = models.PositiveIntegerField(default=0, verbose_name=_('Environment Rating Sum'))
+    environment_rating_1_count = models.PositiveIntegerField(default=0, verbose_name=_('Environment 1-Star Ratings'))
+    environment_rating_2_count = models.PositiveIntegerField(default=0, verbose_name=_('Environment 2-Star Ratings'))
+    environment_rating_3_count = models.PositiveIntegerField(default=0, verbose_name=_('Environment 3-Star Ratings'))
+    environment_rating_4_count = models.PositiveIntegerField(default=0, verbose_name=_('Environment 4-Star Ratings'))
+    environment_rating_5_count = models.PositiveIntegerField(default=0, verbose_name=_('Environment 5-Star Ratings'))
+    
+    helpfulness_rating_sum = models.PositiveIntegerField(default=0, verbose_name=_('Helpfulness Rating Sum'))
+    helpfulness_rating_1_count = models.PositiveIntegerField(default=0, verbose_name=_('Helpfulness 1-Star Ratings'))
+    helpfulness_rating_2_count = models.PositiveIntegerField(default=0, verbose_name=_('Helpfulness 2-Star Ratings'))
+    helpfulness_rating_3_count = models.PositiveIntegerField(default=0, verbose_name=_('Helpfulness 3-Star Ratings'))
+    helpfulness_rating_4_count = models.PositiveIntegerField(default=0, verbose_name=_('Helpfulness 4-Star Ratings'))
+    helpfulness_rating_5_count = models.PositiveIntegerField(default=0, verbose_name=_('Helpfulness 5-Star Ratings'))
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Therapist Stats')
+        verbose_name_plural = _('Therapist Stats')
+    
+    def __str__(self):
+        return f"Stats for {self.therapist.full_name}"
+    
+    def average(self, dimension='overall'):
+        if not self.rating_count:
+            return 0
+        return round(getattr(self, f'{dimension}_rating_sum') / self.rating_count, 1)
+    
+    def distribution(self, dimension='overall'):
+        """Share of ratings per star (1-5) in percent"""
+        return {
+            star: round(getattr(self, f'{dimension}_rating_{star}_count') / self.rating_count * 100, 1) if self.rating_count else 0
+            for star in range(1, 6)
+        }
+    
+    @property
+    def recommend_rate(self):
+        return round(self.recommend_count / self.rating_count * 100, 1) if self.rating_count else 0
+
+
 class SessionCancellation(models.Model):
     """Session cancellations"""
     
@@ -207,6 +291,8 @@ class SessionReminder(models.Model):
     scheduled_time = models.DateTimeField(verbose_name=_('Scheduled Time'))
     is_sent = models.BooleanField(default=False, verbose_name=_('Is Sent'))
     sent_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Sent At'))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_('Attempts'))
+    last_attempt_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Last Attempt At'))
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -0,0 +1,38 @@
+import logging
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# One SMS or push notification: ``recipient`` is a phone number for SMS
+# and the user id for push
+ReminderMessage = namedtuple('ReminderMessage', ['reminder_id', 'reminder_type', 'recipient', 'body'])
+
+
+class BaseReminderBackend:
+    """
+    Delivers SMS and push reminders. Subclasses implement ``send_messages``,
+    which receives a batch of ReminderMessages and returns the ids of the
+    reminders that were delivered; the rest are retried on a later run.
+    """
+
+    def __init__(self, **kwargs):
+        pass
+
+    def send_messages(self, messages):
+        raise NotImplementedError('Reminder backends must implement send_messages()')
+
+
+class ConsoleReminderBackend(BaseReminderBackend):
+    """Local stand-in that logs every reminder instead of sending it"""
+
+    def send_messages(self, messages):
+        for message in messages:
+            logger.info('%s reminder to %s: %s', message.reminder_type, message.recipient, message.body)
+        return [message.reminder_id for message in messages]
+
+
+def get_reminder_backend(**kwargs):
+    return import_string(settings.THERAPY_REMINDER_BACKEND)(**kwargs)
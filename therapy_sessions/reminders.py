@@ -0,0 +1,192 @@
+import logging
+from datetime import datetime, timedelta
+
+import jdatetime
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Session, SessionReminder
+from .reminder_backends import ReminderMessage, get_reminder_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REMINDER_SCHEDULE = [('email', 24), ('sms', 2)]
+REMINDABLE_STATUSES = ('scheduled', 'confirmed')
+REMINDER_SUBJECT = 'یادآوری جلسه مشاوره'
+
+# SMS reminders of clients without a phone number can never be delivered
+UNDELIVERABLE = Q(reminder_type='sms') & (
+    Q(session__client__phone_number__isnull=True) | Q(session__client__phone_number='')
+)
+
+
+def reminder_schedule():
+    """``(reminder type, hours before the session)`` pairs every booking gets"""
+    return getattr(settings, 'THERAPY_REMINDER_SCHEDULE', DEFAULT_REMINDER_SCHEDULE)
+
+
+def session_start(session):
+    return timezone.make_aware(datetime.combine(session.scheduled_date, session.scheduled_time))
+
+
+def schedule_reminders(session_ids):
+    """
+    Replace the unsent reminders of the given sessions with fresh ones from
+    the reminder schedule, with one delete and one ``bulk_create``. Reminders
+    whose time has already passed are not created, clients without a phone
+    number get no SMS, and sessions that are no longer scheduled or
+    confirmed get none.
+    """
+    now = timezone.now()
+    sessions = Session.objects.filter(id__in=session_ids, status__in=REMINDABLE_STATUSES).select_related(
+        'client'
+    ).only('id', 'scheduled_date', 'scheduled_time', 'client__phone_number')
+    reminders = [
+        SessionReminder(session=session, reminder_type=reminder_type, scheduled_time=remind_at)
+        for session in sessions
+        for reminder_type, hours in reminder_schedule()
+        for remind_at in [session_start(session) - timedelta(hours=hours)]
+        if remind_at > now and (reminder_type != 'sms' or session.client.phone_number)
+    ]
+    with transaction.atomic():
+        SessionReminder.objects.filter(session_id__in=session_ids, is_sent=False).delete()
+        SessionReminder.objects.bulk_create(reminders)
+    return len(reminders)
+
+
+def cancel_reminders(session_ids):
+    return SessionReminder.objects.filter(session_id__in=session_ids, is_sent=False).delete()[0]
+
+
+def reminder_text(session):
+    when = jdatetime.date.fromgregorian(date=session.scheduled_date).strftime('%Y/%m/%d')
+    return (
+        f'یادآوری: جلسه {session.session_type.name} شما با {session.therapist.full_name} '
+        f'در تاریخ {when} ساعت {session.scheduled_time:%H:%M} برگزار می‌شود.'
+    )
+
+
+def _send_emails(reminders):
+    """
+    Send email reminders over one SMTP connection; returns the ids
+    delivered. If the connection can't be opened none are, and they are
+    retried on a later run.
+    """
+    if not reminders:
+        return []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception:
+        logger.warning('Could not connect to send %s email reminders', len(reminders), exc_info=True)
+        return []
+    delivered = []
+    try:
+        for reminder in reminders:
+            message = EmailMessage(
+                REMINDER_SUBJECT,
+                reminder_text(reminder.session),
+                to=[reminder.session.client.email],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception:
+                logger.warning('Could not send reminder %s', reminder.pk, exc_info=True)
+            else:
+                delivered.append(reminder.pk)
+    finally:
+        connection.close()
+    return delivered
+
+
+def _send_notifications(reminders, backend):
+    """Send SMS and push reminders through the configured backend; returns the ids delivered"""
+    messages = [
+        ReminderMessage(
+            reminder.pk,
+            reminder.reminder_type,
+            reminder.session.client.phone_number if reminder.reminder_type == 'sms' else reminder.session.client_id,
+            reminder_text(reminder.session),
+        )
+        for reminder in reminders
+    ]
+    if not messages:
+        return []
+    try:
+        return backend.send_messages(messages)
+    except Exception:
+        logger.warning('Could not send %s reminders', len(messages), exc_info=True)
+        return []
+
+
+def retry_policy():
+    """``(minutes between attempts, maximum attempts)`` for undelivered reminders"""
+    return (
+        getattr(settings, 'THERAPY_REMINDER_RETRY_MINUTES', 10),
+        getattr(settings, 'THERAPY_REMINDER_MAX_ATTEMPTS', 5),
+    )
+
+
+def dispatch_due_reminders(batch_size=200, backend=None):
+    """
+    Claim up to ``batch_size`` due reminders and send them.
+
+    Reminders are claimed with ``select_for_update(skip_locked=True)``, so
+    dispatchers running side by side split the backlog instead of sending
+    twice. SMS reminders of clients without a phone number are never
+    claimed, and a reminder that could not be delivered is retried only
+    after the retry interval, with never-attempted reminders first, up to
+    the maximum number of attempts. Failing rows therefore can't crowd
+    deliverable ones out of the batch. Emails share one connection, SMS
+    and push go through the reminder backend, and every claimed reminder
+    is updated with a single ``bulk_update`` before the claim is released.
+    Returns the number of reminders sent and the number claimed.
+    """
+    backend = backend or get_reminder_backend()
+    retry_minutes, max_attempts = retry_policy()
+    now = timezone.now()
+    with transaction.atomic():
+        reminders = list(
+            SessionReminder.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(
+                Q(last_attempt_at__isnull=True) | Q(last_attempt_at__lte=now - timedelta(minutes=retry_minutes)),
+                is_sent=False,
+                attempts__lt=max_attempts,
+                scheduled_time__lte=now,
+                session__status__in=REMINDABLE_STATUSES,
+                session__scheduled_date__gte=timezone.localdate(),
+            )
+            .exclude(UNDELIVERABLE)
+            .select_related('session__client', 'session__therapist', 'session__session_type')
+            .order_by('attempts', 'scheduled_time')[:batch_size]
+        )
+        delivered = set(_send_emails([reminder for reminder in reminders if reminder.reminder_type == 'email']))
+        delivered.update(_send_notifications(
+            [reminder for reminder in reminders if reminder.reminder_type != 'email'], backend
+        ))
+
+        for reminder in reminders:
+            reminder.attempts += 1
+            reminder.last_attempt_at = now
+            if reminder.pk in delivered:
+                reminder.is_sent = True
+                reminder.sent_at = now
+        SessionReminder.objects.bulk_update(reminders, ['is_sent', 'sent_at', 'attempts', 'last_attempt_at'])
+    return sum(reminder.pk in delivered for reminder in reminders), len(reminders)
+
+
+def dispatch_all_due_reminders(batch_size=200):
+    """Dispatch batches until no due reminder is left unclaimed; returns the number sent"""
+    backend = get_reminder_backend()
+    total = 0
+    while True:
+        sent, claimed = dispatch_due_reminders(batch_size, backend=backend)
+        total += sent
+        # Undelivered reminders wait for the retry interval, so a full batch
+        # of failures doesn't stop the rest of the backlog from being claimed
+        if claimed < batch_size:
+            return total
@@ -1,105 +1,96 @@
 from rest_framework import serializers
-from .models import Therapist, Session, SessionType, SessionBooking
+from .models import Session, SessionType, SessionRating
+from .stats import stats_for
 from django.contrib.auth import get_user_model
 import jdatetime
 
 User = get_user_model()
 
 class TherapistSerializer(serializers.ModelSerializer):
-    full_name = serializers.CharField(source='get_full_name', read_only=True)
-    specialization_display = serializers.CharField(source='get_specialization_display', read_only=True)
-    experience_years = serializers.SerializerMethodField()
+    full_name = serializers.CharField(read_only=True)
     rating = serializers.SerializerMethodField()
     total_sessions = serializers.SerializerMethodField()
-    
+
     class Meta:
-        model = Therapist
+        model = User
         fields = [
-            'id', 'user', 'full_name', 'specialization', 'specialization_display',
-            'bio', 'education', 'certifications', 'experience_years',
-            'hourly_rate', 'rating', 'total_sessions', 'is_available',
-            'profile_image', 'created_at'
+            'id', 'full_name', 'first_name', 'last_name', 'specialization',
+            'bio', 'license_number', 'experience_years', 'hourly_rate',
+            'rating', 'total_sessions', 'is_available', 'profile_image'
         ]
-    
-    def get_experience_years(self, obj):
-        if obj.experience_start_date:
-            from datetime import date
-            today = date.today()
-            return today.year - obj.experience_start_date.year
-        return 0
-    
+
+    # Both read the precomputed TherapistStats; querysets should
+    # select_related('therapist_stats') to avoid a query per therapist
     def get_rating(self, obj):
-        # Calculate average rating from completed sessions
-        completed_sessions = Session.objects.filter(
-            therapist=obj,
-            status='completed',
-            rating__isnull=False
-        )
-        if completed_sessions.exists():
-            return round(completed_sessions.aggregate(
-                avg_rating=models.Avg('rating')
-            )['avg_rating'], 1)
-        return 0.0
-    
+        return float(stats_for(obj).average())
+
     def get_total_sessions(self, obj):
-        return Session.objects.filter(therapist=obj, status='completed').count()
+        return stats_for(obj).completed_sessions
 
 class SessionTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = SessionType
-        fields = ['id', 'name', 'description', 'duration', 'price', 'is_available']
+        fields = ['id', 'name', 'description', 'duration_minutes', 'price', 'is_active']
 
 class SessionBookingSerializer(serializers.ModelSerializer):
-    therapist_name = serializers.CharField(source='therapist.get_full_name', read_only=True)
+    therapist_name = serializers.CharField(source='therapist.full_name', read_only=True)
     session_type_name = serializers.CharField(source='session_type.name', read_only=True)
     created_at_persian = serializers.SerializerMethodField()
-    
+
     class Meta:
-        model = SessionBooking
+        model = Session
         fields = [
-            'id', 'user', 'therapist', 'therapist_name', 'session_type', 'session_type_name',
-            'preferred_date', 'preferred_time', 'duration', 'notes', 'status',
-            'created_at', 'created_at_persian'
+            'id', 'client', 'therapist', 'therapist_name', 'session_type', 'session_type_name',
+            'scheduled_date', 'scheduled_time', 'duration_minutes', 'mode', 'location',
+            'price', 'status', 'created_at', 'created_at_persian'
         ]
-        read_only_fields = ['user', 'created_at']
-    
+        read_only_fields = ['client', 'duration_minutes', 'price', 'status', 'created_at']
+
+    def validate_therapist(self, value):
+        if value.user_type != 'therapist' or not value.is_active or not value.is_available:
+            raise serializers.ValidationError('درمانگر انتخاب شده در دسترس نیست')
+        return value
+
+    def validate_session_type(self, value):
+        if not value.is_active:
+            raise serializers.ValidationError('نوع جلسه انتخاب شده فعال نیست')
+        return value
+
     def get_created_at_persian(self, obj):
         if obj.created_at:
             return jdatetime.datetime.fromgregorian(datetime=obj.created_at).strftime('%Y/%m/%d %H:%M')
         return None
 
 class SessionSerializer(serializers.ModelSerializer):
-    therapist_name = serializers.CharField(source='therapist.get_full_name', read_only=True)
-    user_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    therapist_name = serializers.CharField(source='therapist.full_name', read_only=True)
+    client_name = serializers.CharField(source='client.full_name', read_only=True)
     session_type_name = serializers.CharField(source='session_type.name', read_only=True)
-    start_time_persian = serializers.SerializerMethodField()
-    end_time_persian = serializers.SerializerMethodField()
-    
+    scheduled_date_persian = serializers.SerializerMethodField()
+
     class Meta:
         model = Session
         fields = [
-            'id', 'user', 'user_name', 'therapist', 'therapist_name',
-            'session_type', 'session_type_name', 'start_time', 'end_time',
-            'start_time_persian', 'end_time_persian', 'status', 'notes',
-            'rating', 'feedback', 'created_at'
+            'id', 'client', 'client_name', 'therapist', 'therapist_name',
+            'session_type', 'session_type_name', 'scheduled_date', 'scheduled_time',
+            'scheduled_date_persian', 'duration_minutes', 'mode', 'status', 'location',
+            'meeting_link', 'goals', 'homework', 'price', 'is_paid', 'created_at'
         ]
-    
-    def get_start_time_persian(self, obj):
-        if obj.start_time:
-            return jdatetime.datetime.fromgregorian(datetime=obj.start_time).strftime('%Y/%m/%d %H:%M')
-        return None
-    
-    def get_end_time_persian(self, obj):
-        if obj.end_time:
-            return jdatetime.datetime.fromgregorian(datetime=obj.end_time).strftime('%Y/%m/%d %H:%M')
+        read_only_fields = [
+            'client', 'therapist', 'session_type', 'scheduled_date', 'scheduled_time',
+            'duration_minutes', 'mode', 'status', 'meeting_link', 'homework', 'price',
+            'is_paid', 'created_at'
+        ]
+
+    def get_scheduled_date_persian(self, obj):
+        if obj.scheduled_date:
+            return jdatetime.date.fromgregorian(date=obj.scheduled_date).strftime('%Y/%m/%d')
         return None
 
 class SessionRatingSerializer(serializers.ModelSerializer):
     class Meta:
-        model = Session
-        fields = ['rating', 'feedback']
-    
-    def validate_rating(self, value):
-        if value is not None and (value < 1 or value > 5):
-            raise serializers.ValidationError("امتیاز باید بین 1 تا 5 باشد")
-        return value
+        model = SessionRating
+        fields = [
+            'id', 'session', 'overall_rating', 'therapist_rating', 'environment_rating',
+            'helpfulness_rating', 'comments', 'would_recommend', 'created_at'
+        ]
+        read_only_fields = ['session', 'created_at']
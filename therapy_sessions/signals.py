@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Session, SessionRating, TherapistAvailability
+from .availability import bump_availability_version, invalidate_therapist_day
+from .reminders import REMINDABLE_STATUSES, cancel_reminders, schedule_reminders
+from .stats import apply_completed_change, apply_rating_change, rating_contribution
+
+
+@receiver(pre_save, sender=Session)
+def remember_previous_slot(sender, instance, raw=False, **kwargs):
+    """Capture the stored slot and status so a reschedule frees the old day too"""
+    instance._previous_slot = None
+    if instance.pk and not raw:
+        instance._previous_slot = (
+            Session.objects.filter(pk=instance.pk)
+            .values_list('therapist_id', 'scheduled_date', 'scheduled_time', 'status')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Session)
+def invalidate_session_days(sender, instance, **kwargs):
+    invalidate_therapist_day(instance.therapist_id, instance.scheduled_date)
+    previous = getattr(instance, '_previous_slot', None)
+    if previous and previous[:2] != (instance.therapist_id, instance.scheduled_date):
+        invalidate_therapist_day(*previous[:2])
+
+
+@receiver(post_save, sender=Session)
+def update_session_reminders(sender, instance, created=False, raw=False, **kwargs):
+    """Generate reminders for new and rescheduled sessions and drop them for cancelled ones"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_slot', None)
+    was_remindable = previous is not None and previous[3] in REMINDABLE_STATUSES
+    if instance.status not in REMINDABLE_STATUSES:
+        if was_remindable:
+            transaction.on_commit(lambda: cancel_reminders([instance.pk]))
+    elif not was_remindable or previous[1:3] != (instance.scheduled_date, instance.scheduled_time):
+        transaction.on_commit(lambda: schedule_reminders([instance.pk]))
+
+
+@receiver(post_save, sender=Session)
+def update_completed_sessions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_slot', None)
+    old = previous[0] if previous and previous[3] == 'completed' else None
+    apply_completed_change(old, instance.therapist_id if instance.status == 'completed' else None)
+
+
+@receiver(post_delete, sender=Session)
+def invalidate_deleted_session_day(sender, instance, **kwargs):
+    invalidate_therapist_day(instance.therapist_id, instance.scheduled_date)
+    if instance.status == 'completed':
+        apply_completed_change(instance.therapist_id, None)
+
+
+def _session_therapist(session_id):
+    return Session.objects.filter(pk=session_id).values_list('therapist_id', flat=True).first()
+
+
+@receiver(pre_save, sender=SessionRating)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    """Capture the stored rating so post_save can apply only the difference"""
+    previous = None
+    if instance.pk and not raw:
+        previous = SessionRating.objects.filter(pk=instance.pk).select_related('session').first()
+    instance._previous_contribution = previous and rating_contribution(previous.session.therapist_id, previous)
+
+
+@receiver(post_save, sender=SessionRating)
+def update_therapist_stats_on_rating(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = rating_contribution(_session_therapist(instance.session_id), instance)
+    apply_rating_change(getattr(instance, '_previous_contribution', None), current)
+
+
+@receiver(pre_delete, sender=SessionRating)
+def remember_deleted_rating(sender, instance, **kwargs):
+    # The session row is still there, even when it is deleted in the same cascade
+    instance._previous_contribution = rating_contribution(_session_therapist(instance.session_id), instance)
+
+
+@receiver(post_delete, sender=SessionRating)
+def update_therapist_stats_on_rating_delete(sender, instance, **kwargs):
+    apply_rating_change(getattr(instance, '_previous_contribution', None), None)
+
+
+@receiver([post_save, post_delete], sender=TherapistAvailability)
+def invalidate_therapist_availability(sender, instance, **kwargs):
+    bump_availability_version(instance.therapist_id)
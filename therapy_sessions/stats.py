@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from .models import Session, SessionRating, TherapistStats
+
+
+STARS = range(1, 6)
+DIMENSIONS = TherapistStats.RATING_DIMENSIONS
+
+
+def stats_for(therapist):
+    """The therapist's stats row, or an empty unsaved one if none exists yet"""
+    try:
+        return therapist.therapist_stats
+    except TherapistStats.DoesNotExist:
+        return TherapistStats(therapist=therapist)
+
+
+def _update_stats(therapist_id, delta, changes):
+    # Rows are created on the first increment only, so a decrement never
+    # resurrects the stats of a therapist who is being deleted
+    if delta > 0:
+        TherapistStats.objects.get_or_create(therapist_id=therapist_id)
+    else:
+        # Stats that were never recomputed can miss what is removed here,
+        # and the unsigned columns must not go below zero
+        changes = {field: Greatest(value, 0) for field, value in changes.items()}
+    TherapistStats.objects.filter(therapist_id=therapist_id).update(**changes)
+
+
+def rating_contribution(therapist_id, rating):
+    """``(therapist_id, scores per dimension, would_recommend)`` of a SessionRating"""
+    if not therapist_id:
+        return None
+    return (
+        therapist_id,
+        tuple(int(getattr(rating, f'{dimension}_rating')) for dimension in DIMENSIONS),
+        bool(rating.would_recommend),
+    )
+
+
+def apply_rating_delta(therapist_id, scores, would_recommend, delta):
+    """
+    Add (delta=1) or remove (delta=-1) one rating from a therapist's
+    aggregates in a single UPDATE.
+    """
+    changes = {
+        'rating_count': F('rating_count') + delta,
+        'recommend_count': F('recommend_count') + delta * would_recommend,
+    }
+    for dimension, score in zip(DIMENSIONS, scores):
+        changes[f'{dimension}_rating_sum'] = F(f'{dimension}_rating_sum') + score * delta
+        changes[f'{dimension}_rating_{score}_count'] = F(f'{dimension}_rating_{score}_count') + delta
+    _update_stats(therapist_id, delta, changes)
+
+
+def apply_rating_change(old, new):
+    """
+    Move a rating's contribution from ``old`` to ``new``; each side is
+    ``None`` or a value of ``rating_contribution``.
+    """
+    if old == new:
+        return
+    with transaction.atomic():
+        if old is not None:
+            apply_rating_delta(*old, -1)
+        if new is not None:
+            apply_rating_delta(*new, 1)
+
+
+def apply_completed_change(old_therapist_id, new_therapist_id):
+    """
+    Move a completed session from one therapist's count to another's;
+    either side is ``None`` when the session isn't completed there.
+    """
+    if old_therapist_id == new_therapist_id:
+        return
+    with transaction.atomic():
+        if old_therapist_id:
+            _update_stats(old_therapist_id, -1, {'completed_sessions': F('completed_sessions') - 1})
+        if new_therapist_id:
+            _update_stats(new_therapist_id, 1, {'completed_sessions': F('completed_sessions') + 1})
+
+
+def recompute_therapist_stats():
+    """
+    Rebuild every therapist's stats from sessions and ratings with one
+    GROUP BY each. Returns the number of therapists with stats.
+    """
+    completed = dict(
+        Session.objects.filter(status='completed')
+        .values('therapist_id')
+        .annotate(total=Count('id'))
+        .order_by()
+        .values_list('therapist_id', 'total')
+    )
+    rating_rows = (
+        SessionRating.objects.values('session__therapist_id')
+        .annotate(
+            total=Count('id'),
+            recommended=Count('id', filter=Q(would_recommend=True)),
+            **{f'{dimension}_sum': Sum(f'{dimension}_rating') for dimension in DIMENSIONS},
+            **{
+                f'{dimension}_{star}': Count('id', filter=Q(**{f'{dimension}_rating': star}))
+                for dimension in DIMENSIONS
+                for star in STARS
+            },
+        )
+        .order_by()
+    )
+    ratings = {row['session__therapist_id']: row for row in rating_rows}
+
+    stats = []
+    for therapist_id in completed.keys() | ratings.keys():
+        row = ratings.get(therapist_id, {})
+        therapist_stats = TherapistStats(
+            therapist_id=therapist_id,
+            completed_sessions=completed.get(therapist_id, 0),
+            rating_count=row.get('total', 0),
+            recommend_count=row.get('recommended', 0),
+        )
+        for dimension in DIMENSIONS:
+            setattr(therapist_stats, f'{dimension}_rating_sum', row.get(f'{dimension}_sum') or 0)
+            for star in STARS:
+                setattr(therapist_stats, f'{dimension}_rating_{star}_count', row.get(f'{dimension}_{star}', 0))
+        stats.append(therapist_stats)
+
+    with transaction.atomic():
+        TherapistStats.objects.all().delete()
+        TherapistStats.objects.bulk_create(stats, batch_size=500)
+    return len(stats)
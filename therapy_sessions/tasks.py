@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .reminders import dispatch_all_due_reminders
+
+
+@shared_task(ignore_result=True)
+def dispatch_session_reminders_task():
+    """Send every session reminder that has come due, every minute"""
+    dispatch_all_due_reminders()
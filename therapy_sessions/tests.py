@@ -1,3 +1,364 @@
-from django.test import TestCase
+import importlib
+import threading
+from datetime import time, timedelta
+from unittest import mock
 
-# Create your tests here.
+import jdatetime
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import api_views
+from .booking import BookingError, book_session
+from .models import Session, SessionRating, SessionReminder, SessionType, TherapistAvailability, TherapistStats
+from .reminder_backends import BaseReminderBackend
+from .reminders import dispatch_all_due_reminders, schedule_reminders
+from .stats import recompute_therapist_stats
+from .availability import WEEKDAYS, available_slots, earliest_slots, subtract_intervals
+
+User = get_user_model()
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Parallel bookings of one slot must produce exactly one session"""
+    
+    workers = 8
+    
+    def setUp(self):
+        self.therapist = User.objects.create_user(
+            email='therapist@example.com', password='pass', user_type='therapist'
+        )
+        self.clients = [
+            User.objects.create_user(email=f'client{i}@example.com', password='pass')
+            for i in range(self.workers)
+        ]
+        self.session_type = SessionType.objects.create(name='Individual', duration_minutes=50, price=100)
+        self.day = timezone.localdate() + timedelta(days=1)
+        TherapistAvailability.objects.create(
+            therapist=self.therapist,
+            day_of_week=WEEKDAYS[self.day.weekday()],
+            start_time=time(9, 0),
+            end_time=time(17, 0)
+        )
+    
+    def book_in_parallel(self, start_times):
+        barrier = threading.Barrier(len(start_times))
+        outcomes = []
+        
+        def book(client, start_time):
+            try:
+                barrier.wait()
+                book_session(client, self.therapist, self.session_type, self.day, start_time, 'online')
+                outcomes.append('booked')
+            except BookingError:
+                outcomes.append('rejected')
+            finally:
+                connection.close()
+        
+        threads = [
+            threading.Thread(target=book, args=(client, start_time))
+            for client, start_time in zip(self.clients, start_times)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+    
+    def test_same_slot_is_booked_once(self):
+        outcomes = self.book_in_parallel([time(10, 0)] * self.workers)
+        
+        self.assertEqual(outcomes.count('booked'), 1)
+        self.assertEqual(outcomes.count('rejected'), self.workers - 1)
+        self.assertEqual(Session.objects.filter(therapist=self.therapist, scheduled_date=self.day).count(), 1)
+    
+    def test_overlapping_slots_are_booked_once(self):
+        # 10:00, 10:20 and 10:40 all overlap a 50 minute session starting at 10:00 or 10:20
+        outcomes = self.book_in_parallel([time(10, 0), time(10, 20), time(10, 40)])
+        
+        sessions = list(Session.objects.filter(therapist=self.therapist, scheduled_date=self.day).order_by('scheduled_time'))
+        self.assertGreaterEqual(outcomes.count('booked'), 1)
+        for earlier, later in zip(sessions, sessions[1:]):
+            earlier_end = earlier.scheduled_time.hour * 60 + earlier.scheduled_time.minute + earlier.duration_minutes
+            self.assertLessEqual(earlier_end, later.scheduled_time.hour * 60 + later.scheduled_time.minute)
+    
+    def test_booking_outside_availability_is_rejected(self):
+        with self.assertRaises(BookingError):
+            book_session(self.clients[0], self.therapist, self.session_type, self.day, time(17, 0), 'online')
+
+
+class TherapySessionTestMixin:
+    """A therapist available 9:00-12:00 tomorrow, a client and a 60 minute session type"""
+    
+    def setUp(self):
+        cache.clear()
+        self.therapist = User.objects.create_user(
+            email='therapist@example.com', password='pass', user_type='therapist'
+        )
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass')
+        self.session_type = SessionType.objects.create(name='Individual', duration_minutes=60, price=100)
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.make_availability(self.therapist, time(9, 0), time(12, 0))
+    
+    def make_availability(self, therapist, start, end, day=None):
+        return TherapistAvailability.objects.create(
+            therapist=therapist, day_of_week=WEEKDAYS[(day or self.day).weekday()], start_time=start, end_time=end
+        )
+    
+    def api_get(self, view, params, **kwargs):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, self.client_user)
+        return view(request, **kwargs)
+
+
+class AvailabilityTests(TherapySessionTestMixin, TestCase):
+    
+    def starts(self, duration=60):
+        return [start for start, end in available_slots(self.therapist.pk, self.day, duration=duration)[self.day]]
+    
+    def test_subtract_intervals(self):
+        self.assertEqual(
+            subtract_intervals([(0, 100), (200, 300)], [(50, 60), (90, 210), (250, 400)]),
+            [(0, 50), (60, 90), (210, 250)]
+        )
+    
+    def test_slots_skip_booked_time(self):
+        self.assertEqual(self.starts(), [time(9, 0), time(9, 30), time(10, 0), time(10, 30), time(11, 0)])
+        
+        book_session(self.client_user, self.therapist, self.session_type, self.day, time(10, 0), 'online')
+        
+        # The cached day is invalidated by the booking
+        self.assertEqual(self.starts(), [time(9, 0), time(11, 0)])
+    
+    def test_slots_follow_availability_changes(self):
+        self.starts()
+        self.make_availability(self.therapist, time(14, 0), time(15, 0))
+        
+        self.assertEqual(self.starts()[-1], time(14, 0))
+    
+    def test_non_numeric_session_type_is_rejected(self):
+        response = self.api_get(
+            api_views.therapist_availability,
+            {'date': jdatetime.date.fromgregorian(date=self.day).strftime('%Y/%m/%d'), 'session_type': 'abc'},
+            therapist_id=self.therapist.pk,
+        )
+        
+        self.assertEqual(response.status_code, 400)
+
+
+class EarliestSlotsTests(TherapySessionTestMixin, TestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(email='other@example.com', password='pass', user_type='therapist')
+        self.make_availability(self.other, time(8, 0), time(9, 30))
+    
+    def test_slots_are_merged_in_time_order(self):
+        book_session(self.client_user, self.therapist, self.session_type, self.day, time(9, 0), 'online')
+        
+        slots = earliest_slots([self.therapist.pk, self.other.pk], self.day, days=1, limit=4)
+        
+        self.assertEqual(
+            [(start, therapist_id) for day, start, end, therapist_id in slots],
+            [(time(8, 0), self.other.pk), (time(8, 30), self.other.pk),
+             (time(10, 0), self.therapist.pk), (time(10, 30), self.therapist.pk)]
+        )
+    
+    def test_search_spans_later_days(self):
+        slots = earliest_slots([self.other.pk], self.day - timedelta(days=6), days=7, limit=1)
+        
+        self.assertEqual(slots[0][:2], (self.day, time(8, 0)))
+    
+    def test_non_numeric_session_type_is_rejected(self):
+        response = self.api_get(api_views.earliest_available_slots, {'session_type': '1; DROP'})
+        
+        self.assertEqual(response.status_code, 400)
+
+
+class CancelSessionTests(TherapySessionTestMixin, TestCase):
+    
+    def cancel(self, session, data):
+        request = APIRequestFactory().post('/', data, format='json')
+        force_authenticate(request, self.client_user)
+        return api_views.cancel_session(request, session_id=session.pk)
+    
+    def test_unknown_reason_is_rejected(self):
+        session = book_session(self.client_user, self.therapist, self.session_type, self.day, time(9, 0), 'online')
+        
+        response = self.cancel(session, {'reason': 'bored'})
+        
+        self.assertEqual(response.status_code, 400)
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'scheduled')
+    
+    def test_cancel_records_the_reason(self):
+        session = book_session(self.client_user, self.therapist, self.session_type, self.day, time(9, 0), 'online')
+        
+        response = self.cancel(session, {'reason': 'emergency'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.cancellations.get().reason, 'emergency')
+
+
+class RejectingPushBackend(BaseReminderBackend):
+    """Delivers SMS but rejects every push recipient"""
+    
+    def send_messages(self, messages):
+        return [message.reminder_id for message in messages if message.reminder_type != 'push']
+
+
+@override_settings(
+    THERAPY_REMINDER_SCHEDULE=[('email', 1), ('sms', 1)],
+    THERAPY_REMINDER_BACKEND='therapy_sessions.reminder_backends.ConsoleReminderBackend',
+)
+class ReminderTests(TherapySessionTestMixin, TestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.session = book_session(self.client_user, self.therapist, self.session_type, self.day, time(9, 0), 'online')
+    
+    def due(self, *reminder_types):
+        # Oldest first, so earlier types are claimed first
+        now = timezone.now()
+        return [
+            SessionReminder.objects.create(
+                session=self.session, reminder_type=reminder_type, scheduled_time=now - timedelta(minutes=10 - i)
+            )
+            for i, reminder_type in enumerate(reminder_types)
+        ]
+    
+    def sent_types(self):
+        return sorted(SessionReminder.objects.filter(is_sent=True).values_list('reminder_type', flat=True))
+    
+    def test_clients_without_phone_get_no_sms(self):
+        schedule_reminders([self.session.pk])
+        self.assertEqual(list(self.session.reminders.values_list('reminder_type', flat=True)), ['email'])
+        
+        User.objects.filter(pk=self.client_user.pk).update(phone_number='09120000000')
+        schedule_reminders([self.session.pk])
+        self.assertEqual(sorted(self.session.reminders.values_list('reminder_type', flat=True)), ['email', 'sms'])
+    
+    def test_dispatch_sends_each_reminder_once(self):
+        User.objects.filter(pk=self.client_user.pk).update(phone_number='09120000000')
+        self.due('email', 'sms', 'push')
+        
+        self.assertEqual(dispatch_all_due_reminders(batch_size=2), 3)
+        self.assertEqual(dispatch_all_due_reminders(), 0)
+        
+        self.assertEqual(self.sent_types(), ['email', 'push', 'sms'])
+        self.assertEqual(len(mail.outbox), 1)
+    
+    def test_smtp_outage_does_not_block_sms_and_push(self):
+        User.objects.filter(pk=self.client_user.pk).update(phone_number='09120000000')
+        self.due('email', 'sms', 'push')
+        
+        with mock.patch('therapy_sessions.reminders.get_connection') as get_connection:
+            get_connection.return_value.open.side_effect = OSError('Connection refused')
+            self.assertEqual(dispatch_all_due_reminders(), 2)
+        
+        self.assertEqual(self.sent_types(), ['push', 'sms'])
+    
+    def test_undeliverable_sms_does_not_starve_other_reminders(self):
+        self.due('sms', 'sms', 'email', 'push')
+        
+        self.assertEqual(dispatch_all_due_reminders(batch_size=2), 2)
+        
+        self.assertEqual(self.sent_types(), ['email', 'push'])
+        self.assertEqual(SessionReminder.objects.filter(is_sent=False).count(), 2)
+    
+    @override_settings(
+        THERAPY_REMINDER_BACKEND='therapy_sessions.tests.RejectingPushBackend',
+        THERAPY_REMINDER_RETRY_MINUTES=10,
+        THERAPY_REMINDER_MAX_ATTEMPTS=2,
+    )
+    def test_failing_reminders_are_retried_later_and_do_not_starve_others(self):
+        failing = self.due('push', 'push', 'push', 'email')[:3]
+        
+        # A full batch of failures doesn't stop the email behind them
+        self.assertEqual(dispatch_all_due_reminders(batch_size=2), 1)
+        self.assertEqual(self.sent_types(), ['email'])
+        self.assertEqual(dispatch_all_due_reminders(batch_size=2), 0)
+        self.assertEqual(set(SessionReminder.objects.filter(is_sent=False).values_list('attempts', flat=True)), {1})
+        
+        for _ in range(2):
+            SessionReminder.objects.filter(is_sent=False).update(last_attempt_at=timezone.now() - timedelta(minutes=11))
+            dispatch_all_due_reminders(batch_size=2)
+        
+        # Given up after the maximum number of attempts
+        self.assertEqual(
+            list(SessionReminder.objects.filter(pk__in=[reminder.pk for reminder in failing]).values_list('attempts', flat=True)),
+            [2, 2, 2]
+        )
+
+
+class TherapistStatsTests(TherapySessionTestMixin, TestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.sessions = [
+            book_session(self.client_user, self.therapist, self.session_type, self.day, time(hour, 0), 'online')
+            for hour in (9, 10, 11)
+        ]
+        for session in self.sessions:
+            session.status = 'completed'
+            session.save()
+    
+    def rate(self, session, score, would_recommend=True):
+        return SessionRating.objects.create(
+            session=session, overall_rating=score, therapist_rating=score, environment_rating=score,
+            helpfulness_rating=score, would_recommend=would_recommend
+        )
+    
+    def stats(self):
+        return TherapistStats.objects.filter(therapist=self.therapist).values().get()
+    
+    def assert_matches_recompute(self):
+        incremental = self.stats()
+        recompute_therapist_stats()
+        recomputed = self.stats()
+        for row in (incremental, recomputed):
+            del row['id'], row['updated_at']
+        self.assertEqual(incremental, recomputed)
+    
+    def test_incremental_updates_match_a_recompute(self):
+        first = self.rate(self.sessions[0], 5)
+        self.rate(self.sessions[1], 3, would_recommend=False)
+        first.overall_rating = 4
+        first.save()
+        self.sessions[2].status = 'cancelled'
+        self.sessions[2].save()
+        self.sessions[1].delete()
+        
+        self.assertEqual(self.stats()['completed_sessions'], 1)
+        self.assertEqual(self.stats()['overall_rating_4_count'], 1)
+        self.assert_matches_recompute()
+    
+    def test_removing_data_older_than_the_stats_does_not_fail(self):
+        rating = self.rate(self.sessions[0], 5)
+        # As on an install whose stats were never backfilled
+        TherapistStats.objects.filter(therapist=self.therapist).update(completed_sessions=0, rating_count=0)
+        
+        rating.delete()
+        self.sessions[0].status = 'cancelled'
+        self.sessions[0].save()
+        
+        self.assertEqual(self.stats()['completed_sessions'], 0)
+        self.assertEqual(self.stats()['rating_count'], 0)
+    
+    def test_migration_backfills_existing_data(self):
+        self.rate(self.sessions[0], 2)
+        expected = self.stats()
+        TherapistStats.objects.all().delete()
+        
+        migration = importlib.import_module('therapy_sessions.migrations.0004_backfill_therapist_stats')
+        migration.backfill_therapist_stats(apps, None)
+        
+        backfilled = self.stats()
+        for row in (expected, backfilled):
+            del row['id'], row['updated_at']
+        self.assertEqual(backfilled, expected)
@@ -9,6 +9,9 @@ from django.http import JsonResponse
 from django.db import models
 from .models import Session, SessionType, TherapistAvailability, SessionRating, SessionCancellation
 from .forms import SessionBookingForm, SessionRescheduleForm
+from .availability import available_slots
+from .booking import BookingError, book_session, reschedule_session
+from .stats import stats_for
 
 User = get_user_model()
 
@@ -58,18 +61,22 @@ class SessionBookingView(LoginRequiredMixin, CreateView):
     template_name = 'therapy_sessions/session_booking.html'
     
     def form_valid(self, form):
-        form.instance.client = self.request.user
-        form.instance.price = form.instance.session_type.price
-        form.instance.duration_minutes = form.instance.session_type.duration_minutes
-        
-        # Generate meeting link for online sessions
-        if form.instance.mode == 'online':
-            form.instance.meeting_link = f"https://meet.example.com/{form.instance.id}"
-            form.instance.meeting_id = f"MEET{form.instance.id:06d}"
-            form.instance.meeting_password = "123456"  # In real app, generate secure password
+        try:
+            self.object = book_session(
+                client=self.request.user,
+                therapist=form.cleaned_data['therapist'],
+                session_type=form.cleaned_data['session_type'],
+                scheduled_date=form.cleaned_data['scheduled_date'],
+                scheduled_time=form.cleaned_data['scheduled_time'],
+                mode=form.cleaned_data['mode'],
+                location=form.cleaned_data.get('location')
+            )
+        except BookingError as exc:
+            form.add_error(None, exc.message)
+            return self.form_invalid(form)
         
         messages.success(self.request, 'جلسه شما با موفقیت رزرو شد.')
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
     
     def get_success_url(self):
         return reverse('therapy_sessions:session_detail', kwargs={'pk': self.object.pk})
@@ -89,7 +96,11 @@ class TherapistListView(ListView):
     paginate_by = 12
     
     def get_queryset(self):
-        return User.objects.filter(user_type='therapist', is_active=True).order_by('first_name', 'last_name')
+        return (
+            User.objects.filter(user_type='therapist', is_active=True)
+            .select_related('therapist_stats')
+            .order_by('first_name', 'last_name')
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -116,36 +127,26 @@ class TherapistDetailView(DetailView):
     context_object_name = 'therapist'
     
     def get_queryset(self):
-        return User.objects.filter(user_type='therapist', is_active=True)
+        return User.objects.filter(user_type='therapist', is_active=True).select_related('therapist_stats')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        therapist = self.get_object()
+        therapist = self.object
         
         # Get session types offered by this therapist
         context['session_types'] = SessionType.objects.filter(is_active=True)
         
-        # Get ratings for this therapist
+        # Rating aggregates are precomputed in TherapistStats
+        stats = stats_for(therapist)
         ratings = SessionRating.objects.filter(session__therapist=therapist)
+        context['stats'] = stats
         context['ratings'] = ratings
-        context['total_ratings'] = ratings.count()
-        
-        if context['total_ratings'] > 0:
-            context['average_rating'] = ratings.aggregate(avg=models.Avg('overall_rating'))['avg']
-            
-            # Calculate rating distribution
-            rating_counts = {}
-            for i in range(1, 6):
-                count = ratings.filter(overall_rating=i).count()
-                rating_counts[f'rating_{i}'] = round((count / context['total_ratings']) * 100, 1)
-            context.update(rating_counts)
-            
-            context['recent_ratings'] = ratings.order_by('-created_at')[:5]
-        else:
-            context['average_rating'] = 0
-            for i in range(1, 6):
-                context[f'rating_{i}'] = 0
-            context['recent_ratings'] = []
+        context['total_ratings'] = stats.rating_count
+        context['average_rating'] = stats.average()
+        context['recommend_rate'] = stats.recommend_rate
+        for star, percent in stats.distribution().items():
+            context[f'rating_{star}'] = percent
+        context['recent_ratings'] = ratings.order_by('-created_at')[:5] if stats.rating_count else []
         
         return context
 
@@ -155,9 +156,26 @@ class TherapistAvailabilityView(DetailView):
     model = User
     template_name = 'therapy_sessions/therapist_availability.html'
     context_object_name = 'therapist'
+    days = 7
     
     def get_queryset(self):
         return User.objects.filter(user_type='therapist', is_active=True)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        session_type_id = self.request.GET.get('session_type', '')
+        session_type = SessionType.objects.filter(
+            is_active=True, pk=session_type_id
+        ).first() if session_type_id.isdigit() else None
+        duration = session_type.duration_minutes if session_type else 60
+        
+        # Bookable slots for the coming week
+        context['session_type'] = session_type
+        context['session_types'] = SessionType.objects.filter(is_active=True)
+        context['available_days'] = available_slots(
+            self.object.pk, timezone.localdate(), days=self.days, duration=duration
+        ).items()
+        return context
 
 
 class UserSessionsView(ListView):
@@ -187,13 +205,26 @@ class SessionCancelView(CreateView):
         return render(request, self.template_name, {'session': session})
 
 
-class SessionRescheduleView(CreateView):
+class SessionRescheduleView(LoginRequiredMixin, CreateView):
     """View for rescheduling sessions"""
     template_name = 'therapy_sessions/session_reschedule.html'
     
     def get(self, request, *args, **kwargs):
         session = get_object_or_404(Session, pk=kwargs['pk'])
-        return render(request, self.template_name, {'session': session})
+        return render(request, self.template_name, {'session': session, 'form': SessionRescheduleForm()})
+    
+    def post(self, request, *args, **kwargs):
+        session = get_object_or_404(Session, pk=kwargs['pk'], client=request.user)
+        form = SessionRescheduleForm(request.POST)
+        if form.is_valid():
+            try:
+                reschedule_session(session, form.cleaned_data['scheduled_date'], form.cleaned_data['scheduled_time'])
+            except BookingError as exc:
+                form.add_error(None, exc.message)
+            else:
+                messages.success(request, 'زمان جلسه با موفقیت تغییر کرد.')
+                return redirect('therapy_sessions:session_detail', pk=session.pk)
+        return render(request, self.template_name, {'session': session, 'form': form})
 
 
 class SessionTypeListView(ListView):